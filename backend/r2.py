@@ -1,3 +1,5 @@
+from typing import Tuple
+
 import boto3
 from botocore.client import Config
 from django.conf import settings
@@ -42,4 +44,120 @@ def generate_presigned_get_url(object_key: str, expires_in: int = 600) -> str:
             "Key": object_key,
         },
         ExpiresIn=expires_in,
-    )
\ No newline at end of file
+    )
+
+def get_object_size(object_key: str) -> int:
+    """
+    Return the size in bytes of an object, using a HEAD request.
+    """
+    s3 = get_r2_client()
+    head = s3.head_object(Bucket=settings.R2_BUCKET_NAME, Key=object_key)
+    return head["ContentLength"]
+
+
+def get_object_content_type(object_key: str) -> str:
+    """
+    Return the Content-Type an object was uploaded with, using a HEAD request.
+    """
+    s3 = get_r2_client()
+    head = s3.head_object(Bucket=settings.R2_BUCKET_NAME, Key=object_key)
+    return head.get("ContentType", "")
+
+
+def get_object_fingerprint(object_key: str) -> Tuple[str, int]:
+    """
+    Return (ETag, size) of an object, using a HEAD request. Identical content
+    has the same ETag when it was uploaded the same way (one PUT, or a
+    multipart upload with the same part size).
+    """
+    s3 = get_r2_client()
+    head = s3.head_object(Bucket=settings.R2_BUCKET_NAME, Key=object_key)
+    return head["ETag"].strip('"'), head["ContentLength"]
+
+
+def upload_fileobj(object_key: str, fileobj, content_type: str = "application/octet-stream"):
+    """
+    Upload a file object from the server (boto3 switches to a multipart
+    upload for large files).
+    """
+    s3 = get_r2_client()
+    s3.upload_fileobj(fileobj, settings.R2_BUCKET_NAME, object_key, ExtraArgs={"ContentType": content_type})
+
+
+# ---------------------------------------------------------
+# Multipart uploads (large files)
+# ---------------------------------------------------------
+
+def create_multipart_upload(object_key: str, content_type: str = "application/octet-stream") -> str:
+    """
+    Start a multipart upload and return its UploadId.
+    """
+    s3 = get_r2_client()
+    resp = s3.create_multipart_upload(
+        Bucket=settings.R2_BUCKET_NAME,
+        Key=object_key,
+        ContentType=content_type,
+    )
+    return resp["UploadId"]
+
+
+def generate_presigned_part_urls(object_key: str, upload_id: str, part_numbers, expires_in: int = 3600) -> dict:
+    """
+    Generate presigned PUT URLs for the given part numbers of a multipart
+    upload, as {part_number: url}. Signing is local, so asking again for a
+    part (e.g. to retry it after its URL expired) is cheap.
+    """
+    s3 = get_r2_client()
+    return {
+        part_number: s3.generate_presigned_url(
+            "upload_part",
+            Params={
+                "Bucket": settings.R2_BUCKET_NAME,
+                "Key": object_key,
+                "UploadId": upload_id,
+                "PartNumber": part_number,
+            },
+            ExpiresIn=expires_in,
+        )
+        for part_number in part_numbers
+    }
+
+
+def list_uploaded_parts(object_key: str, upload_id: str) -> list:
+    """
+    Return the parts uploaded so far as [{"PartNumber", "ETag", "Size"}],
+    ordered by part number.
+    """
+    s3 = get_r2_client()
+    parts = []
+    kwargs = {"Bucket": settings.R2_BUCKET_NAME, "Key": object_key, "UploadId": upload_id}
+    while True:
+        resp = s3.list_parts(**kwargs)
+        parts.extend(
+            {"PartNumber": p["PartNumber"], "ETag": p["ETag"], "Size": p["Size"]}
+            for p in resp.get("Parts", [])
+        )
+        if not resp.get("IsTruncated"):
+            return parts
+        kwargs["PartNumberMarker"] = resp["NextPartNumberMarker"]
+
+
+def complete_multipart_upload(object_key: str, upload_id: str, parts: list):
+    """
+    Assemble the object from its parts ([{"PartNumber", "ETag"}], ascending).
+    """
+    s3 = get_r2_client()
+    s3.complete_multipart_upload(
+        Bucket=settings.R2_BUCKET_NAME,
+        Key=object_key,
+        UploadId=upload_id,
+        MultipartUpload={"Parts": [{"PartNumber": p["PartNumber"], "ETag": p["ETag"]} for p in parts]},
+    )
+
+
+def abort_multipart_upload(object_key: str, upload_id: str):
+    """
+    Abort a multipart upload and free the parts stored so far.
+    """
+    s3 = get_r2_client()
+    s3.abort_multipart_upload(Bucket=settings.R2_BUCKET_NAME, Key=object_key, UploadId=upload_id)
@@ -188,6 +188,27 @@ if REDIS_URL.startswith("rediss://"):
     CELERY_BROKER_USE_SSL = {"ssl_cert_reqs": None}
     CELERY_REDIS_BACKEND_USE_SSL = {"ssl_cert_reqs": None}
 
+# Separate lanes so a long import never sits in front of webhook deliveries.
+# Each queue gets its own worker (see Procfile / supervisord.conf); anything
+# unrouted stays on the default "celery" queue, served by the webhooks worker.
+CELERY_TASK_ROUTES = {
+    "imports.tasks.process_import_job": {"queue": "imports"},
+    "imports.tasks.finalize_import_job": {"queue": "imports"},
+    "imports.tasks.process_import_chunk": {"queue": "import_chunks"},
+    "webhooks.tasks.dispatch_webhooks_for_event": {"queue": "webhooks"},
+}
+
+# Import tasks run for minutes and ack late: a worker reserves one message
+# at a time, so a queued import isn't stuck behind a busy process. The
+# webhooks worker raises this on its command line.
+CELERY_WORKER_PREFETCH_MULTIPLIER = int(os.environ.get("CELERY_WORKER_PREFETCH_MULTIPLIER", 1))
+
+# With Redis, an unacked message is redelivered after the visibility
+# timeout; it must outlast the longest import or late-acked imports run twice.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "visibility_timeout": int(os.environ.get("CELERY_VISIBILITY_TIMEOUT", 6 * 60 * 60)),
+}
+
 # ---------------------------------------------------------
 # CACHING (for DRF pagination or speed)
 # ---------------------------------------------------------
@@ -242,6 +263,102 @@ CACHES = {
     }
 }
 
+# ---------------------------------------------------------
+# PRODUCT IMPORTS
+# ---------------------------------------------------------
+
+# Ingest engine: "auto" (COPY on Postgres, ORM elsewhere), "orm" or "copy".
+# Individual jobs can override this via ImportJob.ingest_engine.
+IMPORT_INGEST_ENGINE = os.environ.get("IMPORT_INGEST_ENGINE", "auto")
+
+# Parallel mode: objects larger than IMPORT_CHUNK_BYTES are split into
+# row-aligned byte ranges (a quote-aware scan, see imports.tasks.align_chunks)
+# and imported by a Celery chord of chunk tasks.
+IMPORT_PARALLEL = os.environ.get("IMPORT_PARALLEL", "False") == "True"
+IMPORT_CHUNK_BYTES = int(os.environ.get("IMPORT_CHUNK_BYTES", 32 * 1024 * 1024))
+
+# Live progress goes to Redis after every batch; the ImportJob row (and its
+# resume checkpoint) is written at most every IMPORT_CHECKPOINT_SECONDS.
+IMPORT_CHECKPOINT_SECONDS = int(os.environ.get("IMPORT_CHECKPOINT_SECONDS", 15))
+
+# Overlapped pipeline: download and CSV parsing run on their own threads,
+# ahead of the DB writer, through queues of at most IMPORT_PIPELINE_DEPTH
+# items (network chunks / batches).
+IMPORT_PIPELINE = os.environ.get("IMPORT_PIPELINE", "True") == "True"
+IMPORT_PIPELINE_DEPTH = int(os.environ.get("IMPORT_PIPELINE_DEPTH", 4))
+
+# Adaptive batch size: starts at IMPORT_BATCH_SIZE rows and is steered toward
+# IMPORT_BATCH_TARGET_SECONDS per write+commit, never above
+# IMPORT_BATCH_MAX_BYTES of row data, within [IMPORT_BATCH_MIN, IMPORT_BATCH_MAX].
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", 1000))
+IMPORT_BATCH_MIN = int(os.environ.get("IMPORT_BATCH_MIN", 100))
+IMPORT_BATCH_MAX = int(os.environ.get("IMPORT_BATCH_MAX", 20000))
+IMPORT_BATCH_TARGET_SECONDS = float(os.environ.get("IMPORT_BATCH_TARGET_SECONDS", 0.5))
+IMPORT_BATCH_MAX_BYTES = int(os.environ.get("IMPORT_BATCH_MAX_BYTES", 8 * 1024 * 1024))
+
+# Server-Sent Events progress stream (served by the ASGI app)
+IMPORT_EVENTS_INTERVAL = float(os.environ.get("IMPORT_EVENTS_INTERVAL", 0.5))
+IMPORT_EVENTS_MAX_SECONDS = int(os.environ.get("IMPORT_EVENTS_MAX_SECONDS", 300))
+
+# Uploads of at least IMPORT_MULTIPART_THRESHOLD bytes go to R2 as a multipart
+# upload: the browser PUTs IMPORT_MULTIPART_PART_SIZE parts (grown if needed to
+# stay within 10,000 parts), IMPORT_UPLOAD_CONCURRENCY at a time, each through
+# its own presigned URL valid for IMPORT_UPLOAD_URL_EXPIRES seconds.
+IMPORT_MULTIPART_THRESHOLD = int(os.environ.get("IMPORT_MULTIPART_THRESHOLD", 100 * 1024 * 1024))
+IMPORT_MULTIPART_PART_SIZE = int(os.environ.get("IMPORT_MULTIPART_PART_SIZE", 16 * 1024 * 1024))
+IMPORT_UPLOAD_CONCURRENCY = int(os.environ.get("IMPORT_UPLOAD_CONCURRENCY", 6))
+IMPORT_UPLOAD_URL_EXPIRES = int(os.environ.get("IMPORT_UPLOAD_URL_EXPIRES", 3600))
+
+# Replace imports (ImportJob.mode "replace") refuse to swap in a catalog with
+# fewer than IMPORT_REPLACE_MIN_RATIO x the current product count (0 disables
+# the guard), and wait at most IMPORT_REPLACE_LOCK_TIMEOUT seconds per attempt
+# for the table lock of the swap.
+IMPORT_REPLACE_MIN_RATIO = float(os.environ.get("IMPORT_REPLACE_MIN_RATIO", 0.5))
+IMPORT_REPLACE_LOCK_TIMEOUT = int(os.environ.get("IMPORT_REPLACE_LOCK_TIMEOUT", 5))
+
+# Sync imports (ImportJob.sync_missing) leave missing products alone when the
+# file lists fewer than IMPORT_SYNC_MIN_RATIO x the current product count.
+IMPORT_SYNC_MIN_RATIO = float(os.environ.get("IMPORT_SYNC_MIN_RATIO", 0.5))
+
+# Dry runs (ImportJob.mode "validate") report at most this many offending rows
+IMPORT_VALIDATION_SAMPLE_ROWS = int(os.environ.get("IMPORT_VALIDATION_SAMPLE_ROWS", 50))
+
+# Rows the database refuses or the parser can't read are written to a reject
+# CSV next to the source; each file keeps at most this many (the rest are
+# only counted).
+IMPORT_REJECT_FILE_MAX_ROWS = int(os.environ.get("IMPORT_REJECT_FILE_MAX_ROWS", 10000))
+
+# Rows repeating the content already written for their SKU earlier in the
+# file are dropped before the database; at most this many SKUs are tracked
+# per pass or chunk (about 100 bytes each, 0 = only dedupe within a batch).
+IMPORT_DEDUP_SEEN_MAX = int(os.environ.get("IMPORT_DEDUP_SEEN_MAX", 1_000_000))
+
+# Concurrent imports (imports.locking): batches are always written in SKU
+# order; "partition" adds advisory locks per SKU-hash partition (one of
+# IMPORT_LOCK_PARTITIONS), "job" lets one import write at a time.
+IMPORT_CONCURRENCY = os.environ.get("IMPORT_CONCURRENCY", "sorted")
+IMPORT_LOCK_PARTITIONS = int(os.environ.get("IMPORT_LOCK_PARTITIONS", 64))
+
+# Load-aware throttling (imports.throttle). "background" imports pause and
+# shrink batches while a threshold is crossed; "fast" ones never do. Imports
+# are fast unless the job or this setting opts in to "background".
+IMPORT_PRIORITY = os.environ.get("IMPORT_PRIORITY", "fast")
+IMPORT_THROTTLE_MAX_COMMIT_SECONDS = float(os.environ.get("IMPORT_THROTTLE_MAX_COMMIT_SECONDS", 2.0))
+IMPORT_THROTTLE_MAX_LOCK_WAITS = int(os.environ.get("IMPORT_THROTTLE_MAX_LOCK_WAITS", 5))
+# e.g. "SELECT extract(epoch FROM max(replay_lag)) FROM pg_stat_replication"
+IMPORT_THROTTLE_LAG_QUERY = os.environ.get("IMPORT_THROTTLE_LAG_QUERY", "")
+IMPORT_THROTTLE_MAX_LAG_SECONDS = float(os.environ.get("IMPORT_THROTTLE_MAX_LAG_SECONDS", 10.0))
+IMPORT_THROTTLE_CHECK_SECONDS = float(os.environ.get("IMPORT_THROTTLE_CHECK_SECONDS", 2.0))
+IMPORT_THROTTLE_PAUSE_SECONDS = float(os.environ.get("IMPORT_THROTTLE_PAUSE_SECONDS", 0.5))
+IMPORT_THROTTLE_MAX_PAUSE_SECONDS = float(os.environ.get("IMPORT_THROTTLE_MAX_PAUSE_SECONDS", 10.0))
+
+# Redis lock held by an import or chunk task while it runs, so a redelivered
+# copy of the task waits instead of importing the same rows twice. Refreshed
+# after every batch; expires this long after a worker dies. The waiting copy
+# gives up after IMPORT_TASK_LOCK_MAX_RETRIES retries (an hour by default).
+IMPORT_TASK_LOCK_SECONDS = int(os.environ.get("IMPORT_TASK_LOCK_SECONDS", 300))
+IMPORT_TASK_LOCK_MAX_RETRIES = int(os.environ.get("IMPORT_TASK_LOCK_MAX_RETRIES", 12))
+
 # ---------------------------------------------------------
 # LOGGING
 # ---------------------------------------------------------
@@ -0,0 +1,124 @@
+# imports/batching.py
+"""
+Adaptive batch sizing for product upserts.
+
+A fixed 1000-row batch is too small for tiny rows (per-commit overhead
+dominates) and too large for rows with multi-KB descriptions (long
+transactions, big COPY payloads). The controller measures how long each
+batch takes to write and commit and how many bytes it carried, and steers
+the next batch size toward IMPORT_BATCH_TARGET_SECONDS, capped by
+IMPORT_BATCH_MAX_BYTES and kept within [IMPORT_BATCH_MIN, IMPORT_BATCH_MAX].
+"""
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+# Batches kept in the per-job history stored on ImportJob.batch_tuning
+HISTORY_LENGTH = 50
+
+# Smoothing of the measured throughput, and the most a single batch may move
+# the size (up or down) so one slow commit doesn't collapse it.
+SMOOTHING = 0.5
+MAX_STEP = 2.0
+
+
+class BatchSizeController:
+    """
+    Pick the next batch size from measured write latency and payload size.
+
+    ``size`` is read by the producer of batches (possibly on the parser
+    thread); ``record()`` is called by the writer after each commit.
+    """
+
+    def __init__(
+        self,
+        initial: Optional[int] = None,
+        minimum: Optional[int] = None,
+        maximum: Optional[int] = None,
+        target_seconds: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.minimum = minimum or settings.IMPORT_BATCH_MIN
+        self.maximum = maximum or settings.IMPORT_BATCH_MAX
+        self.target_seconds = target_seconds or settings.IMPORT_BATCH_TARGET_SECONDS
+        self.max_bytes = max_bytes or settings.IMPORT_BATCH_MAX_BYTES
+        self.initial = self._clamp(initial or settings.IMPORT_BATCH_SIZE)
+        self.size = self.initial
+
+        self.rows_per_second: Optional[float] = None
+        self.batches = 0
+        self.smallest = self.largest = self.initial
+        self.history: List[List] = []
+
+    def _clamp(self, size: float) -> int:
+        return int(max(self.minimum, min(self.maximum, size)))
+
+    def record(self, rows: int, seconds: float, payload_bytes: int):
+        """
+        Account for one written batch and adjust ``size`` for the next one.
+        """
+        self.batches += 1
+        self.history.append([rows, round(seconds * 1000, 1), payload_bytes])
+        del self.history[:-HISTORY_LENGTH]
+
+        if rows <= 0 or seconds <= 0:
+            return
+
+        rate = rows / seconds
+        if self.rows_per_second is None:
+            self.rows_per_second = rate
+        else:
+            self.rows_per_second = SMOOTHING * rate + (1 - SMOOTHING) * self.rows_per_second
+
+        wanted = self.rows_per_second * self.target_seconds
+        if payload_bytes:
+            wanted = min(wanted, self.max_bytes * rows / payload_bytes)
+
+        wanted = max(self.size / MAX_STEP, min(self.size * MAX_STEP, wanted))
+        self.size = self._clamp(wanted)
+        self.smallest = min(self.smallest, self.size)
+        self.largest = max(self.largest, self.size)
+
+    def shrink(self, factor: float = MAX_STEP):
+        """
+        Cut the next batch size (load throttling); later batches grow it back.
+        """
+        self.size = self._clamp(self.size / factor)
+        self.smallest = min(self.smallest, self.size)
+
+    def summary(self) -> Dict:
+        """
+        What was chosen, for ImportJob.batch_tuning. History entries are
+        [rows, milliseconds, payload bytes] of the most recent batches.
+        """
+        return {
+            "target_seconds": self.target_seconds,
+            "initial": self.initial,
+            "final": self.size,
+            "min": self.smallest,
+            "max": self.largest,
+            "batches": self.batches,
+            "rows_per_second": round(self.rows_per_second, 1) if self.rows_per_second else None,
+            "history": self.history,
+        }
+
+
+def merge_batch_tuning(summaries: List[Dict]) -> Dict:
+    """
+    Combine the controller summaries of a parallel job's chunk tasks.
+    """
+    summaries = [summary for summary in summaries if summary]
+    if not summaries:
+        return {}
+
+    rates = [summary["rows_per_second"] for summary in summaries if summary.get("rows_per_second")]
+    return {
+        "target_seconds": summaries[0]["target_seconds"],
+        "initial": summaries[0]["initial"],
+        "final": round(sum(summary["final"] for summary in summaries) / len(summaries)),
+        "min": min(summary["min"] for summary in summaries),
+        "max": max(summary["max"] for summary in summaries),
+        "batches": sum(summary["batches"] for summary in summaries),
+        "rows_per_second": round(sum(rates) / len(rates), 1) if rates else None,
+        "history": [entry for summary in summaries for entry in summary["history"]][-HISTORY_LENGTH:],
+    }
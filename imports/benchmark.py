@@ -0,0 +1,380 @@
+# imports/benchmark.py
+"""
+Import benchmark harness.
+
+- generate_catalog(): reproducible synthetic product catalogs (size,
+  duplicate ratio, description length) as CSV, gzip CSV or Parquet.
+- ObjectServer: a local HTTP stand-in for R2. It serves files from a
+  directory under /<bucket>/<key>, honours Range and answers HEAD, so the
+  presigned GET/HEAD calls in backend.r2 work unchanged once
+  R2_ENDPOINT_URL points at it.
+- run_benchmark(): imports a file through process_import_job, in process,
+  into a throwaway test database, and reports throughput, peak RSS and
+  query counts.
+
+Used by the generate_catalog and benchmark_import management commands.
+"""
+import csv
+import gzip
+import mimetypes
+import os
+import random
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.db import connection
+from django.test.utils import override_settings
+
+from imports.columnar import pyarrow
+
+WORDS = (
+    "steel cotton wireless compact ergonomic premium classic organic portable durable "
+    "adjustable waterproof lightweight vintage modern heavy duty slim outdoor kitchen office"
+).split()
+
+CONTENT_TYPES = {
+    ".csv": "text/csv",
+    ".gz": "application/gzip",
+    ".zst": "application/zstd",
+    ".parquet": "application/vnd.apache.parquet",
+    ".arrow": "application/vnd.apache.arrow.file",
+}
+
+
+# ---------------------------------------------------------
+# Synthetic catalogs
+# ---------------------------------------------------------
+
+def catalog_rows(
+    rows: int,
+    duplicate_ratio: float = 0.0,
+    description_length: int = 80,
+    seed: int = 0,
+) -> Iterator[Tuple[str, str, str]]:
+    """
+    Yield (sku, name, description) rows. A ``duplicate_ratio`` share of rows
+    repeat an earlier SKU (in a random case, so they collide on sku_norm)
+    with a new name; descriptions are about ``description_length`` chars.
+    """
+    rng = random.Random(seed)
+    unique = 0
+
+    for _ in range(rows):
+        if unique and rng.random() < duplicate_ratio:
+            sku = f"SKU-{rng.randrange(unique):09d}"
+            sku = sku.lower() if rng.random() < 0.5 else sku
+        else:
+            sku = f"SKU-{unique:09d}"
+            unique += 1
+
+        name = " ".join(rng.choice(WORDS) for _ in range(3)).title()
+        description = []
+        length = 0
+        while length < description_length:
+            word = rng.choice(WORDS)
+            description.append(word)
+            length += len(word) + 1
+        yield sku, name, " ".join(description)[:description_length]
+
+
+def generate_catalog(path: str, rows: int, duplicate_ratio: float = 0.0, description_length: int = 80, seed: int = 0) -> int:
+    """
+    Write a synthetic catalog to ``path``; the format follows the suffix
+    (.csv, .csv.gz, .parquet). Returns the file size in bytes.
+    """
+    data = catalog_rows(rows, duplicate_ratio, description_length, seed)
+
+    if path.endswith(".parquet"):
+        if pyarrow is None:
+            raise ValueError("Writing Parquet requires the 'pyarrow' package")
+
+        schema = pyarrow.schema([("sku", pyarrow.string()), ("name", pyarrow.string()), ("description", pyarrow.string())])
+        with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+            while True:
+                chunk = [row for _, row in zip(range(100_000), data)]
+                if not chunk:
+                    break
+                columns = list(zip(*chunk))
+                writer.write_table(pyarrow.table(dict(zip(schema.names, columns)), schema=schema))
+    else:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "wt", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["sku", "name", "description"])
+            writer.writerows(data)
+
+    return os.path.getsize(path)
+
+
+# ---------------------------------------------------------
+# Local stand-in for R2
+# ---------------------------------------------------------
+
+class _ObjectHandler(SimpleHTTPRequestHandler):
+    """
+    Serve /<bucket>/<key> from the server's directory, with Range support.
+    Query strings (presigned URL signatures) are ignored.
+    """
+
+    def log_message(self, format, *args):
+        pass
+
+    def _object_path(self) -> Optional[str]:
+        path = self.path.split("?", 1)[0]
+        parts = path.lstrip("/").split("/", 1)
+        if len(parts) != 2:
+            return None
+        full = os.path.realpath(os.path.join(self.server.directory, parts[1]))
+        if not full.startswith(os.path.realpath(self.server.directory) + os.sep) or not os.path.isfile(full):
+            return None
+        return full
+
+    def _content_type(self, path: str) -> str:
+        return CONTENT_TYPES.get(os.path.splitext(path)[1]) or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    def _send_headers(self, path: str) -> Optional[Tuple[int, int]]:
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        status = 200
+
+        byte_range = self.headers.get("Range")
+        if byte_range and byte_range.startswith("bytes="):
+            first, last = byte_range[len("bytes="):].split("-", 1)
+            start = int(first) if first else max(size - int(last), 0)
+            end = min(int(last), size - 1) if first and last else end
+            if start >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.end_headers()
+                return None
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Type", self._content_type(path))
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", f'"{int(os.path.getmtime(path))}-{size}"')
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        return start, end
+
+    def do_HEAD(self):
+        path = self._object_path()
+        if path is None:
+            self.send_error(404)
+            return
+        self._send_headers(path)
+
+    def do_GET(self):
+        path = self._object_path()
+        if path is None:
+            self.send_error(404)
+            return
+        span = self._send_headers(path)
+        if span is None:
+            return
+
+        start, end = span
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            try:
+                while remaining > 0:
+                    chunk = f.read(min(remaining, 256 * 1024))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+
+class ObjectServer:
+    """
+    Local HTTP object server, used as R2 for benchmarks:
+
+        with ObjectServer(directory) as server, server.as_r2():
+            ...  # generate_presigned_get_url() now points at the server
+    """
+
+    bucket = "benchmark"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), _ObjectHandler)
+        self.httpd.directory = directory
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="benchmark-r2", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def as_r2(self):
+        return override_settings(
+            R2_ENDPOINT_URL=self.url,
+            R2_BUCKET_NAME=self.bucket,
+            R2_ACCESS_KEY_ID="benchmark",
+            R2_SECRET_ACCESS_KEY="benchmark",
+        )
+
+
+# ---------------------------------------------------------
+# Runner
+# ---------------------------------------------------------
+
+def reset_peak_rss():
+    """
+    Reset the kernel's peak-RSS counter for this process (Linux only), so each
+    run reports its own peak. Elsewhere the process-lifetime peak is reported.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def peak_rss_bytes() -> int:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@contextmanager
+def count_queries():
+    """
+    Count statements run on the default connection, without keeping their
+    SQL around (CaptureQueriesContext would, and inflate RSS).
+    """
+    counter = {"queries": 0}
+
+    def wrapper(execute, sql, params, many, context):
+        counter["queries"] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        yield counter
+
+
+@contextmanager
+def benchmark_database(keep: bool = False):
+    """
+    Create a throwaway test database for the configured backend. The schema
+    is built from the current models (as the test runner does with
+    MIGRATE=False), so runs don't depend on migration history.
+    """
+    test_settings = connection.settings_dict.setdefault("TEST", {})
+    previous = test_settings.get("MIGRATE", True)
+    test_settings["MIGRATE"] = False
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=keep)
+    try:
+        yield
+    finally:
+        test_settings["MIGRATE"] = previous
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keep)
+
+
+def run_import(file_key: str, engine: str, runs: int = 1, mode: str = "import", feed: str = "") -> Dict:
+    """
+    Import ``file_key`` from the configured (stand-in) R2 ``runs`` times in a
+    row with the given engine, eagerly and in process. Run 1 imports into an
+    empty table; later runs measure a re-import of unchanged data (as a delta
+    import with ``feed``). ``mode`` "replace" runs replace-mode imports, which
+    load through their own COPY path whatever the engine.
+    """
+    from celery import current_app
+
+    from imports.models import FeedSnapshotRow, ImportJob
+    from imports.tasks import process_import_job
+    from products.models import Product
+
+    Product.objects.all().delete()
+    FeedSnapshotRow.objects.all().delete()
+    results = []
+
+    eager = current_app.conf.task_always_eager
+    current_app.conf.task_always_eager = True
+    try:
+        for run in range(1, runs + 1):
+            job = ImportJob.objects.create(
+                status=ImportJob.STATUS_QUEUED, file_key=file_key, ingest_engine=engine, mode=mode, feed=feed
+            )
+
+            reset_peak_rss()
+            started = time.perf_counter()
+            with count_queries() as counter:
+                try:
+                    process_import_job.apply(args=[job.id])
+                except Exception:
+                    pass  # recorded on the job
+            seconds = time.perf_counter() - started
+
+            job.refresh_from_db()
+            results.append({
+                "engine": engine if mode == ImportJob.MODE_IMPORT else mode,
+                "run": run,
+                "status": job.status,
+                "error": job.error_message,
+                "rows": job.processed_rows,
+                "inserted": job.inserted_rows,
+                "updated": job.updated_rows,
+                "unchanged": job.unchanged_rows,
+                "deleted": job.deleted_rows,
+                "duplicates": job.duplicate_rows,
+                "seconds": round(seconds, 3),
+                "rows_per_second": round(job.processed_rows / seconds, 1) if seconds else None,
+                "peak_rss_mb": round(peak_rss_bytes() / (1024 * 1024), 1),
+                "queries": counter["queries"],
+                "products": Product.objects.count(),
+                "stage_stats": job.stage_stats,
+                "batch_tuning": {k: v for k, v in job.batch_tuning.items() if k != "history"},
+            })
+    finally:
+        current_app.conf.task_always_eager = eager
+
+    return {"vendor": connection.vendor, "results": results}
+
+
+def run_benchmark(
+    path: str, engines: List[str], runs: int = 1, keep_db: bool = False, validate: bool = False, feed: str = "",
+    mode: str = "import",
+) -> List[Dict]:
+    """
+    Serve ``path`` from a local object server and import it once per engine
+    (``runs`` times each) into a fresh test database; with ``validate``, a
+    dry run is timed first, and with ``feed`` imports are deltas of that feed.
+    ``mode`` is the mode of the timed imports (import or replace).
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    file_key = os.path.basename(path)
+    results = []
+
+    with ObjectServer(directory) as server, server.as_r2(), benchmark_database(keep=keep_db):
+        if validate:
+            results.extend(run_import(file_key, "", 1, mode="validate")["results"])
+        for engine in engines:
+            results.extend(run_import(file_key, engine, runs, mode=mode, feed=feed)["results"])
+
+    for result in results:
+        result["vendor"] = connection.vendor
+    return results
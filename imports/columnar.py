@@ -0,0 +1,179 @@
+# imports/columnar.py
+"""
+Parquet / Arrow IPC input for product imports.
+
+Files are read one record batch at a time with pyarrow; text columns are
+trimmed and filtered (empty SKUs dropped) with pyarrow.compute before the
+batch goes through the shared column normalization in imports.normalize.
+
+pyarrow is optional: CSV imports work without it.
+"""
+from typing import Callable, Iterator, List, Optional
+
+from django.conf import settings
+
+from imports.normalize import ProductRow, normalize_columns
+
+try:
+    import pyarrow
+    import pyarrow.compute as pc
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # optional, only needed for Parquet/Arrow uploads
+    pyarrow = None
+
+
+FORMAT_CSV = "csv"
+FORMAT_PARQUET = "parquet"
+FORMAT_ARROW = "arrow"
+
+# object key suffix -> format
+FORMAT_SUFFIXES = {
+    ".csv": FORMAT_CSV,
+    ".csv.gz": FORMAT_CSV,
+    ".csv.zst": FORMAT_CSV,
+    ".parquet": FORMAT_PARQUET,
+    ".arrow": FORMAT_ARROW,
+    ".arrows": FORMAT_ARROW,
+    ".feather": FORMAT_ARROW,
+}
+
+# content type -> format
+FORMAT_CONTENT_TYPES = {
+    "text/csv": FORMAT_CSV,
+    "application/vnd.apache.parquet": FORMAT_PARQUET,
+    "application/x-parquet": FORMAT_PARQUET,
+    "application/vnd.apache.arrow.file": FORMAT_ARROW,
+    "application/vnd.apache.arrow.stream": FORMAT_ARROW,
+}
+
+# Uploads of each columnar format: (object key suffix, content type)
+UPLOAD_FORMATS = {
+    FORMAT_PARQUET: (".parquet", "application/vnd.apache.parquet"),
+    FORMAT_ARROW: (".arrow", "application/vnd.apache.arrow.file"),
+}
+
+
+def detect_file_format(file_key: str = "", content_type: str = "") -> Optional[str]:
+    """
+    Format of an import file from its object key, else its content type.
+    Returns None if neither says.
+    """
+    for suffix, file_format in FORMAT_SUFFIXES.items():
+        if file_key.lower().endswith(suffix):
+            return file_format
+    return FORMAT_CONTENT_TYPES.get((content_type or "").split(";")[0].strip().lower())
+
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise ValueError("Parquet/Arrow imports require the 'pyarrow' package")
+
+
+class RecordBatchFile:
+    """
+    Record batches of a downloaded Parquet or Arrow IPC file.
+
+    ``source`` must be seekable (both formats keep their metadata in a
+    footer). Arrow IPC *stream* files are accepted as well as the file format.
+    """
+
+    def __init__(self, source, file_format: str):
+        _require_pyarrow()
+        self.file_format = file_format
+
+        if file_format == FORMAT_PARQUET:
+            self._parquet = pyarrow.parquet.ParquetFile(source)
+            self.num_rows = self._parquet.metadata.num_rows
+            self.column_names = self._parquet.schema_arrow.names
+            return
+
+        # The IPC footer doesn't carry row counts, so the total is only known
+        # once every batch has been read.
+        self._parquet = None
+        self.num_rows = None
+        try:
+            self._ipc = pyarrow.ipc.open_file(source)
+        except pyarrow.ArrowInvalid:
+            source.seek(0)
+            self._ipc = pyarrow.ipc.open_stream(source)
+        self.column_names = self._ipc.schema.names
+
+    def _batches(self, read_size: int):
+        if self._parquet is not None:
+            columns = [name for name in ("sku", "name", "description", "active") if name in self.column_names]
+            yield from self._parquet.iter_batches(batch_size=read_size, columns=columns)
+        elif isinstance(self._ipc, pyarrow.ipc.RecordBatchFileReader):
+            for i in range(self._ipc.num_record_batches):
+                yield self._ipc.get_batch(i)
+        else:
+            yield from self._ipc
+
+    def iter_batches(self, batch_size: Callable[[], int], skip_rows: int = 0) -> Iterator["pyarrow.RecordBatch"]:
+        """
+        Yield record batches of at most ``batch_size()`` rows (re-read for
+        every batch, so the size can adapt), starting ``skip_rows`` rows into
+        the file (for resuming).
+        """
+        for batch in self._batches(settings.IMPORT_BATCH_MAX):
+            if skip_rows >= batch.num_rows:
+                skip_rows -= batch.num_rows
+                continue
+            if skip_rows:
+                batch = batch.slice(skip_rows)
+                skip_rows = 0
+
+            start = 0
+            while start < batch.num_rows:
+                size = batch_size()
+                yield batch.slice(start, size)
+                start += size
+
+
+def _text_column(batch, name: str):
+    """
+    A string column with nulls as "" and surrounding whitespace trimmed.
+    Missing columns are all "".
+    """
+    index = batch.schema.get_field_index(name)
+    if index == -1:
+        return pyarrow.array([""] * batch.num_rows, type=pyarrow.string())
+    column = pc.cast(batch.column(index), pyarrow.string())
+    return pc.utf8_trim_whitespace(pc.fill_null(column, ""))
+
+
+def text_columns(batch, names) -> List[List[str]]:
+    """
+    Trimmed text columns of a record batch as Python lists (missing columns
+    are all "").
+    """
+    _require_pyarrow()
+    return [_text_column(batch, name).to_pylist() for name in names]
+
+
+def normalize_record_batch(batch) -> List[ProductRow]:
+    """
+    Normalize a record batch into product tuples: text columns are trimmed
+    and filtered with pyarrow.compute, then hashed like any other batch.
+
+    An ``active`` column is honoured when the file has one (nulls count as
+    active); otherwise products default to active, as for CSV.
+    """
+    _require_pyarrow()
+
+    sku = _text_column(batch, "sku")
+    keep = pc.not_equal(sku, "")
+
+    index = batch.schema.get_field_index("active")
+    actives = None
+    if index != -1:
+        active = pc.fill_null(pc.cast(batch.column(index), pyarrow.bool_()), True)
+        actives = pc.filter(active, keep).to_pylist()
+
+    return normalize_columns(
+        pc.filter(sku, keep).to_pylist(),
+        pc.filter(_text_column(batch, "name"), keep).to_pylist(),
+        pc.filter(_text_column(batch, "description"), keep).to_pylist(),
+        actives,
+        strip=False,
+    )
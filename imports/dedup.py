@@ -0,0 +1,66 @@
+# imports/dedup.py
+"""
+SKU deduplication ahead of the database, keyed on sku_norm.
+
+- Within a batch the last row for a sku_norm wins, as it would if the rows
+  were written one by one. This is also what makes a set-based upsert
+  possible at all: PostgreSQL refuses an INSERT ... ON CONFLICT DO UPDATE
+  that would touch the same row twice ("cannot affect row a second time").
+- Across batches, a row that repeats the content last written for its
+  sku_norm earlier in the same pass is dropped: writing it again would
+  change nothing. The last-written content is remembered per sku_norm as a
+  pair of 64-bit ints, for at most IMPORT_DEDUP_SEEN_MAX SKUs; past that,
+  new SKUs simply aren't tracked, which costs writes but never correctness.
+
+Collapsed rows are reported as "duplicate".
+"""
+from typing import Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from imports.normalize import CONTENT_HASH, SKU_NORM, ProductRow
+
+
+def dedupe_batch(rows: List[ProductRow]) -> List[ProductRow]:
+    """
+    Keep the last row of each sku_norm in the batch, in first-seen order.
+    """
+    latest = {row[SKU_NORM]: row for row in rows}
+    if len(latest) == len(rows):
+        return rows
+    return list(latest.values())
+
+
+class SeenRows:
+    """
+    Last content hash written per sku_norm during one pass or chunk.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = settings.IMPORT_DEDUP_SEEN_MAX if max_size is None else max_size
+        # hash(sku_norm) -> leading 64 bits of the content hash
+        self._last: Dict[int, int] = {}
+
+    def collapse(self, rows: List[ProductRow]) -> Tuple[List[ProductRow], int]:
+        """
+        Dedupe a normalized batch; returns (rows to write, rows collapsed).
+        """
+        unique = dedupe_batch(rows)
+        if not self.max_size:
+            return unique, len(rows) - len(unique)
+
+        last = self._last
+        room = self.max_size - len(last)
+        keep = []
+        for row in unique:
+            key = hash(row[SKU_NORM])
+            content = int(row[CONTENT_HASH][:16], 16)
+            previous = last.get(key)
+            if previous == content:
+                continue
+            if previous is not None or room > 0:
+                if previous is None:
+                    room -= 1
+                last[key] = content
+            keep.append(row)
+        return keep, len(rows) - len(keep)
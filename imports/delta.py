@@ -0,0 +1,191 @@
+# imports/delta.py
+"""
+Delta imports of recurring feeds (ImportJob.feed).
+
+Each feed keeps a snapshot of what its imports wrote: sku_norm -> leading
+60 bits of the row's content hash (FeedSnapshotRow). A delta import loads
+the snapshot into memory (about 100 bytes per SKU, keyed like
+imports.dedup), joined with the catalog in the same query: an entry only
+counts if its product still exists with that content hash. Products
+deleted, edited or deactivated by other means since (product views,
+replace or sync imports, other feeds, a shell) are written again like new
+rows. Then every normalized batch is diffed against it:
+
+- rows whose hash matches the snapshot are dropped before the database
+  and counted as unchanged;
+- added and changed rows are written, and their snapshot rows upserted in
+  the same transaction, so a failed run leaves a consistent snapshot and
+  the next attempt finds the committed rows unchanged;
+- once the file is done, the SKUs of the snapshot the file no longer lists
+  are dropped from the snapshot. Only when the job asks for it (sync=delete
+  or sync=deactivate) are their products deleted or deactivated too, except
+  those another feed's snapshot still holds. As for sync imports, nothing
+  is removed when the import rejected rows or the file lists fewer than
+  IMPORT_SYNC_MIN_RATIO x the feed's SKUs.
+"""
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+
+from imports.models import FeedSnapshotRow, ImportJob
+from imports.normalize import CONTENT_HASH, SKU_NORM, ProductRow
+from imports.sync import remove_products
+from products.models import Product
+
+logger = logging.getLogger(__name__)
+
+# sku_norm values per removal statement
+REMOVE_CHUNK = 1000
+
+# Pending value of a snapshot entry whose product no longer matches it;
+# never equal to a row_hash, so the row is written if the file lists it
+STALE = -1
+
+SNAPSHOT_SQL = f"""
+    SELECT s.sku_norm, s.row_hash, p.content_hash
+    FROM {FeedSnapshotRow._meta.db_table} s
+    LEFT JOIN {Product._meta.db_table} p ON p.sku_norm = s.sku_norm
+    WHERE s.feed = %s
+"""
+
+
+def row_hash(row: ProductRow) -> int:
+    """
+    Leading 60 bits of the content hash (fits a signed bigint).
+    """
+    return int(row[CONTENT_HASH][:15], 16)
+
+
+def update_snapshot(feed: str, rows: List[ProductRow]):
+    """
+    Upsert the snapshot rows of a written batch.
+    """
+    if not rows:
+        return
+
+    if connection.vendor == "postgresql":
+        # One statement over two arrays, instead of a parameter per value
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {FeedSnapshotRow._meta.db_table} (feed, sku_norm, row_hash)
+                SELECT %s, sku_norm, row_hash FROM unnest(%s::text[], %s::bigint[]) AS s (sku_norm, row_hash)
+                ON CONFLICT (feed, sku_norm) DO UPDATE SET row_hash = EXCLUDED.row_hash
+                """,
+                [feed, [row[SKU_NORM] for row in rows], [row_hash(row) for row in rows]],
+            )
+    else:
+        FeedSnapshotRow.objects.bulk_create(
+            [FeedSnapshotRow(feed=feed, sku_norm=row[SKU_NORM], row_hash=row_hash(row)) for row in rows],
+            update_conflicts=True,
+            unique_fields=["feed", "sku_norm"],
+            update_fields=["row_hash"],
+        )
+
+
+def snapshot_writer(feed: str, write_batch: Callable) -> Callable:
+    """
+    Wrap a batch writer so that every batch it writes also updates the
+    feed's snapshot.
+    """
+    def write(rows: List[ProductRow]) -> Dict[str, int]:
+        counts = write_batch(rows)
+        update_snapshot(feed, rows)
+        return counts
+
+    return write
+
+
+class FeedSnapshot:
+    """
+    The snapshot of one feed, as loaded when a delta import starts. SKUs are
+    crossed off as the file lists them; what is left at the end was removed.
+    """
+
+    def __init__(self, feed: str):
+        self.feed = feed
+        # hash(sku_norm) -> row_hash (or STALE), for SKUs the file hasn't
+        # listed yet
+        self._pending: Dict[int, int] = {}
+        self.stale = 0
+
+        with connection.cursor() as cursor:
+            cursor.execute(SNAPSHOT_SQL, [feed])
+            while True:
+                entries = cursor.fetchmany(10000)
+                if not entries:
+                    break
+                for sku_norm, value, current in entries:
+                    if not current or int(current[:15], 16) != value:
+                        value = STALE
+                        self.stale += 1
+                    self._pending[hash(sku_norm)] = value
+        self.size = len(self._pending)
+
+    @classmethod
+    def for_job(cls, job: ImportJob) -> Optional["FeedSnapshot"]:
+        """
+        The feed's snapshot for a delta import, None for other jobs.
+        """
+        if not job.feed or job.mode != ImportJob.MODE_IMPORT:
+            return None
+        snapshot = cls(job.feed)
+        logger.info(
+            "Job %s: diffing against %d SKUs of feed %r (%d changed in the catalog since)",
+            job.id, snapshot.size, job.feed, snapshot.stale,
+        )
+        return snapshot
+
+    def diff(self, rows: List[ProductRow]) -> Tuple[List[ProductRow], int]:
+        """
+        Drop the rows of a (deduplicated) batch that match the snapshot;
+        returns (rows to write, rows unchanged).
+        """
+        pending = self._pending
+        keep = [row for row in rows if pending.pop(hash(row[SKU_NORM]), None) != row_hash(row)]
+        return keep, len(rows) - len(keep)
+
+    def remove_missing(self, action: str = "", rejected: int = 0) -> Dict[str, int]:
+        """
+        Drop the snapshot SKUs the file didn't list. With an ``action``
+        (ImportJob.SYNC_DELETE / SYNC_DEACTIVATE), also delete or deactivate
+        their products, unless another feed's snapshot still holds them;
+        not if the import ``rejected`` rows, which may be those SKUs.
+        Returns the deleted/deactivated count.
+        """
+        if action and rejected:
+            raise ValueError(
+                f"Delta aborted: {rejected} rows of the file were rejected and may be SKUs of feed '{self.feed}'"
+            )
+        listed = self.size - len(self._pending)
+        min_ratio = settings.IMPORT_SYNC_MIN_RATIO
+        if action and self.size and listed < self.size * min_ratio:
+            raise ValueError(
+                f"Delta aborted: the file lists {listed} of the {self.size} SKUs of feed "
+                f"'{self.feed}', fewer than {min_ratio:.0%}"
+            )
+
+        snapshot = FeedSnapshotRow.objects.filter(feed=self.feed)
+        missing = [
+            sku_norm
+            for sku_norm in snapshot.values_list("sku_norm", flat=True).iterator(chunk_size=10000)
+            if hash(sku_norm) in self._pending
+        ]
+
+        other_feeds = FeedSnapshotRow.objects.filter(sku_norm=OuterRef("sku_norm")).exclude(feed=self.feed)
+        counts = {}
+        with transaction.atomic():
+            for start in range(0, len(missing), REMOVE_CHUNK):
+                chunk = missing[start:start + REMOVE_CHUNK]
+                if action:
+                    products = Product.objects.filter(sku_norm__in=chunk).exclude(Exists(other_feeds))
+                    for key, value in remove_products(products, action).items():
+                        counts[key] = counts.get(key, 0) + value
+                snapshot.filter(sku_norm__in=chunk).delete()
+        self._pending.clear()
+
+        logger.info("Feed %r: %d SKUs dropped %s", self.feed, len(missing), counts)
+        return counts
@@ -0,0 +1,169 @@
+# imports/idempotency.py
+"""
+Keeping repeated uploads and redelivered tasks from importing twice.
+
+- Repeated content: start_import_job records the object's ETag and size on
+  the job. If a completed job with the same mode, sync option and feed
+  imported the same content, and the catalog is still exactly as that job
+  left it, the new job is completed as its duplicate without reading the
+  file (``force`` imports it anyway). "As that job left it" is the catalog
+  version stored at completion: the product count plus the newest
+  updated_at, which every insert, update and delete changes.
+- Redelivered tasks: an import or chunk task holds a Redis lock
+  (TaskLock) while it runs. A copy of the task delivered again while the
+  first still runs (visibility timeout, worker restart) finds the lock
+  taken and retries later, at most IMPORT_TASK_LOCK_MAX_RETRIES times; by
+  then the job is usually complete, and a completed job is never imported
+  again by the same task. When Redis can't be reached, tasks run without
+  the lock instead of waiting for it. Refreshing and releasing check the
+  lock's token and act on it in one Lua script, so a worker whose lock
+  expired can't extend or delete the lock another worker took since.
+"""
+import logging
+import uuid
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from redis.exceptions import RedisError
+
+from imports.models import ImportJob
+from products.models import Product
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] is the lock, ARGV[1] the (encoded) token of its holder
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+REFRESH_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("expire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def catalog_version() -> str:
+    """
+    Cheap fingerprint of the whole catalog: "<count>:<newest updated_at>".
+    """
+    state = Product.objects.aggregate(rows=Count("id"), modified=Max("updated_at"))
+    modified = state["modified"].isoformat() if state["modified"] else ""
+    return f"{state['rows']}:{modified}"
+
+
+def find_unchanged_import(job: ImportJob) -> Optional[ImportJob]:
+    """
+    The latest completed job that imported the same content as ``job`` (same
+    mode, sync option and feed), if the catalog hasn't been modified since.
+    """
+    if not job.content_etag:
+        return None
+
+    previous = (
+        ImportJob.objects.filter(
+            status=ImportJob.STATUS_COMPLETED,
+            mode=job.mode,
+            sync_missing=job.sync_missing,
+            feed=job.feed,
+            content_etag=job.content_etag,
+            content_size=job.content_size,
+        )
+        .exclude(pk=job.pk)
+        .exclude(catalog_version="")
+        .order_by("-updated_at")
+        .first()
+    )
+    if previous is None or previous.catalog_version != catalog_version():
+        return None
+    return previous
+
+
+def copy_outcome(job: ImportJob, previous: ImportJob):
+    """
+    Fill in ``job`` as a repeat of ``previous``: the same rows, all unchanged.
+    """
+    job.duplicate_of = previous
+    job.clear_checkpoint()
+    job.set_result_counts({
+        "unchanged": previous.inserted_rows + previous.updated_rows + previous.unchanged_rows,
+        "rejected": previous.rejected_rows,
+        "duplicate": previous.duplicate_rows,
+    })
+    job.reject_files = previous.reject_files
+    job.processed_rows = job.total_rows = previous.processed_rows
+    job.processed_bytes = job.total_bytes = previous.total_bytes or job.content_size or 0
+    job.batch_tuning = {}
+    job.stage_stats = {}
+
+
+class TaskLock:
+    """
+    A Redis lock that expires IMPORT_TASK_LOCK_SECONDS after its last refresh,
+    so the lock of a worker that died doesn't outlive it for long.
+    """
+
+    def __init__(self, name: str):
+        self.key = f"imports:lock:{name}"
+        self.token = uuid.uuid4().hex
+        self.held = False
+
+    def acquire(self) -> bool:
+        """
+        Take the lock; False if another task holds it.
+
+        With IGNORE_EXCEPTIONS, django-redis answers add() with False when
+        Redis is down, as if the lock were taken. A lock that can't be read
+        back either is treated as a cache failure: the task runs unlocked.
+        """
+        self.held = cache.add(self.key, self.token, settings.IMPORT_TASK_LOCK_SECONDS)
+        if not self.held and cache.get(self.key) is None:
+            logger.warning("Task lock %s unavailable (cache unreachable?), running without it", self.key)
+            return True
+        return self.held
+
+    def refresh(self):
+        """
+        Extend the lock if it is still ours. A lock that expired and was
+        taken by another task is left alone and no longer counts as held.
+        """
+        if not self.held:
+            return
+        ours = self._if_ours(REFRESH_SCRIPT, settings.IMPORT_TASK_LOCK_SECONDS)
+        if ours is None:
+            ours = cache.get(self.key) == self.token and cache.touch(self.key, settings.IMPORT_TASK_LOCK_SECONDS)
+        if not ours:
+            logger.warning("Task lock %s is no longer ours (expired, or the cache is unreachable)", self.key)
+            self.held = False
+
+    def release(self):
+        """
+        Delete the lock if it is still ours, not one taken after ours expired.
+        """
+        if self.held and self._if_ours(RELEASE_SCRIPT) is None and cache.get(self.key) == self.token:
+            cache.delete(self.key)
+        self.held = False
+
+    def _if_ours(self, script: str, *args) -> Optional[bool]:
+        """
+        Run ``script`` on the lock in Redis, which compares the stored token
+        with ours and acts in one step. None when the cache isn't Redis
+        (tests use locmem, which one process owns), so the caller checks and
+        acts through the cache API instead; a Redis error counts as not ours
+        and the lock is left to expire.
+        """
+        get_client = getattr(getattr(cache, "client", None), "get_client", None)
+        if get_client is None:
+            return None
+        try:
+            client = get_client(write=True)
+            run = client.register_script(script)
+            return bool(run(keys=[cache.client.make_key(self.key)], args=[cache.client.encode(self.token), *args]))
+        except RedisError:
+            logger.warning("Task lock %s unavailable (cache unreachable?)", self.key, exc_info=True)
+            return False
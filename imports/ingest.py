@@ -0,0 +1,157 @@
+# imports/ingest.py
+"""
+Ingest engines that write normalized product rows into products_product.
+
+- ``orm``:  Django bulk_create(update_conflicts=True). Works on every backend
+            and is the SQLite/dev fallback.
+- ``copy``: PostgreSQL only. Streams the batch into a temporary staging table
+            with COPY FROM STDIN and merges it with one set-based
+            INSERT ... ON CONFLICT (sku_norm).
+"""
+import csv
+import io
+import logging
+from typing import List, Dict
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from imports.models import ImportJob
+from imports.normalize import CONTENT_HASH, SKU_NORM, ProductRow
+from products.models import Product
+
+logger = logging.getLogger(__name__)
+
+STAGING_TABLE = "import_products_staging"
+
+
+def resolve_ingest_engine(engine: str = "") -> str:
+    """
+    Turn a job's (possibly blank) ingest_engine into the engine to actually use.
+
+    Blank falls back to settings.IMPORT_INGEST_ENGINE; "auto" picks COPY on
+    PostgreSQL and the ORM everywhere else.
+    """
+    engine = engine or getattr(settings, "IMPORT_INGEST_ENGINE", ImportJob.ENGINE_AUTO)
+    is_postgres = connection.vendor == "postgresql"
+
+    if engine == ImportJob.ENGINE_AUTO:
+        return ImportJob.ENGINE_COPY if is_postgres else ImportJob.ENGINE_ORM
+
+    if engine == ImportJob.ENGINE_COPY and not is_postgres:
+        logger.warning("COPY ingest requires PostgreSQL, falling back to ORM on %s", connection.vendor)
+        return ImportJob.ENGINE_ORM
+
+    return engine
+
+
+def upsert_products_batch(rows: List[ProductRow]) -> Dict[str, int]:
+    """
+    Bulk upsert using Django's bulk_create with update_conflicts.
+
+    ``rows`` are normalized tuples in PRODUCT_FIELDS order. Stored content
+    hashes for the batch are fetched first so that rows which wouldn't change
+    anything are skipped; model instances are only built for the rest.
+    Returns counts of inserted, updated and unchanged rows.
+    """
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    if not rows:
+        return counts
+
+    existing = dict(
+        Product.objects.filter(sku_norm__in=[row[SKU_NORM] for row in rows])
+        .values_list("sku_norm", "content_hash")
+    )
+
+    changed = [row for row in rows if existing.get(row[SKU_NORM]) != row[CONTENT_HASH]]
+    counts["unchanged"] = len(rows) - len(changed)
+    counts["updated"] = sum(1 for row in changed if row[SKU_NORM] in existing)
+    counts["inserted"] = len(changed) - counts["updated"]
+
+    if changed:
+        # Django 4.1+ feature
+        Product.objects.bulk_create(
+            [
+                Product(
+                    sku=sku,
+                    sku_norm=sku_norm,        # computed in the normalize stage
+                    name=name,
+                    description=description,
+                    active=active,
+                    content_hash=content_hash,
+                )
+                for sku, sku_norm, name, description, active, content_hash in changed
+            ],
+            batch_size=None,                    # the whole batch; Django splits only at backend limits
+            update_conflicts=True,
+            unique_fields=["sku_norm"],         # enforce case-insensitive uniqueness
+            update_fields=["sku", "name", "description", "active", "content_hash", "updated_at"],
+        )
+
+    return counts
+
+
+def copy_upsert_products_batch(rows: List[ProductRow]) -> Dict[str, int]:
+    """
+    Bulk upsert via COPY into a temp staging table and one set-based merge.
+
+    The staging table is created once per connection and truncated per batch,
+    so each batch is: COPY -> INSERT ... SELECT ... ON CONFLICT -> COMMIT.
+    Rows whose content hash matches the stored one are left untouched (no dead
+    tuple, no WAL); RETURNING (xmax = 0) tells inserts from updates. Rows
+    are merged in sku_norm order, like every batch (see imports.locking).
+    """
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    if not rows:
+        return counts
+
+    # Tuples are already in staging column order; booleans are written as
+    # True/False, which COPY accepts.
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    buf.seek(0)
+
+    table = Product._meta.db_table
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            CREATE TEMPORARY TABLE IF NOT EXISTS {STAGING_TABLE} (
+                sku text,
+                sku_norm text,
+                name text,
+                description text,
+                active boolean,
+                content_hash text
+            )
+            """
+        )
+        cursor.execute(f"TRUNCATE {STAGING_TABLE}")
+        cursor.copy_expert(
+            f"COPY {STAGING_TABLE} (sku, sku_norm, name, description, active, content_hash) "
+            "FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (sku, sku_norm, name, description, content_hash))",
+            buf,
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {table} AS p (id, sku, sku_norm, name, description, active, content_hash, created_at, updated_at)
+            SELECT gen_random_uuid(), sku, sku_norm, name, description, active, content_hash, now(), now()
+            FROM {STAGING_TABLE}
+            ORDER BY sku_norm
+            ON CONFLICT (sku_norm) DO UPDATE SET
+                sku = EXCLUDED.sku,
+                name = EXCLUDED.name,
+                description = EXCLUDED.description,
+                active = EXCLUDED.active,
+                content_hash = EXCLUDED.content_hash,
+                updated_at = EXCLUDED.updated_at
+            WHERE p.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+            RETURNING (xmax = 0) AS inserted
+            """
+        )
+        written = [inserted for (inserted,) in cursor.fetchall()]
+
+    counts["inserted"] = sum(1 for inserted in written if inserted)
+    counts["updated"] = len(written) - counts["inserted"]
+    counts["unchanged"] = len(rows) - len(written)
+    return counts
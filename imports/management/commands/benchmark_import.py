@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from imports.benchmark import generate_catalog, run_benchmark
+from imports.models import ImportJob
+from imports.stats import STAGES
+
+ENGINES = [ImportJob.ENGINE_ORM, ImportJob.ENGINE_COPY, ImportJob.ENGINE_AUTO]
+MODES = [ImportJob.MODE_IMPORT, ImportJob.MODE_REPLACE]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark product imports end to end against the configured database: serve a "
+        "catalog from a local R2 stand-in, import it into a throwaway test database and "
+        "report throughput, peak RSS and query counts. Point DATABASE_URL at SQLite or "
+        "PostgreSQL to compare backends."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file", help="Existing catalog to import (default: generate one)")
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--duplicate-ratio", type=float, default=0.0)
+        parser.add_argument("--description-length", type=int, default=80)
+        parser.add_argument("--format", choices=["csv", "csv.gz", "parquet"], default="csv")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--engine", action="append", choices=ENGINES, help="Repeatable; default: orm, plus copy on PostgreSQL")
+        parser.add_argument("--mode", choices=MODES, default=ImportJob.MODE_IMPORT, help="'replace' times replace-mode imports (PostgreSQL only; no --engine)")
+        parser.add_argument("--runs", type=int, default=2, help="Imports per engine; runs after the first re-import unchanged data")
+        parser.add_argument("--parallel", action="store_true", help="Use chunked parallel imports (IMPORT_PARALLEL)")
+        parser.add_argument("--validate", action="store_true", help="Also time a validation-only dry run")
+        parser.add_argument("--feed", default="", help="Run delta imports of this feed (runs after the first diff against its snapshot)")
+        parser.add_argument("--json", action="store_true", help="Print results as JSON")
+        parser.add_argument("--keep-db", action="store_true", help="Keep the test database between benchmark runs")
+
+    def handle(self, *args, **options):
+        if options["mode"] == ImportJob.MODE_REPLACE:
+            if options["engine"]:
+                raise CommandError("--engine doesn't apply to --mode replace, which loads with COPY")
+            engines = [""]
+        else:
+            engines = options["engine"] or [ImportJob.ENGINE_ORM] + (
+                [ImportJob.ENGINE_COPY] if connection.vendor == "postgresql" else []
+            )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = options["file"]
+            if path:
+                if not os.path.isfile(path):
+                    raise CommandError(f"No such file: {path}")
+            else:
+                path = os.path.join(tmp, f"catalog.{options['format']}")
+                generate_catalog(
+                    path,
+                    rows=options["rows"],
+                    duplicate_ratio=options["duplicate_ratio"],
+                    description_length=options["description_length"],
+                    seed=options["seed"],
+                )
+            size = os.path.getsize(path)
+
+            # Progress goes to a local-memory cache so Redis isn't needed
+            with override_settings(
+                IMPORT_PARALLEL=options["parallel"],
+                CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+            ):
+                results = run_benchmark(
+                    path, engines, runs=options["runs"], keep_db=options["keep_db"], validate=options["validate"],
+                    feed=options["feed"], mode=options["mode"],
+                )
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{connection.vendor}: {os.path.basename(path)}, {size / (1024 * 1024):.1f} MB")
+        header = f"{'engine':<8} {'run':>3} {'status':<9} {'rows':>9} {'seconds':>8} {'rows/s':>9} {'rss MB':>7} {'queries':>8}  stages"
+        self.stdout.write(header)
+        for r in results:
+            stages = ", ".join(
+                f"{name} {r['stage_stats'].get(f'{name}_seconds', 0):.2f}s" for name in STAGES
+            )
+            self.stdout.write(
+                f"{r['engine']:<8} {r['run']:>3} {r['status']:<9} {r['rows']:>9} {r['seconds']:>8.2f} "
+                f"{r['rows_per_second'] or 0:>9.0f} {r['peak_rss_mb']:>7.1f} {r['queries']:>8}  {stages}"
+            )
+            if r["error"]:
+                self.stdout.write(self.style.ERROR(f"       {r['error']}"))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from imports.benchmark import generate_catalog
+
+
+class Command(BaseCommand):
+    help = "Write a synthetic product catalog (.csv, .csv.gz or .parquet) for import benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Output file; the format follows the suffix")
+        parser.add_argument("--rows", type=int, default=100_000)
+        parser.add_argument("--duplicate-ratio", type=float, default=0.0, help="Share of rows repeating an earlier SKU (0-1)")
+        parser.add_argument("--description-length", type=int, default=80, help="Approximate description length in characters")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        if not 0 <= options["duplicate_ratio"] < 1:
+            raise CommandError("--duplicate-ratio must be in [0, 1)")
+
+        try:
+            size = generate_catalog(
+                options["path"],
+                rows=options["rows"],
+                duplicate_ratio=options["duplicate_ratio"],
+                description_length=options["description_length"],
+                seed=options["seed"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['rows']} rows ({size} bytes) to {options['path']}"))
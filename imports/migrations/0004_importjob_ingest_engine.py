@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imports', '0003_importjob_total_bytes_importjob_processed_bytes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='ingest_engine',
+            field=models.CharField(blank=True, choices=[('auto', 'Auto (COPY on PostgreSQL, ORM elsewhere)'), ('orm', 'ORM bulk upsert'), ('copy', 'PostgreSQL COPY + merge')], max_length=10),
+        ),
+    ]
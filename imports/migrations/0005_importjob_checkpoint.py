@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 11:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imports', '0004_importjob_ingest_engine'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='checkpoint_offset',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='checkpoint_rows',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='checkpoint_batch',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imports', '0005_importjob_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='inserted_rows',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='updated_rows',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='unchanged_rows',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imports', '0006_importjob_result_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='batch_tuning',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imports', '0007_importjob_batch_tuning'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='stage_stats',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imports', '0008_importjob_stage_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='upload_id',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='upload_part_size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imports', '0009_importjob_multipart_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='mode',
+            field=models.CharField(choices=[('import', 'Import'), ('validate', 'Validate only (dry run)')], default='import', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='validation_report',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imports', '0010_importjob_mode_validation_report'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='deleted_rows',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='mode',
+            field=models.CharField(choices=[('import', 'Import'), ('validate', 'Validate only (dry run)'), ('replace', 'Replace the whole catalog')], default='import', max_length=10),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 18:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imports', '0011_importjob_deleted_rows_replace_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='deactivated_rows',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='sync_missing',
+            field=models.CharField(blank=True, choices=[('deactivate', 'Deactivate products missing from the file'), ('delete', 'Delete products missing from the file')], max_length=10),
+        ),
+        migrations.CreateModel(
+            name='ImportSeenSku',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sku_norm', models.CharField(max_length=64)),
+                ('job', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='imports.importjob')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['job', 'sku_norm'], name='imports_seen_job_sku_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imports', '0012_importjob_sync_missing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='rejected_rows',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='reject_files',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imports', '0013_importjob_rejected_rows'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='duplicate_rows',
+            field=models.IntegerField(default=0),
+        ),
+    ]
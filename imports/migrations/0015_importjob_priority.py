@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 21:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imports', '0014_importjob_duplicate_rows'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='priority',
+            field=models.CharField(blank=True, choices=[('fast', 'Fast (no throttling)'), ('background', 'Background (yields to database load)')], max_length=10),
+        ),
+    ]
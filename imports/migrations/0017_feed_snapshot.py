@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('imports', '0016_importjob_content_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='feed',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.CreateModel(
+            name='FeedSnapshotRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feed', models.CharField(max_length=100)),
+                ('sku_norm', models.CharField(max_length=64)),
+                ('row_hash', models.BigIntegerField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('feed', 'sku_norm'), name='imports_snapshot_feed_sku_uniq')],
+            },
+        ),
+    ]
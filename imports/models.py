@@ -1,6 +1,17 @@
 from django.db import models
 
 
+def progress_percent(processed_rows, total_rows, processed_bytes, total_bytes) -> float:
+    """
+    Rows once the total is known, bytes read while the file is still streaming.
+    """
+    if total_rows:
+        return round(processed_rows * 100.0 / total_rows, 2)
+    if total_bytes:
+        return round(min(processed_bytes, total_bytes) * 100.0 / total_bytes, 2)
+    return 0.0
+
+
 class ImportJob(models.Model):
     STATUS_PENDING = "pending"
     STATUS_QUEUED = "queued"
@@ -18,21 +29,177 @@ class ImportJob(models.Model):
         (STATUS_FAILED, "Failed"),
     ]
 
+    ENGINE_AUTO = "auto"
+    ENGINE_ORM = "orm"
+    ENGINE_COPY = "copy"
+
+    ENGINE_CHOICES = [
+        (ENGINE_AUTO, "Auto (COPY on PostgreSQL, ORM elsewhere)"),
+        (ENGINE_ORM, "ORM bulk upsert"),
+        (ENGINE_COPY, "PostgreSQL COPY + merge"),
+    ]
+
+    MODE_IMPORT = "import"
+    MODE_VALIDATE = "validate"
+    MODE_REPLACE = "replace"
+
+    MODE_CHOICES = [
+        (MODE_IMPORT, "Import"),
+        (MODE_VALIDATE, "Validate only (dry run)"),
+        (MODE_REPLACE, "Replace the whole catalog"),
+    ]
+
+    SYNC_DEACTIVATE = "deactivate"
+    SYNC_DELETE = "delete"
+
+    SYNC_CHOICES = [
+        (SYNC_DEACTIVATE, "Deactivate products missing from the file"),
+        (SYNC_DELETE, "Delete products missing from the file"),
+    ]
+
+    PRIORITY_FAST = "fast"
+    PRIORITY_BACKGROUND = "background"
+
+    PRIORITY_CHOICES = [
+        (PRIORITY_FAST, "Fast (no throttling)"),
+        (PRIORITY_BACKGROUND, "Background (yields to database load)"),
+    ]
+
     file_key = models.CharField(max_length=255, blank=True)  # R2 key like imports/<job_id>.csv
+    # Multipart upload in progress for file_key; cleared once it is completed
+    upload_id = models.CharField(max_length=255, blank=True)
+    upload_part_size = models.BigIntegerField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    # blank = use settings.IMPORT_INGEST_ENGINE
+    ingest_engine = models.CharField(max_length=10, choices=ENGINE_CHOICES, blank=True)
+    # validate = dry run: read and check the file, never write products;
+    # replace = the file is the complete catalog (see imports.replace)
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default=MODE_IMPORT)
+    # blank = leave products the file doesn't mention alone (see imports.sync)
+    sync_missing = models.CharField(max_length=10, choices=SYNC_CHOICES, blank=True)
+    # blank = use settings.IMPORT_PRIORITY (see imports.throttle)
+    priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, blank=True)
+    # Recurring feed the upload belongs to: imports of a feed only write
+    # what changed since its last snapshot (see imports.delta)
+    feed = models.CharField(max_length=100, blank=True)
 
     total_rows = models.IntegerField(null=True, blank=True)
     processed_rows = models.IntegerField(default=0)
+
+    # Byte-based progress: total_rows is only known once the file has been read,
+    # so while streaming we report how much of the object has been consumed.
+    total_bytes = models.BigIntegerField(null=True, blank=True)
+    processed_bytes = models.BigIntegerField(default=0)
+
+    # Outcome of the upsert: rows whose content hash matched are left untouched.
+    inserted_rows = models.IntegerField(default=0)
+    updated_rows = models.IntegerField(default=0)
+    unchanged_rows = models.IntegerField(default=0)
+    # Products the file no longer lists: removed (replace mode, sync delete)
+    # or deactivated (sync deactivate)
+    deleted_rows = models.IntegerField(default=0)
+    deactivated_rows = models.IntegerField(default=0)
+    # Rows set aside instead of failing the job (see imports.rejects), and
+    # the reject CSVs uploaded next to file_key (one per pass or chunk)
+    rejected_rows = models.IntegerField(default=0)
+    reject_files = models.JSONField(default=list, blank=True)
+    # Rows collapsed into a later row for the same SKU, or repeating what
+    # was already written for it (see imports.dedup)
+    duplicate_rows = models.IntegerField(default=0)
     error_message = models.TextField(blank=True)
 
+    # Durable checkpoint, written in the same transaction as each batch, so a
+    # retried or redelivered job resumes with a Range request from here.
+    checkpoint_offset = models.BigIntegerField(default=0)
+    checkpoint_rows = models.IntegerField(default=0)
+    checkpoint_batch = models.IntegerField(default=0)
+
+    # Batch sizes picked by the adaptive controller (imports.batching), kept
+    # for tuning: initial/final/min/max size and recent [rows, ms, bytes].
+    batch_tuning = models.JSONField(default=dict, blank=True)
+
+    # Where the time of the latest run went (imports.stats): wall time per
+    # stage (download, parse, normalize, db, wait) plus bytes downloaded,
+    # rows parsed/skipped/written and batches.
+    stage_stats = models.JSONField(default=dict, blank=True)
+
+    # Outcome of a dry run (imports.validation): issue counts plus sample rows
+    validation_report = models.JSONField(default=dict, blank=True)
+
+    # What was imported and what the catalog looked like afterwards, so an
+    # identical upload against an unmodified catalog can be skipped
+    # (see imports.idempotency). duplicate_of is the completed job it repeated.
+    content_etag = models.CharField(max_length=255, blank=True)
+    content_size = models.BigIntegerField(null=True, blank=True)
+    catalog_version = models.CharField(max_length=64, blank=True)
+    duplicate_of = models.ForeignKey("self", null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def progress_percent(self) -> float:
-        if not self.total_rows or self.total_rows == 0:
-            return 0.0
-        return round(self.processed_rows * 100.0 / self.total_rows, 2)
+        return progress_percent(self.processed_rows, self.total_rows, self.processed_bytes, self.total_bytes)
+
+    def result_counts(self) -> dict:
+        return {
+            "inserted": self.inserted_rows,
+            "updated": self.updated_rows,
+            "unchanged": self.unchanged_rows,
+            "deleted": self.deleted_rows,
+            "deactivated": self.deactivated_rows,
+            "rejected": self.rejected_rows,
+            "duplicate": self.duplicate_rows,
+        }
+
+    def set_result_counts(self, counts: dict):
+        self.inserted_rows = counts.get("inserted", 0)
+        self.updated_rows = counts.get("updated", 0)
+        self.unchanged_rows = counts.get("unchanged", 0)
+        self.deleted_rows = counts.get("deleted", 0)
+        self.deactivated_rows = counts.get("deactivated", 0)
+        self.rejected_rows = counts.get("rejected", 0)
+        self.duplicate_rows = counts.get("duplicate", 0)
+
+    def clear_checkpoint(self):
+        """
+        Forget resume state; the counts belong to the checkpointed run too.
+        """
+        self.checkpoint_offset = 0
+        self.checkpoint_rows = 0
+        self.checkpoint_batch = 0
+        self.set_result_counts({})
+        self.reject_files = []
 
     def __str__(self):
         return f"ImportJob {self.id} ({self.status})"
 
+
+class ImportSeenSku(models.Model):
+    """
+    sku_norm values written by a sync job, compared against products once the
+    file is done. Rows are written with their batch and dropped after the sync.
+    """
+
+    # No FK constraint: it would be checked for every COPYed row
+    job = models.ForeignKey(ImportJob, on_delete=models.CASCADE, db_constraint=False, db_index=False, related_name="+")
+    sku_norm = models.CharField(max_length=64)
+
+    class Meta:
+        indexes = [models.Index(fields=["job", "sku_norm"], name="imports_seen_job_sku_idx")]
+
+
+class FeedSnapshotRow(models.Model):
+    """
+    What the last import of a feed wrote for each of its SKUs: sku_norm ->
+    leading 60 bits of the row's content hash. Upserted with each batch of a
+    delta import; rows of SKUs the feed dropped are deleted at the end.
+    """
+
+    feed = models.CharField(max_length=100)
+    sku_norm = models.CharField(max_length=64)
+    row_hash = models.BigIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["feed", "sku_norm"], name="imports_snapshot_feed_sku_uniq"),
+        ]
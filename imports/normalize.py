@@ -0,0 +1,87 @@
+# imports/normalize.py
+"""
+Batch normalization of raw import rows into product tuples.
+
+Normalization works on whole columns of a batch (list comprehensions over
+each column) instead of building a dict per row, and produces plain tuples
+in PRODUCT_FIELDS order, which is what the ingest engines consume.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+from products.models import product_content_hash
+
+# Field order of a normalized product row
+PRODUCT_FIELDS = ("sku", "sku_norm", "name", "description", "active", "content_hash")
+SKU, SKU_NORM, NAME, DESCRIPTION, ACTIVE, CONTENT_HASH = range(len(PRODUCT_FIELDS))
+
+ProductRow = Tuple[str, str, str, str, bool, str]
+
+
+def normalize_columns(
+    skus: Sequence[str],
+    names: Sequence[str],
+    descriptions: Sequence[str],
+    actives: Optional[Sequence[bool]] = None,
+    strip: bool = True,
+) -> List[ProductRow]:
+    """
+    Normalize one batch given as columns: trim text, drop rows without a SKU,
+    derive sku_norm and the content hash.
+
+    ``actives`` defaults to all active (the CSV format has no such column).
+    Pass ``strip=False`` when the columns are already trimmed.
+    """
+    if strip:
+        skus = [sku.strip() for sku in skus]
+        names = [name.strip() for name in names]
+        descriptions = [description.strip() for description in descriptions]
+    if actives is None:
+        actives = [True] * len(skus)
+
+    if not all(skus):
+        keep = [i for i, sku in enumerate(skus) if sku]
+        skus = [skus[i] for i in keep]
+        names = [names[i] for i in keep]
+        descriptions = [descriptions[i] for i in keep]
+        actives = [actives[i] for i in keep]
+
+    sku_norms = [sku.lower() for sku in skus]
+    hashes = [
+        product_content_hash(sku, name, description, active)
+        for sku, name, description, active in zip(skus, names, descriptions, actives)
+    ]
+    return list(zip(skus, sku_norms, names, descriptions, actives, hashes))
+
+
+def csv_column_indexes(fieldnames: Sequence[str]) -> Tuple[Optional[int], ...]:
+    """
+    Positions of the sku, name and description columns in a CSV header
+    (None for a missing column).
+    """
+    positions = {name.strip().lower(): i for i, name in enumerate(fieldnames)}
+    return tuple(positions.get(field) for field in ("sku", "name", "description"))
+
+
+def _column(rows: List[List[str]], index: Optional[int]) -> List[str]:
+    if index is None:
+        return [""] * len(rows)
+    return [row[index] if len(row) > index else "" for row in rows]
+
+
+def normalize_csv_batch(rows: List[List[str]], indexes: Tuple[Optional[int], ...]) -> List[ProductRow]:
+    """
+    Normalize a batch of csv.reader rows; ``indexes`` from csv_column_indexes.
+    """
+    sku_index, name_index, description_index = indexes
+    return normalize_columns(
+        _column(rows, sku_index),
+        _column(rows, name_index),
+        _column(rows, description_index),
+    )
+
+
+def batch_payload_bytes(rows: List[ProductRow]) -> int:
+    """
+    Approximate size of a batch's text data, for batch size control.
+    """
+    return sum(len(row[SKU]) + len(row[NAME]) + len(row[DESCRIPTION]) for row in rows)
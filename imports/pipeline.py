@@ -0,0 +1,136 @@
+# imports/pipeline.py
+"""
+Overlapped import pipeline.
+
+A single-pass import runs as three stages connected by bounded queues:
+
+    reader thread   network chunks off the streamed response
+    parser thread   CSV parsing + column-wise normalization into batches
+    writer          DB upserts, in the task's own thread (it owns the
+                    connection, transactions and checkpoints)
+
+so the next batch is downloaded and parsed while the current one is being
+written. Queues hold at most IMPORT_PIPELINE_DEPTH items, which bounds memory
+and gives back-pressure when the database is the bottleneck. An exception in
+any stage is re-raised in the writer, where the task records it on the job.
+"""
+import queue
+import threading
+from typing import Any, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+
+from imports.stats import StageStats, timed
+
+_DONE = object()
+
+
+class Batch(NamedTuple):
+    """
+    One normalized batch plus where the source stood after reading it.
+
+    ``position`` is opaque to the pipeline; it is handed back to the batch
+    callback once the batch is committed. ``last`` marks the final, partial
+    batch, which the caller commits and reports itself. ``rejects`` holds
+    the errors of source lines that couldn't be parsed, ``duplicates`` the
+    number of rows collapsed by deduplication (imports.dedup) and
+    ``unchanged`` the rows a delta import left out (imports.delta).
+    """
+    rows: List[tuple]
+    position: Any = None
+    last: bool = False
+    rejects: Tuple[str, ...] = ()
+    duplicates: int = 0
+    unchanged: int = 0
+
+
+class _Failure:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def pipeline_enabled() -> bool:
+    return getattr(settings, "IMPORT_PIPELINE", True)
+
+
+def run_in_thread(items: Iterable, name: str, maxsize: int = 0) -> Iterator:
+    """
+    Produce ``items`` on a background thread and yield them from a bounded
+    queue. Errors raised while producing are re-raised here; closing the
+    generator early (consumer failed) stops the producer.
+    """
+    maxsize = maxsize or settings.IMPORT_PIPELINE_DEPTH
+    out: "queue.Queue" = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        iterator = iter(items)
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as exc:  # handed to the consumer
+            put(_Failure(exc))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, name=name, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            item = out.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
+
+
+class PrefetchingResponse:
+    """
+    Wrap a streamed response so its body is read on a background thread,
+    ahead of the consumer.
+    """
+
+    def __init__(self, resp, stats: Optional[StageStats] = None):
+        self.resp = resp
+        self.stats = stats
+        self.headers = getattr(resp, "headers", {})
+
+    def iter_content(self, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        chunks = run_in_thread(self.resp.iter_content(chunk_size=chunk_size), name="import-reader")
+        return timed(chunks, self.stats, "wait")
+
+
+def prefetch(resp, stats: Optional[StageStats] = None):
+    """
+    Reader stage: the response itself, or a prefetching wrapper when the
+    pipeline is enabled. Time the parser spends blocked on it is charged to
+    the ``wait`` stage.
+    """
+    return PrefetchingResponse(resp, stats) if pipeline_enabled() else resp
+
+
+def parse_ahead(batches: Iterable[Batch], stats: Optional[StageStats] = None) -> Iterable[Batch]:
+    """
+    Parser stage: produce ``batches`` on their own thread when the pipeline
+    is enabled. Time the writer spends blocked on it is charged to ``wait``.
+    """
+    if not pipeline_enabled():
+        return batches
+    return timed(run_in_thread(batches, name="import-parser"), stats, "wait")
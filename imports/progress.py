@@ -0,0 +1,155 @@
+# imports/progress.py
+"""
+Live import progress kept in Redis (the Django cache).
+
+Hot counters are updated after every batch without touching the ImportJob
+row; the row itself is only written at stage changes, periodic checkpoints
+and completion. The status endpoint reads from here and falls back to the
+database when there is no live entry (cache flushed, Redis down, old job).
+
+Counters are separate keys so parallel chunk tasks can INCR them atomically.
+"""
+import time
+from typing import Optional
+
+from django.core.cache import cache
+
+from imports.models import ImportJob, progress_percent
+
+PROGRESS_TTL = 24 * 60 * 60  # seconds
+
+COUNTERS = (
+    "processed_rows", "processed_bytes",
+    "inserted_rows", "updated_rows", "unchanged_rows", "deleted_rows", "deactivated_rows",
+    "rejected_rows", "duplicate_rows",
+)
+
+
+def _key(job_id: int, name: str) -> str:
+    return f"imports:job:{job_id}:{name}"
+
+
+def begin(job: ImportJob):
+    """
+    Seed live progress from the job row when a run starts.
+    """
+    cache.set_many({_key(job.id, name): getattr(job, name) for name in COUNTERS}, PROGRESS_TTL)
+    cache.set(_key(job.id, "started"), {"at": time.time(), "rows": job.processed_rows}, PROGRESS_TTL)
+    publish_status(job)
+
+
+def publish_status(job: ImportJob):
+    """
+    Publish the non-counter fields (stage, totals, error) after a stage change.
+    """
+    finished = job.status in (ImportJob.STATUS_COMPLETED, ImportJob.STATUS_FAILED)
+    cache.set(
+        _key(job.id, "state"),
+        {
+            "status": job.status,
+            "total_rows": job.total_rows,
+            "total_bytes": job.total_bytes,
+            "error_message": job.error_message,
+            "mode": job.mode,
+            "validation_report": job.validation_report,
+            "reject_files": job.reject_files,
+            "finished_at": time.time() if finished else None,
+        },
+        PROGRESS_TTL,
+    )
+
+
+def set_counters(job_id: int, **values):
+    cache.set_many({_key(job_id, name): value for name, value in values.items()}, PROGRESS_TTL)
+
+
+def incr_counters(job_id: int, **deltas):
+    """
+    Atomically add to counters; used by chunk tasks running in parallel.
+    """
+    for name, delta in deltas.items():
+        if not delta:
+            continue
+        key = _key(job_id, name)
+        try:
+            cache.incr(key, delta)
+        except ValueError:
+            # Counter expired or was never seeded
+            cache.add(key, 0, PROGRESS_TTL)
+            cache.incr(key, delta)
+
+
+def set_stage_stats(job_id: int, stats: dict):
+    cache.set(_key(job_id, "stats"), stats, PROGRESS_TTL)
+
+
+def clear(job_id: int):
+    cache.delete_many([_key(job_id, name) for name in COUNTERS + ("state", "started", "stats")])
+
+
+def build_status(job_id: int, fields: dict, rate: Optional[float] = None) -> dict:
+    """
+    Shape of the import_job_status response, from live or stored fields.
+    """
+    return {
+        "job_id": job_id,
+        "status": fields["status"],
+        "processed_rows": fields["processed_rows"],
+        "total_rows": fields["total_rows"],
+        "processed_bytes": fields["processed_bytes"],
+        "total_bytes": fields["total_bytes"],
+        "percentage": progress_percent(
+            fields["processed_rows"], fields["total_rows"], fields["processed_bytes"], fields["total_bytes"]
+        ),
+        "rows_per_second": rate,
+        "created": fields["inserted_rows"],
+        "updated": fields["updated_rows"],
+        "unchanged": fields["unchanged_rows"],
+        "deleted": fields["deleted_rows"],
+        "deactivated": fields["deactivated_rows"],
+        "rejected": fields["rejected_rows"],
+        "duplicates": fields["duplicate_rows"],
+        "reject_files": fields.get("reject_files") or [],
+        "error_message": fields["error_message"],
+        "stage_stats": fields.get("stage_stats") or {},
+        "mode": fields.get("mode") or ImportJob.MODE_IMPORT,
+        "validation_report": fields.get("validation_report") or {},
+    }
+
+
+def status_from_job(job: ImportJob) -> dict:
+    fields = {name: getattr(job, name) for name in COUNTERS}
+    fields.update(
+        status=job.status,
+        total_rows=job.total_rows,
+        total_bytes=job.total_bytes,
+        error_message=job.error_message,
+        stage_stats=job.stage_stats,
+        mode=job.mode,
+        validation_report=job.validation_report,
+        reject_files=job.reject_files,
+    )
+    return build_status(job.id, fields)
+
+
+def live_status(job_id: int) -> Optional[dict]:
+    """
+    Status assembled from Redis, or None if there is no live entry.
+    """
+    names = COUNTERS + ("state", "started", "stats")
+    values = cache.get_many([_key(job_id, name) for name in names])
+    if _key(job_id, "state") not in values:
+        return None
+
+    fields = {name: values.get(_key(job_id, name)) or 0 for name in COUNTERS}
+    fields.update(values[_key(job_id, "state")])
+    fields["stage_stats"] = values.get(_key(job_id, "stats"))
+
+    rate = None
+    started = values.get(_key(job_id, "started"))
+    if started:
+        elapsed = (fields["finished_at"] or time.time()) - started["at"]
+        if elapsed > 0:
+            rate = round((fields["processed_rows"] - started["rows"]) / elapsed, 1)
+
+    return build_status(job_id, fields, rate)
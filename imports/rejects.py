@@ -0,0 +1,157 @@
+# imports/rejects.py
+"""
+Row-level rejects: rows that can't be imported are set aside instead of
+failing the whole job.
+
+- CSV lines the parser can't read (csv.Error, e.g. a field over the size
+  limit) are skipped by csv_batches and handed over with their batch.
+- A batch the database refuses because of its data (DataError,
+  IntegrityError, or a value the driver won't send, e.g. a NUL byte) is
+  split in half and each half retried in its own savepoint, recursively,
+  until the offending rows are isolated. The rest of the batch is written.
+  k bad rows in a batch of n cost about 2k * log2(n / k) extra statements,
+  instead of n single-row inserts.
+
+Rejected rows go to a local temporary CSV, capped at
+IMPORT_REJECT_FILE_MAX_ROWS rows (later rejects are only counted), which is
+uploaded to R2 next to the source object when the pass or chunk ends.
+"""
+import csv
+import io
+import logging
+import tempfile
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, transaction
+
+from backend.r2 import upload_fileobj
+from imports.normalize import ProductRow
+
+logger = logging.getLogger(__name__)
+
+REJECT_FIELDS = ("error", "sku", "name", "description", "active")
+
+# Errors caused by the rows of a batch rather than by the database
+ROW_ERRORS = (DataError, IntegrityError)
+
+# psycopg2 raises ValueError for a string parameter with a NUL byte, before
+# sending anything; any other ValueError is a bug and fails the job
+NUL_ERROR = "cannot contain NUL"
+
+# Error messages are cut to their first line and this many characters
+ERROR_LENGTH = 500
+
+
+def reject_file_key(file_key: str, start: int = 0) -> str:
+    """
+    Key of the reject CSV for the pass or chunk that started at ``start``.
+    """
+    return f"{file_key}.rejects.{start}.csv"
+
+
+def is_row_error(error: Exception) -> bool:
+    """
+    Whether the database (or its driver) refused ``error``'s batch because
+    of the rows in it.
+    """
+    if isinstance(error, ValueError):
+        return NUL_ERROR in str(error)
+    return isinstance(error, ROW_ERRORS)
+
+
+def error_text(error) -> str:
+    lines = str(error).strip().splitlines()
+    return (lines[0] if lines else type(error).__name__)[:ERROR_LENGTH]
+
+
+class RejectFile:
+    """
+    Bounded reject CSV for one pass or chunk, spooled to a temporary file.
+    """
+
+    def __init__(self, object_key: str, max_rows: Optional[int] = None):
+        self.object_key = object_key
+        self.max_rows = settings.IMPORT_REJECT_FILE_MAX_ROWS if max_rows is None else max_rows
+        self.count = 0
+        self.written = 0
+        self._file = None
+        self._text = None
+        self._writer = None
+
+    def add(self, error, row: Optional[ProductRow] = None):
+        """
+        Record one rejected row (None for a line that couldn't be parsed).
+        """
+        self.count += 1
+        if self.written >= self.max_rows:
+            return
+
+        if self._file is None:
+            self._file = tempfile.TemporaryFile()
+            self._text = io.TextIOWrapper(self._file, encoding="utf-8", errors="replace", newline="")
+            self._writer = csv.writer(self._text)
+            self._writer.writerow(REJECT_FIELDS)
+
+        sku, name, description, active = (row[0], row[2], row[3], row[4]) if row else ("", "", "", "")
+        self._writer.writerow((error_text(error), sku, name, description, active))
+        self.written += 1
+
+    def upload(self) -> Optional[str]:
+        """
+        Upload the reject CSV, if anything was rejected, and return its key.
+        """
+        if self._file is None:
+            return None
+        try:
+            self._text.flush()
+            self._file.seek(0)
+            upload_fileobj(self.object_key, self._file, content_type="text/csv")
+        finally:
+            self.close()
+
+        if self.count > self.written:
+            logger.warning(
+                "%s: kept %d of %d rejected rows (IMPORT_REJECT_FILE_MAX_ROWS)",
+                self.object_key, self.written, self.count,
+            )
+        return self.object_key
+
+    def close(self):
+        if self._text is not None:
+            self._text.close()
+        self._file = self._text = self._writer = None
+
+
+def isolating_writer(write_batch: Callable, rejects: RejectFile) -> Callable:
+    """
+    Wrap a batch writer so that rows the database refuses are bisected out
+    and rejected; their count is reported as "rejected".
+    """
+    def write(rows: List[ProductRow]) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+
+        def attempt(part: List[ProductRow]):
+            try:
+                with transaction.atomic():
+                    written = write_batch(part)
+            except (*ROW_ERRORS, ValueError) as e:
+                if not is_row_error(e):
+                    raise
+                if len(part) == 1:
+                    rejects.add(e, part[0])
+                    counts["rejected"] = counts.get("rejected", 0) + 1
+                    return
+                middle = len(part) // 2
+                attempt(part[:middle])
+                attempt(part[middle:])
+                return
+            for key, value in written.items():
+                counts[key] = counts.get(key, 0) + value
+
+        attempt(rows)
+        if counts.get("rejected"):
+            logger.warning("Rejected %d of %d rows in a batch", counts["rejected"], len(rows))
+        return counts
+
+    return write
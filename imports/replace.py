@@ -0,0 +1,303 @@
+# imports/replace.py
+"""
+Replace mode: the import file is the complete catalog (PostgreSQL only).
+
+Instead of upserting into the live, indexed products table and deleting
+what the feed no longer lists, a replace import:
+
+1. COPYs every batch into a temporary, index-free load table;
+2. builds a fresh shadow table in one INSERT ... SELECT: the last row wins
+   for each sku_norm, and products that already exist keep their id and
+   created_at (and updated_at when their content hash is unchanged);
+3. builds the live table's indexes and constraints on the shadow once,
+   re-applies its grants and triggers, then validates it (row count, and a
+   guard against a feed that shrank the catalog below
+   IMPORT_REPLACE_MIN_RATIO);
+4. swaps the two tables in one short transaction and drops the old one.
+
+Readers see the old catalog until the swap commits, then the new one, never
+a partial load. Changes made to products through the app while the file is
+loading are overwritten by the swap.
+
+The shadow is created ``LIKE`` the live table ``INCLUDING ALL`` (defaults,
+CHECK and NOT NULL constraints, storage, comments, statistics), indexes
+excepted. Grants and triggers are copied over; triggers don't fire for the
+load itself. Foreign keys can't follow the swap: a replace is refused when
+any table (products included) has one referencing products, and foreign keys
+from products to other tables, row security policies, rules and publication
+membership are not carried over. Views on products make the swap fail.
+"""
+import csv
+import io
+import logging
+import time
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+from imports.normalize import ProductRow
+from products.models import Product
+
+logger = logging.getLogger(__name__)
+
+LOAD_TABLE = "import_replace_load"
+
+# Attempts at taking the exclusive lock for the swap, each bounded by
+# IMPORT_REPLACE_LOCK_TIMEOUT so waiting doesn't queue up readers for long.
+SWAP_ATTEMPTS = 5
+
+
+def require_postgres():
+    if connection.vendor != "postgresql":
+        raise ValueError(f"Replace imports require PostgreSQL (database is {connection.vendor})")
+
+
+def refuse_referenced_table(cursor, table: str):
+    """
+    Refuse to replace ``table`` when foreign keys reference it: they would
+    keep pointing at the old table, which the swap drops.
+    """
+    cursor.execute(
+        """
+        SELECT conrelid::regclass::text || '.' || conname
+        FROM pg_constraint
+        WHERE contype = 'f' AND confrelid = %s::regclass
+        ORDER BY 1
+        """,
+        [table],
+    )
+    references = [name for (name,) in cursor.fetchall()]
+    if references:
+        raise ValueError(
+            f"Replace aborted: {table} is referenced by foreign keys ({', '.join(references)}), "
+            f"which can't be moved to a swapped-in table"
+        )
+
+
+def begin_replace():
+    """
+    Create an empty load table for this connection.
+    """
+    require_postgres()
+    with connection.cursor() as cursor:
+        refuse_referenced_table(cursor, Product._meta.db_table)
+        cursor.execute(f"DROP TABLE IF EXISTS {LOAD_TABLE}")
+        cursor.execute(
+            f"""
+            CREATE TEMPORARY TABLE {LOAD_TABLE} (
+                seq bigserial,
+                sku text,
+                sku_norm text,
+                name text,
+                description text,
+                active boolean,
+                content_hash text
+            )
+            """
+        )
+
+
+def copy_replace_batch(rows: List[ProductRow]) -> Dict[str, int]:
+    """
+    Batch writer of replace mode: COPY the batch into the load table. Counts
+    are only known once the catalog is swapped.
+    """
+    if rows:
+        buf = io.StringIO()
+        csv.writer(buf).writerows(rows)
+        buf.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {LOAD_TABLE} (sku, sku_norm, name, description, active, content_hash) "
+                "FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (sku, sku_norm, name, description, content_hash))",
+                buf,
+            )
+    return {}
+
+
+def _index_statements(cursor, table: str, shadow: str) -> List[Tuple[str, str, str, bool]]:
+    """
+    Statements recreating ``table``'s indexes and index-backed constraints
+    on ``shadow`` under temporary names, as
+    (statement, temporary name, original name, is_constraint).
+    """
+    cursor.execute(
+        """
+        SELECT ic.relname, pg_get_indexdef(i.indexrelid), c.conname, pg_get_constraintdef(c.oid)
+        FROM pg_index i
+        JOIN pg_class ic ON ic.oid = i.indexrelid
+        LEFT JOIN pg_constraint c ON c.conindid = i.indexrelid AND c.conrelid = i.indrelid
+        WHERE i.indrelid = %s::regclass
+        ORDER BY i.indisprimary DESC, ic.relname
+        """,
+        [table],
+    )
+
+    statements = []
+    for n, (index_name, index_def, constraint_name, constraint_def) in enumerate(cursor.fetchall()):
+        temp_name = f"{shadow}_{n}"
+        if constraint_name:
+            statements.append(
+                (f"ALTER TABLE {shadow} ADD CONSTRAINT {temp_name} {constraint_def}", temp_name, constraint_name, True)
+            )
+        else:
+            unique = "UNIQUE " if index_def.startswith("CREATE UNIQUE") else ""
+            method = index_def.split(" USING ", 1)[1]
+            statements.append(
+                (f"CREATE {unique}INDEX {temp_name} ON {shadow} USING {method}", temp_name, index_name, False)
+            )
+    return statements
+
+
+def _grant_statements(cursor, table: str, shadow: str) -> List[str]:
+    """
+    GRANT statements giving ``shadow`` the privileges granted on ``table``.
+    """
+    cursor.execute(
+        """
+        SELECT coalesce(quote_ident(r.rolname), 'PUBLIC'), a.privilege_type, a.is_grantable
+        FROM pg_class c
+        CROSS JOIN LATERAL aclexplode(c.relacl) a
+        LEFT JOIN pg_roles r ON r.oid = a.grantee
+        WHERE c.oid = %s::regclass
+        ORDER BY 1, 2
+        """,
+        [table],
+    )
+    return [
+        f"GRANT {privilege} ON {shadow} TO {grantee}" + (" WITH GRANT OPTION" if grantable else "")
+        for grantee, privilege, grantable in cursor.fetchall()
+    ]
+
+
+def _trigger_statements(cursor, table: str, shadow: str) -> List[str]:
+    """
+    Statements recreating ``table``'s (user-defined) triggers on ``shadow``.
+    Trigger names are per table, so they keep their names.
+    """
+    cursor.execute(
+        """
+        SELECT pg_get_triggerdef(t.oid), quote_ident(n.nspname) || '.' || quote_ident(c.relname)
+        FROM pg_trigger t
+        JOIN pg_class c ON c.oid = t.tgrelid
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE t.tgrelid = %s::regclass AND NOT t.tgisinternal
+        ORDER BY t.tgname
+        """,
+        [table],
+    )
+    return [definition.replace(f" ON {qualified} ", f" ON {shadow} ", 1) for definition, qualified in cursor.fetchall()]
+
+
+def swap_catalog() -> Dict[str, int]:
+    """
+    Build, index and validate the shadow table from the load table, then
+    swap it in. Returns inserted/updated/unchanged/deleted counts.
+
+    On any failure the shadow table is dropped and the live table is left
+    as it was.
+    """
+    require_postgres()
+    table = Product._meta.db_table
+    shadow = f"{table}_shadow"
+    old = f"{table}_replaced"
+    columns = ", ".join(field.column for field in Product._meta.concrete_fields)
+
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {shadow}")
+            cursor.execute(f"CREATE TABLE {shadow} (LIKE {table} INCLUDING ALL EXCLUDING INDEXES)")
+
+            # Step 2: one pass, no indexes to maintain. now() is the
+            # transaction start, so it tells new and rewritten rows apart.
+            started = time.monotonic()
+            cursor.execute(
+                f"""
+                WITH loaded AS (
+                    INSERT INTO {shadow} ({columns})
+                    SELECT
+                        coalesce(p.id, gen_random_uuid()),
+                        l.sku, l.sku_norm, l.name, l.description, l.active, l.content_hash,
+                        coalesce(p.created_at, now()),
+                        CASE WHEN p.content_hash = l.content_hash THEN p.updated_at ELSE now() END
+                    FROM (
+                        SELECT DISTINCT ON (sku_norm) *
+                        FROM {LOAD_TABLE}
+                        ORDER BY sku_norm, seq DESC
+                    ) l
+                    LEFT JOIN {table} p ON p.sku_norm = l.sku_norm
+                    RETURNING created_at, updated_at
+                )
+                SELECT
+                    count(*),
+                    count(*) FILTER (WHERE created_at = now()),
+                    count(*) FILTER (WHERE created_at <> now() AND updated_at = now())
+                FROM loaded
+                """
+            )
+            total, inserted, updated = cursor.fetchone()
+            logger.info("Replace: loaded %d products into %s in %.1fs", total, shadow, time.monotonic() - started)
+
+            # Step 3: indexes once, grants and triggers, then validate
+            started = time.monotonic()
+            indexes = _index_statements(cursor, table, shadow)
+            for statement, _, _, _ in indexes:
+                cursor.execute(statement)
+            cursor.execute(f"ANALYZE {shadow}")
+            logger.info("Replace: built %d indexes in %.1fs", len(indexes), time.monotonic() - started)
+            for statement in _grant_statements(cursor, table, shadow) + _trigger_statements(cursor, table, shadow):
+                cursor.execute(statement)
+
+            cursor.execute(f"SELECT count(*) FROM {shadow}")
+            if cursor.fetchone()[0] != total:
+                raise RuntimeError("Replace aborted: shadow table row count doesn't match the load")
+            cursor.execute(f"SELECT count(*) FROM {table}")
+            current = cursor.fetchone()[0]
+            min_ratio = settings.IMPORT_REPLACE_MIN_RATIO
+            if current and total < current * min_ratio:
+                raise ValueError(
+                    f"Replace aborted: the file has {total} products, fewer than "
+                    f"{min_ratio:.0%} of the current {current}"
+                )
+
+        # Step 4: swap
+        for attempt in range(1, SWAP_ATTEMPTS + 1):
+            try:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL lock_timeout = %s", [f"{settings.IMPORT_REPLACE_LOCK_TIMEOUT}s"])
+                    cursor.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE")
+                    # A foreign key added while the file was loading
+                    refuse_referenced_table(cursor, table)
+                    cursor.execute(f"SELECT count(*) FROM {table}")
+                    current = cursor.fetchone()[0]
+                    cursor.execute(f"ALTER TABLE {table} RENAME TO {old}")
+                    cursor.execute(f"ALTER TABLE {shadow} RENAME TO {table}")
+                    cursor.execute(f"DROP TABLE {old}")
+                    for _, temp_name, name, is_constraint in indexes:
+                        if is_constraint:
+                            cursor.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {temp_name} TO {name}")
+                        else:
+                            cursor.execute(f"ALTER INDEX {temp_name} RENAME TO {name}")
+                break
+            except OperationalError:
+                if attempt == SWAP_ATTEMPTS:
+                    raise
+                logger.warning("Replace: %s is busy, retrying the swap (%d/%d)", table, attempt, SWAP_ATTEMPTS)
+
+    except Exception:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {shadow}")
+        raise
+
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {LOAD_TABLE}")
+
+    unchanged = total - inserted - updated
+    return {
+        "inserted": inserted,
+        "updated": updated,
+        "unchanged": unchanged,
+        "deleted": current - updated - unchanged,
+    }
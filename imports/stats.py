@@ -0,0 +1,117 @@
+# imports/stats.py
+"""
+Per-stage timing of an import run.
+
+Stage times are exclusive: when a stage runs inside another one on the same
+thread (the download inside CSV parsing when the pipeline is off, parsing
+inside the writer's wait for the next batch), the outer stage is paused, so
+the stages add up to the work actually done on each thread. With the
+pipeline on, stages on different threads overlap and their sum can exceed
+the wall time.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+STAGES = ("download", "parse", "normalize", "db", "wait", "throttle")
+COUNTS = ("download_bytes", "rows_parsed", "rows_skipped", "rows_written", "batches", "throttled_batches")
+
+
+class StageStats:
+    """
+    Accumulates ``<stage>_seconds`` and counters, safely across the pipeline
+    threads. ``as_dict()`` is the shape stored in ImportJob.stage_stats.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+        self.counts = dict.fromkeys(COUNTS, 0)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _charge(self, name: str, seconds: float):
+        with self._lock:
+            self.seconds[name] += seconds
+
+    @contextmanager
+    def stage(self, name: str):
+        stack = self._local.__dict__.setdefault("stack", [])
+        now = time.monotonic()
+        if stack:
+            # Pause the enclosing stage
+            outer = stack[-1]
+            self._charge(outer[0], now - outer[1])
+        stack.append([name, now])
+        try:
+            yield
+        finally:
+            now = time.monotonic()
+            name, started = stack.pop()
+            self._charge(name, now - started)
+            if stack:
+                stack[-1][1] = now
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counts[name] += value
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            data = {f"{name}_seconds": round(seconds, 3) for name, seconds in self.seconds.items()}
+            data.update(self.counts)
+        data["total_seconds"] = round(time.monotonic() - self.started, 3)
+        return data
+
+
+def timed(items: Iterable, stats: Optional[StageStats], name: str) -> Iterator:
+    """
+    Iterate ``items``, charging the time spent producing each one to stage
+    ``name``.
+    """
+    if stats is None:
+        yield from items
+        return
+
+    iterator = iter(items)
+    while True:
+        with stats.stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+class TimedResponse:
+    """
+    Wrap a streamed response so network reads are charged to the download
+    stage and counted in download_bytes.
+    """
+
+    def __init__(self, resp, stats: StageStats):
+        self.resp = resp
+        self.stats = stats
+        self.headers = getattr(resp, "headers", {})
+
+    def iter_content(self, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        for chunk in timed(self.resp.iter_content(chunk_size=chunk_size), self.stats, "download"):
+            self.stats.count("download_bytes", len(chunk))
+            yield chunk
+
+
+def merge_stage_stats(stats: List[Dict]) -> Dict:
+    """
+    Sum the stage stats of a parallel job's chunk tasks (total_seconds is
+    the longest chunk).
+    """
+    stats = [item for item in stats if item]
+    if not stats:
+        return {}
+    merged = {key: sum(item.get(key, 0) for item in stats) for key in stats[0] if key != "total_seconds"}
+    for key, value in merged.items():
+        if key.endswith("_seconds"):
+            merged[key] = round(value, 3)
+    merged["total_seconds"] = max(item.get("total_seconds", 0) for item in stats)
+    return merged
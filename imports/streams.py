@@ -0,0 +1,274 @@
+# imports/streams.py
+"""
+Helpers for reading import files straight off a streamed HTTP response:
+line splitting with byte accounting, quote-aware row boundaries for parallel
+chunks, and incremental decompression.
+"""
+import csv
+import re
+import zlib
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:  # optional, only needed for .zst uploads
+    zstandard = None
+
+
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_ZSTD = "zstd"
+
+# object key suffix -> compression
+COMPRESSION_SUFFIXES = {
+    ".gz": COMPRESSION_GZIP,
+    ".zst": COMPRESSION_ZSTD,
+}
+
+COMPRESSION_CONTENT_TYPES = {
+    COMPRESSION_GZIP: "application/gzip",
+    COMPRESSION_ZSTD: "application/zstd",
+}
+
+# What surrogateescape turns undecodable bytes into
+UNDECODABLE = re.compile("[\udc80-\udcff]")
+
+
+def detect_compression(file_key: str) -> Optional[str]:
+    for suffix, compression in COMPRESSION_SUFFIXES.items():
+        if file_key.endswith(suffix):
+            return compression
+    return None
+
+
+class ByteCountingLineReader:
+    """
+    Iterate decoded CSV lines from a streamed response while counting how many
+    bytes of the body have been handed out.
+
+    Lines keep their line terminator so the csv module can handle quoted
+    newlines and CRLF files; ``bytes_read`` therefore always points at the end
+    of the last line consumed by the reader. Bytes that aren't valid UTF-8
+    are decoded as lone surrogates (surrogateescape) rather than failing the
+    stream; the rows carrying them are rejected after parsing (see
+    undecodable_rows).
+    """
+
+    def __init__(self, resp, chunk_size: int = 64 * 1024):
+        self.resp = resp
+        self.chunk_size = chunk_size
+        self.bytes_read = 0
+
+    def __iter__(self):
+        pending = b""
+        for chunk in self.resp.iter_content(chunk_size=self.chunk_size):
+            if not chunk:
+                continue
+            pending += chunk
+            lines = pending.split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                self.bytes_read += len(line) + 1
+                yield line.decode("utf-8", "surrogateescape") + "\n"
+
+        if pending:
+            self.bytes_read += len(pending)
+            yield pending.decode("utf-8", "surrogateescape")
+
+
+def row_ends(block: bytes, final: bool = False) -> Optional[List[int]]:
+    """
+    Parse ``block``, which starts on a row boundary, with the csv module as
+    an import would, and return the offsets in it where rows end. Lines
+    that don't parse end a row too: read_csv_rows rejects them and carries
+    on. A row still inside a quoted field when the block runs out is left
+    out; at the end of the body (``final``) that returns None instead.
+    """
+    lines = block.decode("latin-1").split("\n")
+    last = lines.pop()
+    consumed = 0
+    exhausted = False
+
+    def feed():
+        nonlocal consumed, exhausted
+        for line in lines:
+            consumed += len(line) + 1
+            yield line + "\n"
+        if last:
+            consumed += len(last)
+            yield last
+        exhausted = True
+
+    ends = []
+    reader = csv.reader(feed())
+    while True:
+        try:
+            next(reader)
+        except StopIteration:
+            return ends
+        except csv.Error:
+            pass
+        if exhausted:
+            # Ran out of lines inside a quoted field
+            return None if final else ends
+        ends.append(consumed)
+
+
+def find_row_starts(
+    resp, start: int, offsets: List[int], max_row_bytes: int, chunk_size: int = 1024 * 1024
+) -> Optional[List[int]]:
+    """
+    Scan a streamed CSV body that begins at byte ``start``, on a row
+    boundary, and return for each of the ascending ``offsets`` the offset of
+    the first row that starts at or after it (the end of the body if none
+    does).
+
+    Stretches without quotes end a row at every newline. Elsewhere the csv
+    module finds the rows (row_ends), so newlines inside quoted fields don't
+    start rows while a quote inside an unquoted field (``27" monitor``) is
+    just a character, as in the import itself. Stops reading once every
+    offset is placed. Returns None if the quoting doesn't balance: the body
+    ends inside a quoted field, or one runs longer than ``max_row_bytes``.
+    """
+    starts = []
+    targets = iter(offsets)
+    target = next(targets, None)
+    # ``position`` is where ``pending`` begins, always a row boundary
+    position = start
+    pending = b""
+
+    def place(end: int):
+        nonlocal target
+        while target is not None and target <= end:
+            starts.append(end)
+            target = next(targets, None)
+
+    place(position)
+    for chunk in resp.iter_content(chunk_size=chunk_size):
+        if target is None:
+            return starts
+        if not chunk:
+            continue
+        pending += chunk
+        cut = pending.rfind(b"\n") + 1
+        if not cut:
+            continue
+        block, pending = pending[:cut], pending[cut:]
+
+        if b'"' not in block:
+            while target is not None and target <= position + cut:
+                newline = block.find(b"\n", max(target - position - 1, 0))
+                place(position + newline + 1)
+            position += cut
+            continue
+
+        ends = row_ends(block)
+        for end in ends:
+            place(position + end)
+        done = ends[-1] if ends else 0
+        if cut - done > max_row_bytes:
+            return None
+        # An unfinished row is parsed again with the next chunk
+        position += done
+        pending = block[done:] + pending
+
+    if target is None:
+        return starts
+    if row_ends(pending, final=True) is None:
+        return None
+    place(position + len(pending))
+    return starts
+
+
+def undecodable_rows(rows: List[List[str]]) -> Tuple[List[List[str]], List[str]]:
+    """
+    Split parsed CSV rows into (rows, errors of rows with bytes that weren't
+    valid UTF-8). The whole batch is scanned at once; rows are only looked at
+    one by one when it contains such bytes.
+    """
+    if not rows or not UNDECODABLE.search("".join(map("".join, rows))):
+        return rows, []
+
+    good, errors = [], []
+    for row in rows:
+        text = ",".join(row)
+        if UNDECODABLE.search(text):
+            shown = text.encode("utf-8", "surrogateescape").decode("utf-8", "replace")[:100]
+            errors.append(f"Malformed encoding (not valid UTF-8) in row {shown!r}")
+        else:
+            good.append(row)
+    return good, errors
+
+
+class DecompressingStream:
+    """
+    Wrap a streamed response so ``iter_content()`` yields the decompressed
+    body, one network chunk at a time, keeping memory flat.
+
+    ``bytes_read`` counts compressed bytes taken off the wire, which is what
+    progress is measured against (Content-Length is the compressed size).
+    Concatenated gzip members / zstd frames are decoded back to back. A body
+    that ends inside a member/frame (a truncated upload) raises ValueError
+    rather than importing part of the file.
+    """
+
+    def __init__(self, resp, compression: str):
+        if compression == COMPRESSION_ZSTD and zstandard is None:
+            raise ValueError("zstd-compressed imports require the 'zstandard' package")
+        if compression not in COMPRESSION_CONTENT_TYPES:
+            raise ValueError(f"Unsupported compression '{compression}'")
+
+        self.resp = resp
+        self.compression = compression
+        self.bytes_read = 0
+
+    def _decompressor(self):
+        if self.compression == COMPRESSION_GZIP:
+            return zlib.decompressobj(zlib.MAX_WBITS | 16)
+        return zstandard.ZstdDecompressor().decompressobj()
+
+    def iter_content(self, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        decompressor = self._decompressor()
+        # Whether the current member/frame has been fed any input yet
+        started = False
+        for chunk in self.resp.iter_content(chunk_size=chunk_size):
+            if not chunk:
+                continue
+            self.bytes_read += len(chunk)
+
+            while chunk:
+                data = decompressor.decompress(chunk)
+                started = True
+                if data:
+                    yield data
+                if not decompressor.eof:
+                    break
+                # End of a member/frame: anything left over starts the next one
+                chunk = decompressor.unused_data
+                decompressor = self._decompressor()
+                started = False
+
+        if started:
+            raise ValueError(
+                f"Truncated {self.compression} stream: the upload ends after {self.bytes_read} bytes, "
+                f"in the middle of compressed data"
+            )
+
+
+def skip_lines_until(lines: ByteCountingLineReader, offset: int) -> Iterator[str]:
+    """
+    Yield the header line, then only the lines that end after ``offset``.
+
+    Used to resume compressed imports, where a Range request can't seek into
+    the stream: the file is decompressed again but already-committed rows are
+    not re-parsed or re-written.
+    """
+    iterator = iter(lines)
+    header = next(iterator, None)
+    if header is None:
+        return
+    yield header
+
+    for line in iterator:
+        if lines.bytes_read <= offset:
+            continue
+        yield line
@@ -0,0 +1,117 @@
+# imports/sync.py
+"""
+Catalog sync: deactivate or delete products the import file doesn't list.
+
+While a sync job imports, every batch also records its sku_norm values in
+ImportSeenSku (in the batch's transaction, so resumes and parallel chunks
+stay consistent). Once the whole file is in, one set-based statement with a
+NOT EXISTS anti-join against the recorded values deactivates or deletes
+the products that are missing, and the recorded values are dropped.
+Only the rows that were written are recorded, so a file with rejected rows
+or unreadable lines is never synced: those may be products the feed still
+lists.
+"""
+import csv
+import io
+import logging
+from typing import Callable, Dict, List
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Exists, OuterRef, TextField, Value
+from django.db.models.functions import MD5, Concat, Now
+
+from imports.models import ImportJob, ImportSeenSku
+from imports.normalize import SKU_NORM, ProductRow
+from products.models import Product
+
+logger = logging.getLogger(__name__)
+
+
+def record_seen_skus(job_id: int, rows: List[ProductRow]):
+    """
+    Record the sku_norm values of a written batch.
+    """
+    if not rows:
+        return
+
+    if connection.vendor == "postgresql":
+        buf = io.StringIO()
+        csv.writer(buf).writerows((job_id, row[SKU_NORM]) for row in rows)
+        buf.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {ImportSeenSku._meta.db_table} (job_id, sku_norm) FROM STDIN WITH (FORMAT csv)", buf
+            )
+    else:
+        ImportSeenSku.objects.bulk_create([ImportSeenSku(job_id=job_id, sku_norm=row[SKU_NORM]) for row in rows])
+
+
+def recording_writer(job_id: int, write_batch: Callable) -> Callable:
+    """
+    Wrap a batch writer so that every batch it writes is also recorded.
+    """
+    def write(rows: List[ProductRow]) -> Dict[str, int]:
+        counts = write_batch(rows)
+        record_seen_skus(job_id, rows)
+        return counts
+
+    return write
+
+
+def sync_missing_products(job: ImportJob) -> Dict[str, int]:
+    """
+    Deactivate or delete (per job.sync_missing) every product whose sku_norm
+    the job didn't record, in one statement. Returns the
+    deactivated/deleted count.
+
+    Refuses to run, leaving the catalog as the import wrote it, when the
+    import rejected rows or when the file lists fewer than
+    IMPORT_SYNC_MIN_RATIO x the current product count (an empty or
+    truncated feed). The recorded values are then kept along with the job's
+    checkpoint, so a resumed job still knows every row it wrote.
+    """
+    if job.rejected_rows:
+        raise ValueError(
+            f"Sync aborted: {job.rejected_rows} rows of the file were rejected and may be products it still lists"
+        )
+
+    seen = ImportSeenSku.objects.filter(job_id=job.id)
+    current = Product.objects.count()
+    listed = Product.objects.filter(Exists(seen.filter(sku_norm=OuterRef("sku_norm")))).count()
+    min_ratio = settings.IMPORT_SYNC_MIN_RATIO
+    if current and listed < current * min_ratio:
+        raise ValueError(
+            f"Sync aborted: the file lists {listed} of {current} products, fewer than {min_ratio:.0%}"
+        )
+
+    missing = Product.objects.filter(~Exists(seen.filter(sku_norm=OuterRef("sku_norm"))))
+    counts = remove_products(missing, job.sync_missing)
+    seen.delete()
+
+    logger.info("Job %s: sync %s %s", job.id, job.sync_missing, counts)
+    return counts
+
+
+def remove_products(products, action: str) -> Dict[str, int]:
+    """
+    Delete or deactivate (ImportJob.SYNC_DELETE / SYNC_DEACTIVATE) the
+    products of a queryset in one statement; returns the count.
+    """
+    if action == ImportJob.SYNC_DELETE:
+        # No signals or relations on Product, so this is a single DELETE
+        deleted, _ = products.delete()
+        return {"deleted": deleted}
+
+    # Same payload as products.models.product_content_hash()
+    deactivated = products.filter(active=True).update(
+        active=False,
+        content_hash=MD5(
+            Concat(
+                "sku", Value("\x1f"), "name", Value("\x1f"), "description", Value("\x1f0"),
+                output_field=TextField(),
+            )
+        ),
+        updated_at=Now(),
+    )
+    return {"deactivated": deactivated}
@@ -1,148 +1,960 @@
 # imports/tasks.py
 import csv
 import logging
-from typing import List, Dict
+import math
+import tempfile
+import time
+from typing import Any, Callable, Iterable, Iterator, List, Dict, Optional, Tuple
 from django.utils import timezone
 from webhooks.tasks import dispatch_webhooks_for_event
 
 import requests
-from celery import shared_task
-from django.db import connection
+from celery import chord, shared_task
+from django.conf import settings
+from django.db import connection, transaction
 
+from imports import progress
 from imports.models import ImportJob
-from products.models import Product
-from backend.r2 import generate_presigned_get_url  # or wherever your R2 helper lives
+from imports.ingest import resolve_ingest_engine, upsert_products_batch, copy_upsert_products_batch
+from imports.batching import BatchSizeController, merge_batch_tuning
+from imports.pipeline import Batch, parse_ahead, prefetch
+from imports.stats import StageStats, TimedResponse, merge_stage_stats, timed
+from imports.normalize import batch_payload_bytes, csv_column_indexes, normalize_csv_batch
+from imports.columnar import FORMAT_CSV, RecordBatchFile, detect_file_format, normalize_record_batch, text_columns
+from imports.validation import ValidationReport, csv_sku_name_columns
+from imports.replace import begin_replace, copy_replace_batch, swap_catalog
+from imports.sync import recording_writer, sync_missing_products
+from imports.rejects import RejectFile, error_text, isolating_writer, reject_file_key
+from imports.dedup import SeenRows
+from imports.delta import FeedSnapshot, snapshot_writer
+from imports.idempotency import TaskLock, catalog_version
+from imports.locking import locking_writer, sort_batch
+from imports.throttle import LoadThrottle
+from imports.streams import (
+    ByteCountingLineReader, DecompressingStream, detect_compression, find_row_starts, skip_lines_until,
+    undecodable_rows,
+)
+from backend.r2 import generate_presigned_get_url, get_object_content_type, get_object_size
 
 logger = logging.getLogger(__name__)
 
-from webhooks.tasks import dispatch_webhooks_for_event
 
-from typing import List, Dict
-from products.models import Product
+def get_content_length(resp, file_key: str, offset: int = 0):
+    """
+    Size of the object behind a streamed GET (started at ``offset`` for ranged
+    reads), falling back to a HEAD request when the response doesn't carry a
+    Content-Length (chunked encoding).
+    """
+    length = resp.headers.get("Content-Length")
+    if length:
+        return offset + int(length)
+    try:
+        return get_object_size(file_key)
+    except Exception:
+        logger.warning("Could not determine size of %s", file_key, exc_info=True)
+        return None
 
 
-def upsert_products_batch(rows: List[Dict]):
+def get_batch_writer(job: ImportJob, rejects: Optional[RejectFile] = None):
     """
-    Bulk upsert using Django's bulk_create with update_conflicts.
+    Pick the batch upsert function for this job's ingest engine. With
+    ``rejects``, rows the database refuses are isolated and rejected instead
+    of failing the batch.
     """
-    if not rows:
-        return
+    if job.mode == ImportJob.MODE_REPLACE:
+        logger.info("Job %s: replacing the catalog", job.id)
+        write_batch = copy_replace_batch
+    else:
+        engine = resolve_ingest_engine(job.ingest_engine)
+        logger.info("Job %s: using %s ingest engine", job.id, engine)
+        write_batch = copy_upsert_products_batch if engine == ImportJob.ENGINE_COPY else upsert_products_batch
+
+        # Delta imports keep their feed's snapshot up to date; sync jobs
+        # record what they wrote, to find missing products at the end
+        if job.feed:
+            write_batch = snapshot_writer(job.feed, write_batch)
+        elif job.sync_missing:
+            write_batch = recording_writer(job.id, write_batch)
+        write_batch = locking_writer(write_batch)
+
+    if rejects is not None:
+        write_batch = isolating_writer(write_batch, rejects)
+    return write_batch
+
+
+def read_csv_rows(reader, size: int) -> Tuple[List[List[str]], List[str], int]:
+    """
+    Read up to ``size`` lines from a csv.reader. Lines the reader can't parse
+    and rows that aren't valid UTF-8 are skipped; returns (rows, errors of
+    the skipped lines, lines read).
+    """
+    rows = []
+    errors = []
+    for _ in range(size):
+        try:
+            row = next(reader)
+        except StopIteration:
+            break
+        except csv.Error as e:
+            errors.append(f"Malformed CSV line {reader.line_num}: {error_text(e)}")
+            continue
+        rows.append(row)
+    read = len(rows) + len(errors)
+    rows, undecodable = undecodable_rows(rows)
+    return rows, errors + undecodable, read
+
+
+def csv_batches(
+    reader,
+    batch_size: Callable[[], int],
+    fieldnames: Optional[List[str]] = None,
+    position: Callable[[], Any] = lambda: None,
+    stats: Optional[StageStats] = None,
+    snapshot: Optional[FeedSnapshot] = None,
+) -> Iterator[Batch]:
+    """
+    Read rows from a csv.reader in batches of ``batch_size()`` rows,
+    normalize each batch column-wise, collapse duplicate SKUs, drop rows
+    unchanged since the feed's ``snapshot`` (delta imports) and sort it by
+    sku_norm (see imports.locking). Each Batch
+    carries ``position()`` as it stood right after the batch's last row was
+    read.
+
+    The first row is the header unless ``fieldnames`` is given (ranged reads).
+    """
+    stats = stats or StageStats()
+    with stats.stage("parse"):
+        if fieldnames is None:
+            fieldnames = next(reader, [])
+    indexes = csv_column_indexes(fieldnames)
+    seen = SeenRows()
+
+    while True:
+        size = batch_size()
+        with stats.stage("parse"):
+            raw, malformed, read = read_csv_rows(reader, size)
+        if not read:
+            return
+        with stats.stage("normalize"):
+            rows = normalize_csv_batch(raw, indexes)
+            skipped = len(raw) - len(rows)
+            rows, duplicates = seen.collapse(rows)
+            unchanged = 0
+            if snapshot is not None:
+                rows, unchanged = snapshot.diff(rows)
+            rows = sort_batch(rows)
+        stats.count("rows_parsed", len(raw))
+        stats.count("rows_skipped", skipped)
+
+        last = read < size
+        yield Batch(rows, position(), last, tuple(malformed), duplicates, unchanged)
+        if last:
+            return
+
+
+def write_batches(
+    batches: Iterable[Batch],
+    write_batch: Callable,
+    on_batch: Callable[[int, Any], None],
+    processed: int = 0,
+    counts: Optional[Dict[str, int]] = None,
+    controller: Optional[BatchSizeController] = None,
+    stats: Optional[StageStats] = None,
+    rejects: Optional[RejectFile] = None,
+    throttle: Optional[LoadThrottle] = None,
+) -> int:
+    """
+    Write normalized batches and call ``on_batch(processed, position)`` for
+    each one. The write and the callback share a transaction, so
+    progress/checkpoints never run ahead of committed rows. The last, partial
+    batch is written without the callback; the caller completes the job.
+
+    ``processed`` is the number of rows already imported (when resuming);
+    returns the running total, which includes rows collapsed as duplicates
+    or left out as unchanged. Inserted/updated/unchanged counts reported by
+    the writer are added to ``counts`` in place, along with collapsed rows
+    ("duplicate"), rows left out by a delta import ("unchanged") and lines
+    that couldn't be parsed ("rejected", recorded in ``rejects``). Each
+    write+commit is timed and fed to ``controller`` to size the following
+    batches, and to ``throttle`` (background priority), which may pause
+    before the next one.
+    """
+    if counts is None:
+        counts = {}
+    stats = stats or StageStats()
+
+    def write(batch):
+        if batch.rejects:
+            for error in batch.rejects:
+                if rejects is not None:
+                    rejects.add(error)
+            counts["rejected"] = counts.get("rejected", 0) + len(batch.rejects)
+        if batch.duplicates:
+            counts["duplicate"] = counts.get("duplicate", 0) + batch.duplicates
+        if batch.unchanged:
+            counts["unchanged"] = counts.get("unchanged", 0) + batch.unchanged
+        if batch.rows:
+            for key, value in write_batch(batch.rows).items():
+                counts[key] = counts.get(key, 0) + value
+
+    for batch in batches:
+        started = time.monotonic()
+
+        with stats.stage("db"):
+            if batch.last:
+                write(batch)
+                processed += len(batch.rows) + batch.duplicates + batch.unchanged
+            else:
+                with transaction.atomic():
+                    write(batch)
+                    processed += len(batch.rows) + batch.duplicates + batch.unchanged
+                    on_batch(processed, batch.position)
+        stats.count("batches")
+        stats.count("rows_written", len(batch.rows))
+
+        seconds = time.monotonic() - started
+        if controller is not None and batch.rows:
+            controller.record(len(batch.rows), seconds, batch_payload_bytes(batch.rows))
+            if throttle is not None and not batch.last:
+                throttle.after_batch(seconds, controller, stats)
+
+    return processed
+
+
+def import_rows(
+    reader,
+    write_batch: Callable,
+    on_batch: Callable[[int, Any], None],
+    processed: int = 0,
+    counts: Optional[Dict[str, int]] = None,
+    fieldnames: Optional[List[str]] = None,
+    position: Callable[[], Any] = lambda: None,
+    controller: Optional[BatchSizeController] = None,
+    stats: Optional[StageStats] = None,
+    rejects: Optional[RejectFile] = None,
+    throttle: Optional[LoadThrottle] = None,
+    snapshot: Optional[FeedSnapshot] = None,
+) -> int:
+    """
+    Import a CSV: parse/normalize batches (on the parser thread when the
+    pipeline is enabled) and write them here, sized by ``controller``, with
+    stage timings accumulated in ``stats``. See csv_batches and write_batches.
+    """
+    if controller is None:
+        controller = BatchSizeController()
+    stats = stats or StageStats()
+    batches = parse_ahead(
+        csv_batches(reader, lambda: controller.size, fieldnames, position, stats, snapshot), stats
+    )
+    return write_batches(
+        batches, write_batch, on_batch, processed=processed, counts=counts, controller=controller, stats=stats,
+        rejects=rejects, throttle=throttle,
+    )
+
+
+def batch_progress_callback(
+    job: ImportJob, counts: Dict[str, int], stats: StageStats, lock: Optional[TaskLock] = None
+):
+    """
+    Build the ``on_batch`` callback of a single-pass import.
+
+    Batch positions are (processed_bytes, checkpoint_offset) for the rows
+    committed so far. Live counters and stage stats go to Redis after every
+    batch, and the task's ``lock`` is refreshed; the job row is checkpointed
+    every IMPORT_CHECKPOINT_SECONDS, inside the batch's transaction.
+    """
+    last_checkpoint = time.monotonic()
+
+    def on_batch(processed: int, position: Tuple[int, int]):
+        nonlocal last_checkpoint
+
+        job.processed_rows = processed
+        job.processed_bytes, checkpoint_offset = position
+        job.set_result_counts(counts)
+        job.checkpoint_batch += 1
+
+        # Every batch: live progress in Redis only
+        if lock is not None:
+            lock.refresh()
+        job.stage_stats = stats.as_dict()
+        progress.set_counters(job.id, **{name: getattr(job, name) for name in progress.COUNTERS})
+        progress.set_stage_stats(job.id, job.stage_stats)
+
+        # Every IMPORT_CHECKPOINT_SECONDS: durable checkpoint on the job row
+        if time.monotonic() - last_checkpoint >= settings.IMPORT_CHECKPOINT_SECONDS:
+            job.checkpoint_offset = checkpoint_offset
+            job.checkpoint_rows = processed
+            job.save(update_fields=[
+                "processed_rows", "processed_bytes",
+                "inserted_rows", "updated_rows", "unchanged_rows", "deleted_rows", "deactivated_rows",
+                "rejected_rows", "duplicate_rows",
+                "checkpoint_offset", "checkpoint_rows", "checkpoint_batch", "stage_stats", "updated_at",
+            ])
+            last_checkpoint = time.monotonic()
+            logger.info("Job %s: processed %d rows (%d bytes)", job.id, processed, job.processed_bytes)
+
+    return on_batch
+
+
+def read_csv_header(get_url: str):
+    """
+    Read only the header line with a small Range request.
+
+    Returns (fieldnames, header_bytes) where header_bytes is the offset at
+    which the first data row starts.
+    """
+    resp = requests.get(get_url, headers={"Range": "bytes=0-65535"}, stream=True)
+    resp.raise_for_status()
+    try:
+        lines = ByteCountingLineReader(resp)
+        header = next(iter(lines), "")
+    finally:
+        resp.close()
+
+    fieldnames = next(csv.reader([header]), [])
+    return fieldnames, lines.bytes_read
+
+
+def plan_chunks(data_start: int, size: int, chunk_bytes: int) -> List[Tuple[int, int]]:
+    """
+    Split the data section [data_start, size) into roughly equal byte ranges.
+
+    Ranges are nominal; align_chunks moves them to row boundaries.
+    """
+    data_bytes = max(size - data_start, 0)
+    count = max(math.ceil(data_bytes / chunk_bytes), 1)
+    step = math.ceil(data_bytes / count)
+
+    ranges = []
+    start = data_start
+    while start < size:
+        end = min(start + step, size)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def align_chunks(get_url: str, ranges: List[Tuple[int, int]]) -> Optional[List[Tuple[int, int]]]:
+    """
+    Move the boundaries between nominal chunk ranges to the start of the
+    next row, so that every chunk begins and ends on a row boundary and
+    reads exactly its range.
+
+    Rows may hold quoted newlines, so boundaries come from one quote-aware
+    scan of the data (find_row_starts) up to the last boundary; nothing is
+    written. Returns None when the quoting doesn't balance before then (a
+    quoted field that never closes, or one longer than a chunk): such a
+    file is imported in a single pass.
+    """
+    data_start, size = ranges[0][0], ranges[-1][1]
+    resp = requests.get(get_url, headers={"Range": f"bytes={data_start}-"}, stream=True)
+    resp.raise_for_status()
+    try:
+        starts = find_row_starts(
+            resp, data_start, [start for start, _ in ranges[1:]], max_row_bytes=settings.IMPORT_CHUNK_BYTES
+        )
+    finally:
+        resp.close()
+    if starts is None:
+        return None
+
+    bounds = [data_start] + starts + [size]
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def upload_rejects(job: ImportJob, rejects: RejectFile):
+    """
+    Upload the reject CSV of a pass, if it rejected anything, and list it
+    on the job.
+    """
+    key = rejects.upload()
+    if key and key not in job.reject_files:
+        job.reject_files = job.reject_files + [key]
+
+
+def complete_import_job(job: ImportJob, snapshot: Optional[FeedSnapshot] = None):
+    """
+    Mark the job completed and fire import.completed webhooks. Delta imports
+    first remove the SKUs their feed dropped (see imports.delta); sync jobs
+    deactivate or delete the products the file didn't list (unless the job
+    repeats an earlier one and never read the file). The catalog version
+    is recorded so that a repeat of this upload can be recognized.
+    """
+    if snapshot is not None:
+        counts = job.result_counts()
+        counts.update(snapshot.remove_missing(job.sync_missing, job.rejected_rows))
+        job.set_result_counts(counts)
+    elif job.sync_missing and job.mode == ImportJob.MODE_IMPORT and not job.duplicate_of_id and not job.feed:
+        counts = job.result_counts()
+        counts.update(sync_missing_products(job))
+        job.set_result_counts(counts)
+
+    job.catalog_version = catalog_version()
+    job.status = ImportJob.STATUS_COMPLETED
+    job.save(update_fields=[
+        "status", "processed_rows", "processed_bytes", "total_rows", "total_bytes",
+        "inserted_rows", "updated_rows", "unchanged_rows", "deleted_rows", "deactivated_rows",
+        "rejected_rows", "duplicate_rows", "reject_files", "batch_tuning", "stage_stats",
+        "catalog_version", "duplicate_of", "updated_at",
+    ])
+    progress.set_counters(job.id, **{name: getattr(job, name) for name in progress.COUNTERS})
+    progress.set_stage_stats(job.id, job.stage_stats)
+    progress.publish_status(job)
+    logger.info("Job %s completed: %d rows", job.id, job.processed_rows)
+
+    # 🔔 Fire import.completed webhooks asynchronously
+    dispatch_webhooks_for_event.delay(
+        "import.completed",
+        {
+            "type": "import.completed",
+            "job_id": job.id,
+            "file_key": job.file_key,
+            "total_rows": job.total_rows,
+            "processed_rows": job.processed_rows,
+            "inserted_rows": job.inserted_rows,
+            "updated_rows": job.updated_rows,
+            "unchanged_rows": job.unchanged_rows,
+            "deleted_rows": job.deleted_rows,
+            "deactivated_rows": job.deactivated_rows,
+            "rejected_rows": job.rejected_rows,
+            "duplicate_rows": job.duplicate_rows,
+            "reject_files": job.reject_files,
+            "duplicate_of": job.duplicate_of_id,
+            "status": job.status,
+            "timestamp": timezone.now().isoformat(),
+        },
+    )
+
+
+def dispatch_import_chunks(job: ImportJob, get_url: str, size: int) -> bool:
+    """
+    Fan a large file out to one process_import_chunk task per byte range and
+    finish the job from a chord callback once every chunk is done.
+
+    Returns False, without dispatching anything, when the ranges can't be
+    aligned to rows (see align_chunks).
+    """
+    fieldnames, data_start = read_csv_header(get_url)
+    ranges = align_chunks(get_url, plan_chunks(data_start, size, settings.IMPORT_CHUNK_BYTES))
+    if ranges is None:
+        logger.warning("Job %s: quoted fields don't balance, importing in one pass", job.id)
+        return False
+
+    job.status = ImportJob.STATUS_IMPORTING
+    job.total_rows = None
+    job.total_bytes = size
+    job.processed_rows = 0
+    job.processed_bytes = data_start
+    job.set_result_counts({})
+    job.save(update_fields=[
+        "status", "total_rows", "total_bytes", "processed_rows", "processed_bytes",
+        "inserted_rows", "updated_rows", "unchanged_rows", "deleted_rows", "deactivated_rows",
+        "rejected_rows", "duplicate_rows", "reject_files", "updated_at",
+    ])
+    progress.begin(job)
+    logger.info("Job %s: splitting %d bytes into %d chunks", job.id, size, len(ranges))
+
+    chord(
+        [process_import_chunk.s(job.id, start, end, fieldnames) for start, end in ranges]
+    )(finalize_import_job.s(job.id))
+    return True
+
+
+def spool_object(get_url: str, tmp, stats: StageStats) -> int:
+    """
+    Download the object into the file ``tmp`` and rewind it; returns its size.
+    """
+    resp = requests.get(get_url, stream=True)
+    resp.raise_for_status()
+    size = 0
+    for chunk in TimedResponse(resp, stats).iter_content(chunk_size=1024 * 1024):
+        tmp.write(chunk)
+        size += len(chunk)
+    tmp.seek(0)
+    return size
 
-    products = [
-        Product(
-            sku=row["sku"],
-            sku_norm=row["sku_norm"],        # computed in the task
-            name=row["name"],
-            description=row.get("description") or "",
-            active=row.get("active", True),
+
+def import_columnar_file(
+    job: ImportJob, get_url: str, file_format: str, stats: StageStats, rejects: RejectFile,
+    lock: Optional[TaskLock] = None, snapshot: Optional[FeedSnapshot] = None,
+):
+    """
+    Single-pass import of a Parquet or Arrow IPC file.
+
+    Both formats keep their metadata in a footer, so the object is first
+    spooled to a local temporary file, then read one record batch at a time
+    and normalized column-wise. For these files checkpoint_offset counts rows
+    of the file consumed (not bytes), and a resume skips straight to them.
+    """
+    with tempfile.TemporaryFile() as tmp:
+        size = spool_object(get_url, tmp, stats)
+
+        with stats.stage("parse"):
+            source = RecordBatchFile(tmp, file_format)
+        consumed = job.checkpoint_offset
+        logger.info("Job %s: reading %s file (%d bytes, %s rows)", job.id, file_format, size, source.num_rows)
+
+        def position():
+            # Bytes are estimated from the share of rows consumed, when known
+            if source.num_rows:
+                return size * consumed // source.num_rows, consumed
+            return 0, consumed
+
+        job.status = ImportJob.STATUS_IMPORTING
+        job.total_rows = None
+        job.total_bytes = size
+        job.processed_rows = job.checkpoint_rows
+        job.processed_bytes, _ = position()
+        job.save(update_fields=[
+            "status", "total_rows", "total_bytes", "processed_rows", "processed_bytes",
+            "checkpoint_offset", "checkpoint_rows", "checkpoint_batch",
+            "inserted_rows", "updated_rows", "unchanged_rows", "deleted_rows", "deactivated_rows",
+            "rejected_rows", "duplicate_rows", "reject_files", "updated_at",
+        ])
+        progress.begin(job)
+
+        controller = BatchSizeController()
+        seen = SeenRows()
+
+        def batches():
+            nonlocal consumed
+            for batch in timed(source.iter_batches(lambda: controller.size, skip_rows=consumed), stats, "parse"):
+                with stats.stage("normalize"):
+                    rows = normalize_record_batch(batch)
+                    skipped = batch.num_rows - len(rows)
+                    rows, duplicates = seen.collapse(rows)
+                    unchanged = 0
+                    if snapshot is not None:
+                        rows, unchanged = snapshot.diff(rows)
+                    rows = sort_batch(rows)
+                stats.count("rows_parsed", batch.num_rows)
+                stats.count("rows_skipped", skipped)
+                consumed += batch.num_rows
+                yield Batch(rows, position(), duplicates=duplicates, unchanged=unchanged)
+
+        counts = job.result_counts()
+        processed = write_batches(
+            parse_ahead(batches(), stats),
+            get_batch_writer(job, rejects),
+            batch_progress_callback(job, counts, stats, lock),
+            processed=job.checkpoint_rows,
+            counts=counts,
+            controller=controller,
+            stats=stats,
+            rejects=rejects,
+            throttle=LoadThrottle.for_job(job),
         )
-        for row in rows
-    ]
-
-    # Django 4.1+ feature
-    Product.objects.bulk_create(
-        products,
-        batch_size=1000,
-        update_conflicts=True,
-        unique_fields=["sku_norm"],         # enforce case-insensitive uniqueness
-        update_fields=["sku", "name", "description", "active"],
+
+    if job.mode == ImportJob.MODE_REPLACE:
+        with stats.stage("db"):
+            counts.update(swap_catalog())
+
+    job.set_result_counts(counts)
+    job.batch_tuning = controller.summary()
+    job.stage_stats = stats.as_dict()
+    job.processed_rows = processed
+    job.processed_bytes = size
+    job.total_rows = processed
+    upload_rejects(job, rejects)
+    complete_import_job(job, snapshot)
+
+
+VALIDATION_BATCH_ROWS = 10000
+
+
+def validate_import_file(job: ImportJob, get_url: str, file_format: str, stats: StageStats):
+    """
+    Dry run: stream the whole file and check it (imports.validation) without
+    touching products. Progress is published like an import's; the report is
+    stored on the job. A dry run has no checkpoint: a retry starts over.
+    """
+    report = ValidationReport()
+    job.status = ImportJob.STATUS_PARSING
+    job.total_rows = None
+    job.processed_rows = 0
+    job.processed_bytes = 0
+    job.validation_report = {}
+    job.clear_checkpoint()
+
+    def publish(rows: int, consumed: int):
+        job.processed_rows = rows
+        job.processed_bytes = consumed
+        progress.set_counters(job.id, processed_rows=rows, processed_bytes=consumed)
+
+    if file_format != FORMAT_CSV:
+        with tempfile.TemporaryFile() as tmp:
+            size = spool_object(get_url, tmp, stats)
+            with stats.stage("parse"):
+                source = RecordBatchFile(tmp, file_format)
+            report.check_header(source.column_names)
+
+            job.total_bytes = size
+            job.save(update_fields=[
+                "status", "total_rows", "total_bytes", "processed_rows", "processed_bytes",
+                "checkpoint_offset", "checkpoint_rows", "checkpoint_batch", "validation_report",
+                "inserted_rows", "updated_rows", "unchanged_rows", "deleted_rows", "deactivated_rows",
+                "rejected_rows", "duplicate_rows", "reject_files", "updated_at",
+            ])
+            progress.begin(job)
+
+            for batch in timed(source.iter_batches(lambda: VALIDATION_BATCH_ROWS), stats, "parse"):
+                with stats.stage("normalize"):
+                    report.add_columns(*text_columns(batch, ("sku", "name")))
+                stats.count("rows_parsed", batch.num_rows)
+                stats.count("batches")
+                rows = report.rows
+                publish(rows, size * rows // source.num_rows if source.num_rows else 0)
+        job.processed_bytes = size
+
+    else:
+        compression = detect_compression(job.file_key)
+        resp = requests.get(get_url, stream=True)
+        resp.raise_for_status()
+
+        job.total_bytes = get_content_length(resp, job.file_key)
+        job.save(update_fields=[
+            "status", "total_rows", "total_bytes", "processed_rows", "processed_bytes",
+            "checkpoint_offset", "checkpoint_rows", "checkpoint_batch", "validation_report",
+            "inserted_rows", "updated_rows", "unchanged_rows", "deleted_rows", "deactivated_rows",
+            "rejected_rows", "duplicate_rows", "reject_files", "updated_at",
+        ])
+        progress.begin(job)
+
+        body = prefetch(TimedResponse(resp, stats), stats)
+        if compression:
+            body = DecompressingStream(body, compression)
+        lines = ByteCountingLineReader(body)
+        reader = csv.reader(lines)
+
+        def consumed():
+            return body.bytes_read if compression else lines.bytes_read
+
+        with stats.stage("parse"):
+            fieldnames = next(reader, [])
+        report.check_header(fieldnames)
+        indexes = csv_column_indexes(fieldnames)
+
+        while True:
+            with stats.stage("parse"):
+                raw, malformed, read = read_csv_rows(reader, VALIDATION_BATCH_ROWS)
+            if not read:
+                break
+            with stats.stage("normalize"):
+                report.add_columns(*csv_sku_name_columns(raw, indexes))
+                report.add_malformed(malformed)
+            stats.count("rows_parsed", len(raw))
+            stats.count("batches")
+            publish(report.rows, consumed())
+
+        job.processed_bytes = consumed()
+        if not job.total_bytes:
+            job.total_bytes = job.processed_bytes
+
+    job.validation_report = report.summary()
+    job.stage_stats = stats.as_dict()
+    job.processed_rows = job.total_rows = report.rows
+    job.status = ImportJob.STATUS_COMPLETED
+    job.save(update_fields=[
+        "status", "processed_rows", "processed_bytes", "total_rows", "total_bytes",
+        "validation_report", "stage_stats", "updated_at",
+    ])
+    progress.set_counters(job.id, **{name: getattr(job, name) for name in progress.COUNTERS})
+    progress.set_stage_stats(job.id, job.stage_stats)
+    progress.publish_status(job)
+    logger.info(
+        "Job %s validated: %d rows, %d invalid", job.id, report.rows, report.invalid_rows
     )
 
 
-@shared_task(bind=True)
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
 def process_import_job(self, job_id: int):
     logger.info("Starting import job %s", job_id)
     job = ImportJob.objects.get(pk=job_id)
+    if job.status == ImportJob.STATUS_COMPLETED:
+        logger.info("Job %s is already completed, ignoring redelivered task", job_id)
+        return
+
+    # A redelivered copy of this task waits for the one still running
+    lock = TaskLock(f"job:{job_id}")
+    if not lock.acquire():
+        logger.warning("Job %s is already running, retrying in %ds", job_id, settings.IMPORT_TASK_LOCK_SECONDS)
+        raise self.retry(countdown=settings.IMPORT_TASK_LOCK_SECONDS, max_retries=settings.IMPORT_TASK_LOCK_MAX_RETRIES)
+
+    stats = StageStats()
+    rejects = None
 
     try:
         if not job.file_key:
             raise ValueError("ImportJob has no file_key set")
 
-        # 1) First pass: count total rows
-        job.status = ImportJob.STATUS_PARSING
-        job.save(update_fields=["status", "updated_at"])
-
         get_url = generate_presigned_get_url(job.file_key, expires_in=3600)
-        resp = requests.get(get_url, stream=True)
-        resp.raise_for_status()
 
-        total = -1  # header + data rows
-        for _ in resp.iter_lines():
-            total += 1
-        job.total_rows = max(total, 0)
-        job.save(update_fields=["total_rows", "updated_at"])
+        # Parquet / Arrow IPC files are read batch-wise with pyarrow. Keys
+        # from create_upload_job carry the format; anything else falls back
+        # to the content type the object was uploaded with.
+        file_format = (
+            detect_file_format(job.file_key)
+            or detect_file_format(content_type=get_object_content_type(job.file_key))
+            or FORMAT_CSV
+        )
+
+        if job.mode == ImportJob.MODE_VALIDATE:
+            validate_import_file(job, get_url, file_format, stats)
+            return
+
+        # Replace mode loads the whole file into a temporary table on this
+        # connection, so it always starts over and never splits into chunks.
+        replace = job.mode == ImportJob.MODE_REPLACE
+        if replace:
+            job.clear_checkpoint()
+            begin_replace()
+
+        # Delta imports diff the whole file against their feed's snapshot in
+        # memory, so they too run as one pass from the start. Batches an
+        # earlier attempt committed are in the snapshot and come out unchanged.
+        with stats.stage("db"):
+            snapshot = FeedSnapshot.for_job(job)
+        if snapshot is not None:
+            job.clear_checkpoint()
+
+        # Rows that can't be imported go to a reject CSV named after where
+        # this pass starts, so a resumed pass doesn't overwrite the last one's
+        rejects = RejectFile(reject_file_key(job.file_key, job.checkpoint_offset))
+
+        if file_format != FORMAT_CSV:
+            import_columnar_file(job, get_url, file_format, stats, rejects, lock, snapshot)
+            return
+
+        compression = detect_compression(job.file_key)
+
+        # Parallel mode: large objects are split into line-aligned byte ranges
+        # and imported by a group of chunk tasks. Compressed objects can't be
+        # split that way and always take the single pass, as do files whose
+        # quoting doesn't balance.
+        if settings.IMPORT_PARALLEL and not compression and not replace and snapshot is None:
+            size = get_object_size(job.file_key)
+            if size > settings.IMPORT_CHUNK_BYTES and dispatch_import_chunks(job, get_url, size):
+                return
+
+        # Single pass: the object is streamed exactly once. Progress is reported
+        # from bytes consumed vs. Content-Length, and total_rows is filled in
+        # once the whole file has been read.
+        #
+        # If a previous attempt died part-way through (worker killed, task
+        # redelivered, job restarted after a failure), resume right after the
+        # last committed batch with a Range request.
+        #
+        # Compressed uploads are decompressed incrementally as they stream in.
+        # Their checkpoint is an offset into the decompressed CSV, which a
+        # Range request can't seek to: a resume streams the object again and
+        # skips the already-committed lines without parsing or writing them.
+        offset = job.checkpoint_offset
+        fieldnames = None
+        if offset and not compression:
+            fieldnames, _ = read_csv_header(get_url)
+            resp = requests.get(get_url, headers={"Range": f"bytes={offset}-"}, stream=True)
+            resp.raise_for_status()
+            if resp.status_code != 206:
+                logger.warning("Job %s: Range request ignored, restarting from row zero", job_id)
+                offset = 0
+                fieldnames = None
+                job.clear_checkpoint()
+                rejects.object_key = reject_file_key(job.file_key)
+            else:
+                logger.info("Job %s: resuming at byte %d after %d rows", job_id, offset, job.checkpoint_rows)
+        else:
+            resp = requests.get(get_url, stream=True)
+            resp.raise_for_status()
+            if offset:
+                logger.info("Job %s: resuming compressed file after %d rows", job_id, job.checkpoint_rows)
 
-        # 2) Second pass: actual import
         job.status = ImportJob.STATUS_IMPORTING
-        job.processed_rows = 0
-        job.save(update_fields=["status", "processed_rows", "updated_at"])
+        job.total_rows = None
+        if compression:
+            # Progress is measured in compressed bytes off the wire
+            job.total_bytes = get_content_length(resp, job.file_key)
+            job.processed_bytes = 0
+        else:
+            job.total_bytes = get_content_length(resp, job.file_key, offset)
+            job.processed_bytes = offset
+        job.processed_rows = job.checkpoint_rows
+        job.save(update_fields=[
+            "status", "total_rows", "total_bytes", "processed_rows", "processed_bytes",
+            "checkpoint_offset", "checkpoint_rows", "checkpoint_batch",
+            "inserted_rows", "updated_rows", "unchanged_rows", "deleted_rows", "deactivated_rows",
+            "rejected_rows", "duplicate_rows", "reject_files", "updated_at",
+        ])
+        progress.begin(job)
 
-        resp = requests.get(get_url, stream=True)
-        resp.raise_for_status()
+        write_batch = get_batch_writer(job, rejects)
 
         # CSV header: sku,name,description
-        def line_iter():
-            for line in resp.iter_lines():
-                if line:
-                    yield line.decode("utf-8")
-
-        reader = csv.DictReader(line_iter())
-
-        BATCH_SIZE = 1000
-        batch: List[Dict] = []
-        processed = 0
-
-        for row in reader:
-            sku_raw = (row.get("sku") or "").strip()
-            if not sku_raw:
-                continue
-
-            product_data = {
-                "sku": sku_raw,
-                "sku_norm": sku_raw.lower(),
-                "name": (row.get("name") or "").strip(),
-                "description": (row.get("description") or "").strip(),
-                "active": True,  # default ON; user can toggle later
-            }
-
-            batch.append(product_data)
-
-            if len(batch) >= BATCH_SIZE:
-                upsert_products_batch(batch)
-                processed += len(batch)
-                batch.clear()
-
-                job.processed_rows = processed
-                job.save(update_fields=["processed_rows", "updated_at"])
-                logger.info("Job %s: processed %d rows", job_id, processed)
-
-        if batch:
-            upsert_products_batch(batch)
-            processed += len(batch)
-            job.processed_rows = processed
-            job.save(update_fields=["processed_rows", "updated_at"])
-
-        job.status = ImportJob.STATUS_COMPLETED
-        job.save(update_fields=["status", "processed_rows", "updated_at"])
-        logger.info("Job %s completed: %d rows", job_id, processed)
-
-        # 🔔 Fire import.completed webhooks asynchronously
-        dispatch_webhooks_for_event.delay(
-            "import.completed",
-            {
-                "type": "import.completed",
-                "job_id": job.id,
-                "file_key": job.file_key,
-                "total_rows": job.total_rows,
-                "processed_rows": job.processed_rows,
-                "status": job.status,
-                "timestamp": timezone.now().isoformat(),
-            },
+        if compression:
+            body = DecompressingStream(prefetch(TimedResponse(resp, stats), stats), compression)
+            lines = ByteCountingLineReader(body)
+            reader = csv.reader(skip_lines_until(lines, offset))
+
+            def position():
+                # (bytes read from the object, checkpoint offset in the CSV)
+                return body.bytes_read, lines.bytes_read
+        else:
+            lines = ByteCountingLineReader(prefetch(TimedResponse(resp, stats), stats))
+            reader = csv.reader(lines)
+
+            def position():
+                return offset + lines.bytes_read, offset + lines.bytes_read
+
+        # Counts are checkpointed with the batch, so a resumed job carries on
+        # from the stored values.
+        counts = job.result_counts()
+        on_batch = batch_progress_callback(job, counts, stats, lock)
+        controller = BatchSizeController()
+
+        processed = import_rows(
+            reader, write_batch, on_batch,
+            processed=job.checkpoint_rows, counts=counts, fieldnames=fieldnames, position=position,
+            controller=controller, stats=stats, rejects=rejects, throttle=LoadThrottle.for_job(job),
+            snapshot=snapshot,
         )
 
+        if replace:
+            with stats.stage("db"):
+                counts.update(swap_catalog())
+
+        job.set_result_counts(counts)
+        job.batch_tuning = controller.summary()
+        job.stage_stats = stats.as_dict()
+        job.processed_rows = processed
+        job.processed_bytes, _ = position()
+        job.total_rows = processed
+        if not job.total_bytes:
+            job.total_bytes = job.processed_bytes
+
+        upload_rejects(job, rejects)
+        complete_import_job(job, snapshot)
+
     except Exception as e:
         logger.exception("Import job %s failed", job_id)
+        # Keep what this pass rejected before it failed
+        if rejects is not None:
+            try:
+                upload_rejects(job, rejects)
+            except Exception:
+                logger.warning("Job %s: could not upload rejected rows", job_id, exc_info=True)
         job.status = ImportJob.STATUS_FAILED
         job.error_message = str(e)
+        job.stage_stats = stats.as_dict()
+        job.save(update_fields=["status", "error_message", "stage_stats", "reject_files", "updated_at"])
+        progress.set_stage_stats(job.id, job.stage_stats)
+        progress.publish_status(job)
+        raise
+
+    finally:
+        lock.release()
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def process_import_chunk(self, job_id: int, start: int, end: int, fieldnames: List[str]):
+    """
+    Import the rows in [start, end) of the job's object. The range is
+    aligned to row boundaries (see align_chunks), so it is read exactly.
+    """
+    job = ImportJob.objects.get(pk=job_id)
+    lock = TaskLock(f"job:{job_id}:chunk:{start}")
+    if not lock.acquire():
+        logger.warning("Job %s: chunk %d-%d is already running, retrying", job_id, start, end)
+        raise self.retry(countdown=settings.IMPORT_TASK_LOCK_SECONDS, max_retries=settings.IMPORT_TASK_LOCK_MAX_RETRIES)
+
+    stats = StageStats()
+    resp = None
+    rejects = RejectFile(reject_file_key(job.file_key, start))
+
+    try:
+        get_url = generate_presigned_get_url(job.file_key, expires_in=3600)
+        resp = requests.get(get_url, headers={"Range": f"bytes={start}-{end - 1}"}, stream=True)
+        resp.raise_for_status()
+
+        write_batch = get_batch_writer(job, rejects)
+        lines = ByteCountingLineReader(prefetch(TimedResponse(resp, stats), stats))
+        reader = csv.reader(lines)
+
+        # Progress goes to Redis counters; the ranges of a job's chunks add
+        # up to exactly total_bytes.
+        span = end - start
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0, "rejected": 0, "duplicate": 0}
+        reported = {"rows": 0, "bytes": 0, "inserted": 0, "updated": 0, "unchanged": 0, "rejected": 0, "duplicate": 0}
+
+        def position():
+            return min(lines.bytes_read, span)
+
+        def report(processed: int, consumed: int):
+            lock.refresh()
+            progress.incr_counters(
+                job_id,
+                processed_rows=processed - reported["rows"],
+                processed_bytes=consumed - reported["bytes"],
+                inserted_rows=counts["inserted"] - reported["inserted"],
+                updated_rows=counts["updated"] - reported["updated"],
+                unchanged_rows=counts["unchanged"] - reported["unchanged"],
+                rejected_rows=counts["rejected"] - reported["rejected"],
+                duplicate_rows=counts["duplicate"] - reported["duplicate"],
+            )
+            reported.update(counts, rows=processed, bytes=consumed)
+
+        controller = BatchSizeController()
+        processed = import_rows(
+            reader, write_batch, report,
+            counts=counts, fieldnames=fieldnames, position=position, controller=controller, stats=stats,
+            rejects=rejects, throttle=LoadThrottle.for_job(job),
+        )
+        report(processed, span)
+        reject_file = rejects.upload()
+
+        logger.info("Job %s: chunk %d-%d imported %d rows", job_id, start, end, processed)
+        return {
+            "start": start,
+            "end": end,
+            "rows": processed,
+            **counts,
+            "reject_file": reject_file,
+            "batch_tuning": controller.summary(),
+            "stage_stats": stats.as_dict(),
+        }
+
+    except Exception as e:
+        logger.exception("Import job %s chunk %d-%d failed", job_id, start, end)
+        job.status = ImportJob.STATUS_FAILED
+        job.error_message = f"Chunk {start}-{end}: {e}"
         job.save(update_fields=["status", "error_message", "updated_at"])
+        progress.publish_status(job)
         raise
+
+    finally:
+        lock.release()
+        rejects.close()
+        if resp is not None:
+            resp.close()
+
+
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
+def finalize_import_job(self, chunk_results: List[Dict], job_id: int):
+    """
+    Chord callback: combine per-chunk results into the ImportJob.
+    """
+    job = ImportJob.objects.get(pk=job_id)
+    if job.status == ImportJob.STATUS_COMPLETED:
+        logger.info("Job %s is already completed, ignoring redelivered callback", job_id)
+        return
+    processed = sum(result["rows"] for result in chunk_results)
+    job.set_result_counts({
+        key: sum(result.get(key, 0) for result in chunk_results)
+        for key in ("inserted", "updated", "unchanged", "rejected", "duplicate")
+    })
+    job.reject_files = [result["reject_file"] for result in chunk_results if result.get("reject_file")]
+    job.batch_tuning = merge_batch_tuning([result.get("batch_tuning") for result in chunk_results])
+    job.stage_stats = merge_stage_stats([result.get("stage_stats") for result in chunk_results])
+
+    job.processed_rows = processed
+    job.total_rows = processed
+    job.processed_bytes = job.total_bytes or 0
+    complete_import_job(job)
@@ -1,9 +1,29 @@
-from django.test import TestCase, Client
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
+from django.db import connection
+from contextlib import nullcontext
+from unittest import skipUnless
 from unittest.mock import patch, Mock
+import asyncio
+import csv
+import gzip
+import io
 import json
 
-from .models import ImportJob
+from . import progress
+from .columnar import pyarrow
+from .normalize import ACTIVE, CONTENT_HASH, DESCRIPTION, NAME, SKU, SKU_NORM, normalize_columns
+from .streams import zstandard
+from .models import ImportJob, ImportSeenSku
+from products.models import Product, product_content_hash
+
+
+# Batch boundaries asserted by task tests don't depend on the adaptive controller
+FIXED_BATCH_SIZE = {"IMPORT_BATCH_SIZE": 1000, "IMPORT_BATCH_MIN": 1000, "IMPORT_BATCH_MAX": 1000}
+
+# Task locks and live progress live in the cache; tests don't need Redis
+LOCMEM_CACHE = {"CACHES": {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}}
 
 
 class ImportJobModelTests(TestCase):
@@ -55,6 +75,16 @@ class ImportJobModelTests(TestCase):
         # 1/3 = 33.333... should round to 33.33
         self.assertEqual(job.progress_percent(), 33.33)
 
+    def test_progress_percent_from_bytes(self):
+        """Test progress falls back to bytes while total_rows is unknown."""
+        job = ImportJob.objects.create(
+            status=ImportJob.STATUS_IMPORTING,
+            total_bytes=400,
+            processed_bytes=100,
+            processed_rows=10
+        )
+        self.assertEqual(job.progress_percent(), 25.0)
+
     def test_import_job_str_representation(self):
         """Test import job string representation."""
         job = ImportJob.objects.create(
@@ -64,12 +94,14 @@ class ImportJobModelTests(TestCase):
         self.assertIn(ImportJob.STATUS_PENDING, str(job))
 
 
+@override_settings(**LOCMEM_CACHE)
 class ImportViewTests(TestCase):
     """Test Import views."""
 
     def setUp(self):
         """Set up test client."""
         self.client = Client()
+        cache.clear()
 
     @patch('imports.views.generate_presigned_put_url')
     def test_create_upload_job(self, mock_presigned_url):
@@ -89,8 +121,139 @@ class ImportViewTests(TestCase):
         self.assertEqual(job.status, ImportJob.STATUS_PENDING)
         self.assertIn("imports/", job.file_key)
 
+    @patch('imports.views.generate_presigned_put_url')
+    def test_create_upload_job_with_engine(self, mock_presigned_url):
+        """Test the ingest engine can be chosen per job."""
+        mock_presigned_url.return_value = "https://example.com/upload-url"
+
+        response = self.client.post(
+            reverse("create_upload_job"),
+            data=json.dumps({"engine": "orm"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+        job = ImportJob.objects.get(id=json.loads(response.content)["job_id"])
+        self.assertEqual(job.ingest_engine, ImportJob.ENGINE_ORM)
+
+    @patch('imports.views.generate_presigned_put_url')
+    def test_create_upload_job_compressed(self, mock_presigned_url):
+        """Test a compressed upload gets a matching object key and content type."""
+        mock_presigned_url.return_value = "https://example.com/upload-url"
+
+        response = self.client.post(
+            reverse("create_upload_job"),
+            data=json.dumps({"filename": "catalog.csv.gz"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+        data = json.loads(response.content)
+        self.assertEqual(data["content_type"], "application/gzip")
+        job = ImportJob.objects.get(id=data["job_id"])
+        self.assertTrue(job.file_key.endswith(".csv.gz"))
+        self.assertEqual(mock_presigned_url.call_args.kwargs["content_type"], "application/gzip")
+
+    def test_create_upload_job_unknown_compression(self):
+        """Test an unsupported compression is rejected."""
+        response = self.client.post(reverse("create_upload_job"), {"compression": "bz2"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_create_upload_job_unknown_engine(self):
+        """Test an unknown ingest engine is rejected."""
+        response = self.client.post(reverse("create_upload_job"), {"engine": "bogus"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ImportJob.objects.exists())
+
+    def test_create_upload_job_unknown_sync(self):
+        """Test an unknown sync option is rejected."""
+        response = self.client.post(reverse("create_upload_job"), {"sync": "archive"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ImportJob.objects.exists())
+
+    def test_create_upload_job_priority(self):
+        """Test the priority option is stored on the job and unknown ones are rejected."""
+        response = self.client.post(reverse("create_upload_job"), {"priority": "urgent"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ImportJob.objects.exists())
+
+        with patch('imports.views.generate_presigned_put_url', return_value="https://example.com/put"):
+            response = self.client.post(reverse("create_upload_job"), {"priority": "fast"})
+        job = ImportJob.objects.get(id=json.loads(response.content)["job_id"])
+        self.assertEqual(job.priority, ImportJob.PRIORITY_FAST)
+
+    @override_settings(IMPORT_MULTIPART_THRESHOLD=100 * 1024 * 1024, IMPORT_MULTIPART_PART_SIZE=16 * 1024 * 1024)
+    @patch('imports.views.generate_presigned_part_urls')
+    @patch('imports.views.create_multipart_upload', return_value="upload-1")
+    def test_create_upload_job_multipart(self, mock_create, mock_part_urls):
+        """Test large uploads start a multipart upload and presign parts on request."""
+        mock_part_urls.side_effect = lambda object_key, upload_id, part_numbers, expires_in: {
+            n: f"https://example.com/part-{n}" for n in part_numbers
+        }
+
+        response = self.client.post(
+            reverse("create_upload_job"),
+            data=json.dumps({"filename": "catalog.csv", "size": 200 * 1024 * 1024 + 1}),
+            content_type="application/json",
+        )
+        data = json.loads(response.content)
+        self.assertTrue(data["multipart"])
+        self.assertEqual(data["part_size"], 16 * 1024 * 1024)
+        self.assertEqual(data["part_count"], 13)
+
+        job = ImportJob.objects.get(id=data["job_id"])
+        self.assertEqual(job.upload_id, "upload-1")
+
+        response = self.client.post(
+            reverse("upload_parts", args=[job.id]),
+            data=json.dumps({"part_numbers": [2, 1]}),
+            content_type="application/json",
+        )
+        self.assertEqual(json.loads(response.content)["urls"], {"1": "https://example.com/part-1", "2": "https://example.com/part-2"})
+
+        response = self.client.post(
+            reverse("upload_parts", args=[job.id]),
+            data=json.dumps({"part_numbers": [0]}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+        # Not startable until the parts are assembled
+        self.assertEqual(self.client.post(reverse("start_import_job", args=[job.id])).status_code, 400)
+
+    def test_multipart_part_size_stays_within_part_limit(self):
+        """Test the part size grows so a huge file fits in 10,000 parts."""
+        from imports.views import _multipart_part_size
+
+        size = 500 * 1024 ** 3
+        part_size = _multipart_part_size(size)
+        self.assertLessEqual(-(-size // part_size), 10000)
+        self.assertEqual(part_size % (1024 * 1024), 0)
+
+    @patch('imports.views.complete_multipart_upload')
+    @patch('imports.views.list_uploaded_parts')
+    def test_complete_upload_reports_missing_parts(self, mock_list, mock_complete):
+        """Test completion waits for every part and names the missing ones."""
+        job = ImportJob.objects.create(status=ImportJob.STATUS_PENDING, file_key="imports/1.csv", upload_id="upload-1")
+        mock_list.return_value = [{"PartNumber": 1, "ETag": '"a"', "Size": 5}, {"PartNumber": 3, "ETag": '"c"', "Size": 5}]
+
+        url = reverse("complete_upload", args=[job.id])
+        response = self.client.post(url, data=json.dumps({"part_count": 3}), content_type="application/json")
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(json.loads(response.content)["missing_parts"], [2])
+        mock_complete.assert_not_called()
+
+        mock_list.return_value.insert(1, {"PartNumber": 2, "ETag": '"b"', "Size": 5})
+        response = self.client.post(url, data=json.dumps({"part_count": 3}), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p["PartNumber"] for p in mock_complete.call_args.kwargs["parts"]], [1, 2, 3])
+
+        job.refresh_from_db()
+        self.assertEqual(job.upload_id, "")
+
+    @patch('imports.views.get_object_fingerprint', return_value=("etag", 100))
     @patch('imports.views.process_import_job')
-    def test_start_import_job_success(self, mock_task):
+    def test_start_import_job_success(self, mock_task, mock_fingerprint):
         """Test starting an import job successfully."""
         job = ImportJob.objects.create(
             status=ImportJob.STATUS_PENDING,
@@ -154,6 +317,79 @@ class ImportViewTests(TestCase):
         self.assertEqual(data["processed_rows"], 50)
         self.assertEqual(data["total_rows"], 100)
         self.assertEqual(data["percentage"], 50.0)
+        self.assertEqual(data["stage_stats"], {})
+
+    def test_import_job_status_served_from_redis(self):
+        """Test a running job's status is read from Redis without a DB query."""
+        job = ImportJob.objects.create(
+            status=ImportJob.STATUS_IMPORTING,
+            total_bytes=1000,
+            file_key="imports/1.csv"
+        )
+        progress.begin(job)
+        progress.set_counters(job.id, processed_rows=120, processed_bytes=250, inserted_rows=100, updated_rows=20)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("import_job_status", args=[job.id]))
+
+        data = json.loads(response.content)
+        self.assertEqual(data["status"], ImportJob.STATUS_IMPORTING)
+        self.assertEqual(data["processed_rows"], 120)
+        self.assertEqual(data["percentage"], 25.0)
+        self.assertEqual(data["created"], 100)
+        self.assertEqual(data["updated"], 20)
+        self.assertIsNotNone(data["rows_per_second"])
+
+    async def _read_events(self, response):
+        body = b"".join([chunk async for chunk in response.streaming_content]).decode("utf-8")
+        return [json.loads(line[len("data: "):]) for line in body.splitlines() if line.startswith("data: ")]
+
+    @override_settings(IMPORT_EVENTS_INTERVAL=0.01)
+    async def test_import_job_events_streams_until_finished(self):
+        """Test the SSE stream pushes changes and closes when the job finishes."""
+        job = await ImportJob.objects.acreate(
+            status=ImportJob.STATUS_IMPORTING,
+            total_bytes=1000,
+            file_key="imports/1.csv"
+        )
+        progress.begin(job)
+
+        response = await self.async_client.get(reverse("import_job_events", args=[job.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        async def finish_later():
+            await asyncio.sleep(0.05)
+            progress.set_counters(job.id, processed_rows=10, processed_bytes=1000)
+            job.status = ImportJob.STATUS_COMPLETED
+            job.total_rows = 10
+            progress.publish_status(job)
+
+        events, _ = await asyncio.gather(self._read_events(response), finish_later())
+
+        self.assertEqual(events[0]["status"], ImportJob.STATUS_IMPORTING)
+        self.assertEqual(events[-1]["status"], ImportJob.STATUS_COMPLETED)
+        self.assertEqual(events[-1]["processed_rows"], 10)
+
+    async def test_import_job_events_falls_back_to_db(self):
+        """Test the stream serves stored status when there is no live entry."""
+        job = await ImportJob.objects.acreate(
+            status=ImportJob.STATUS_COMPLETED,
+            total_rows=5,
+            processed_rows=5,
+            file_key="imports/1.csv"
+        )
+
+        response = await self.async_client.get(reverse("import_job_events", args=[job.id]))
+        events = await self._read_events(response)
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0]["percentage"], 100.0)
+
+    async def test_import_job_events_not_found(self):
+        """Test the stream returns 404 for unknown jobs."""
+        response = await self.async_client.get(reverse("import_job_events", args=[999]))
+        self.assertEqual(response.status_code, 404)
 
     def test_import_job_status_not_found(self):
         """Test getting status of non-existent job returns 404."""
@@ -169,9 +405,28 @@ class ImportViewTests(TestCase):
         self.assertContains(response, "Upload")
 
 
+@override_settings(IMPORT_INGEST_ENGINE="orm", **FIXED_BATCH_SIZE, **LOCMEM_CACHE)
 class ImportTaskTests(TestCase):
     """Test Import tasks (with mocking)."""
 
+    def setUp(self):
+        cache.clear()
+
+    def test_tasks_are_routed_to_their_lanes(self):
+        """Test imports, chunks and webhooks go to separate queues."""
+        from backend.celery import app
+
+        routes = {
+            "imports.tasks.process_import_job": "imports",
+            "imports.tasks.finalize_import_job": "imports",
+            "imports.tasks.process_import_chunk": "import_chunks",
+            "webhooks.tasks.dispatch_webhooks_for_event": "webhooks",
+        }
+        for task, queue in routes.items():
+            self.assertEqual(app.amqp.router.route({}, task)["queue"].name, queue)
+        self.assertTrue(app.tasks["imports.tasks.process_import_chunk"].acks_late)
+        self.assertFalse(app.tasks["webhooks.tasks.dispatch_webhooks_for_event"].acks_late)
+
     @patch('imports.tasks.generate_presigned_get_url')
     @patch('imports.tasks.requests.get')
     @patch('imports.tasks.upsert_products_batch')
@@ -182,15 +437,13 @@ class ImportTaskTests(TestCase):
         """Test processing import job successfully."""
         # Mock presigned URL
         mock_presigned.return_value = "https://example.com/file.csv"
+        mock_upsert.return_value = {"inserted": 2, "updated": 0, "unchanged": 0}
         
         # Mock CSV content
         csv_content = "sku,name,description\nPROD-001,Product 1,Desc 1\nPROD-002,Product 2,Desc 2\n"
         mock_response = Mock()
-        mock_response.iter_lines.return_value = [
-            b"sku,name,description",
-            b"PROD-001,Product 1,Desc 1",
-            b"PROD-002,Product 2,Desc 2"
-        ]
+        mock_response.iter_content.return_value = [csv_content.encode("utf-8")]
+        mock_response.headers = {"Content-Length": str(len(csv_content))}
         mock_response.raise_for_status = Mock()
         mock_requests_get.return_value = mock_response
         
@@ -209,6 +462,12 @@ class ImportTaskTests(TestCase):
         self.assertEqual(job.status, ImportJob.STATUS_COMPLETED)
         self.assertEqual(job.total_rows, 2)
         self.assertEqual(job.processed_rows, 2)
+        self.assertEqual(job.processed_bytes, len(csv_content))
+        self.assertEqual(job.total_bytes, len(csv_content))
+        self.assertEqual(job.inserted_rows, 2)
+        
+        # File is streamed exactly once
+        mock_requests_get.assert_called_once()
         
         # Verify upsert was called
         self.assertTrue(mock_upsert.called)
@@ -231,8 +490,1619 @@ class ImportTaskTests(TestCase):
         
         # Call task synchronously - should raise ValueError
         with self.assertRaises(ValueError):
-            process_import_job.apply(args=[job.id])
+            process_import_job.apply(args=[job.id], throw=True)
         
         job.refresh_from_db()
         self.assertEqual(job.status, ImportJob.STATUS_FAILED)
         self.assertIn("file_key", job.error_message)
+
+    def test_byte_counting_line_reader_across_chunks(self):
+        """Test lines split across chunks are rejoined and bytes are counted."""
+        from imports.tasks import ByteCountingLineReader
+
+        content = b"sku,name\r\nA-1,First\r\nB-2,Sec"
+        mock_response = Mock()
+        mock_response.iter_content.return_value = [content[:12], content[12:20], content[20:]]
+
+        reader = ByteCountingLineReader(mock_response)
+        lines = list(reader)
+
+        self.assertEqual(lines, ["sku,name\r\n", "A-1,First\r\n", "B-2,Sec"])
+        self.assertEqual(reader.bytes_read, len(content))
+
+
+def fake_range_get(content: bytes):
+    """
+    Stand-in for requests.get against an object, honouring Range headers.
+    """
+    def _get(url, headers=None, stream=False):
+        start, end = 0, len(content) - 1
+        byte_range = (headers or {}).get("Range")
+        if byte_range:
+            first, last = byte_range[len("bytes="):].split("-")
+            start = int(first)
+            end = int(last) if last else end
+        body = content[start:end + 1]
+
+        resp = Mock()
+        resp.iter_content.side_effect = lambda chunk_size: [body[i:i + 7] for i in range(0, len(body), 7)]
+        resp.headers = {"Content-Length": str(len(body))}
+        resp.status_code = 206 if byte_range else 200
+        resp.raise_for_status = Mock()
+        return resp
+
+    return _get
+
+
+def run_import(content, file_key="imports/1.csv", upsert=None, upload=None, get=None, webhooks=None, **job_fields):
+    """
+    Create a queued job for ``content`` stored at ``file_key`` and run
+    process_import_job on it with R2 and webhook dispatch patched out.
+    ``upsert`` stands in for the batch writer, ``upload`` for the reject
+    upload and ``get`` for requests.get (fake_range_get by default). The
+    task's error is left on the job, not raised; returns the refreshed job.
+    """
+    from imports.tasks import process_import_job
+
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    job = ImportJob.objects.create(status=ImportJob.STATUS_QUEUED, file_key=file_key, **job_fields)
+    with patch('imports.tasks.generate_presigned_get_url', return_value="https://example.com/f"), \
+            patch('imports.tasks.get_object_size', return_value=len(content)), \
+            patch('imports.tasks.requests.get', side_effect=get or fake_range_get(content)), \
+            patch('imports.tasks.upsert_products_batch', side_effect=upsert) if upsert else nullcontext(), \
+            patch('imports.rejects.upload_fileobj', side_effect=upload), \
+            patch('imports.tasks.dispatch_webhooks_for_event', webhooks or Mock()):
+        process_import_job.apply(args=[job.id], throw=False)
+
+    job.refresh_from_db()
+    return job
+
+
+def csv_content(lines) -> bytes:
+    """
+    A CSV file with the standard header and ``lines`` (str or bytes).
+    """
+    return b"\n".join([b"sku,name,description"] + [
+        line if isinstance(line, bytes) else line.encode("utf-8") for line in lines
+    ]) + b"\n"
+
+
+@override_settings(
+    IMPORT_INGEST_ENGINE="orm", IMPORT_PARALLEL=True, IMPORT_CHUNK_BYTES=100, **FIXED_BATCH_SIZE, **LOCMEM_CACHE
+)
+class ParallelImportTests(TestCase):
+    """Test chunked imports over byte ranges."""
+
+    def setUp(self):
+        cache.clear()
+        lines = ["sku,name,description"] + [f"SKU-{i},Product {i},Desc {i}" for i in range(40)]
+        self.content = ("\r\n".join(lines) + "\r\n").encode("utf-8")
+        self.job = ImportJob.objects.create(
+            status=ImportJob.STATUS_QUEUED,
+            file_key="imports/1.csv"
+        )
+
+    def test_plan_chunks_covers_data(self):
+        """Test chunk ranges are contiguous and cover the data section."""
+        from imports.tasks import plan_chunks
+
+        ranges = plan_chunks(10, 1000, 300)
+        self.assertEqual(len(ranges), 4)
+        self.assertEqual(ranges[0][0], 10)
+        self.assertEqual(ranges[-1][1], 1000)
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+
+    @patch('imports.tasks.chord')
+    @patch('imports.tasks.get_object_size')
+    @patch('imports.tasks.generate_presigned_get_url')
+    @patch('imports.tasks.requests.get')
+    def test_process_import_job_dispatches_chunks(
+        self, mock_requests_get, mock_presigned, mock_size, mock_chord
+    ):
+        """Test large objects are fanned out as a chord of chunk tasks."""
+        mock_presigned.return_value = "https://example.com/file.csv"
+        mock_requests_get.side_effect = fake_range_get(self.content)
+        mock_size.return_value = len(self.content)
+
+        from imports.tasks import process_import_job
+        process_import_job.apply(args=[self.job.id])
+
+        header_tasks = mock_chord.call_args[0][0]
+        self.assertGreater(len(header_tasks), 1)
+        self.assertEqual(header_tasks[0].args[3], ["sku", "name", "description"])
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, ImportJob.STATUS_IMPORTING)
+        self.assertEqual(self.job.total_bytes, len(self.content))
+
+    @patch('imports.tasks.generate_presigned_get_url')
+    @patch('imports.tasks.requests.get')
+    @patch('imports.tasks.upsert_products_batch')
+    @patch('imports.tasks.dispatch_webhooks_for_event')
+    def test_chunks_import_every_line_once(
+        self, mock_webhook, mock_upsert, mock_requests_get, mock_presigned
+    ):
+        """Test line-aligned chunks import each row exactly once."""
+        mock_presigned.return_value = "https://example.com/file.csv"
+        mock_upsert.side_effect = lambda rows: {"inserted": len(rows)}
+        mock_requests_get.side_effect = fake_range_get(self.content)
+
+        from imports.tasks import (
+            align_chunks, finalize_import_job, plan_chunks, process_import_chunk, read_csv_header
+        )
+
+        fieldnames, data_start = read_csv_header("https://example.com/file.csv")
+        ranges = align_chunks("https://example.com/file.csv", plan_chunks(data_start, len(self.content), 100))
+        self.assertGreater(len(ranges), 3)
+
+        self.job.status = ImportJob.STATUS_IMPORTING
+        self.job.total_bytes = len(self.content)
+        self.job.processed_bytes = data_start
+        self.job.save()
+        progress.begin(self.job)
+
+        results = [
+            process_import_chunk.apply(args=[self.job.id, start, end, fieldnames]).get()
+            for start, end in ranges
+        ]
+
+        skus = [row[SKU] for call in mock_upsert.call_args_list for row in call[0][0]]
+        self.assertEqual(sorted(skus), sorted(f"SKU-{i}" for i in range(40)))
+
+        # Chunks report into the live Redis counters
+        live = progress.live_status(self.job.id)
+        self.assertEqual(live["processed_rows"], 40)
+        self.assertEqual(live["processed_bytes"], len(self.content))
+        self.assertEqual(live["percentage"], 100.0)
+        self.assertEqual(live["created"], 40)
+
+        finalize_import_job.apply(args=[results, self.job.id])
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, ImportJob.STATUS_COMPLETED)
+        self.assertEqual(self.job.total_rows, 40)
+        self.assertEqual(self.job.processed_bytes, len(self.content))
+        self.assertEqual(self.job.inserted_rows, 40)
+        mock_webhook.delay.assert_called_once()
+
+    def _multiline_content(self):
+        lines = ["sku,name,description"] + [f"SKU-{i},Product {i},Desc {i}" for i in range(40)]
+        lines[21] = 'SKU-20,Product 20,"line one\nSKU-FAKE,Not a product,x\n""quoted"" line three"'
+        lines[31] = 'SKU-30,27" monitor,Desc 30'
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    @patch('imports.tasks.chord')
+    @patch('imports.tasks.get_object_size')
+    @patch('imports.tasks.generate_presigned_get_url', return_value="https://example.com/file.csv")
+    @patch('imports.tasks.requests.get')
+    @patch('imports.tasks.dispatch_webhooks_for_event')
+    def test_chunks_align_to_quoted_rows(self, mock_webhook, mock_requests_get, mock_presigned, mock_size, mock_chord):
+        """Test chunk boundaries skip newlines inside quoted fields and ignore literal quotes."""
+        content = self._multiline_content()
+        mock_requests_get.side_effect = fake_range_get(content)
+        mock_size.return_value = len(content)
+
+        from imports.tasks import align_chunks, finalize_import_job, process_import_chunk, process_import_job
+
+        # A nominal boundary inside the multi-line description moves to the next row
+        field = content.index(b"SKU-FAKE")
+        ranges = align_chunks("https://example.com/file.csv", [(10, field), (field, len(content))])
+        self.assertEqual(ranges, [(10, content.index(b"SKU-21")), (content.index(b"SKU-21"), len(content))])
+
+        process_import_job.apply(args=[self.job.id])
+        chunks = mock_chord.call_args[0][0]
+        self.assertGreater(len(chunks), 3)
+        self.assertFalse(Product.objects.exists())
+
+        results = [process_import_chunk.apply(args=chunk.args).get() for chunk in chunks]
+        finalize_import_job.apply(args=[results, self.job.id])
+
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, ImportJob.STATUS_COMPLETED, self.job.error_message)
+        self.assertEqual(self.job.inserted_rows, 40)
+        self.assertEqual(
+            Product.objects.get(sku_norm="sku-20").description,
+            'line one\nSKU-FAKE,Not a product,x\n"quoted" line three',
+        )
+        self.assertEqual(Product.objects.get(sku_norm="sku-30").name, '27" monitor')
+        self.assertFalse(Product.objects.filter(sku_norm="sku-fake").exists())
+
+    @patch('imports.tasks.chord')
+    @patch('imports.tasks.get_object_size')
+    @patch('imports.tasks.generate_presigned_get_url', return_value="https://example.com/file.csv")
+    @patch('imports.tasks.requests.get')
+    @patch('imports.tasks.dispatch_webhooks_for_event')
+    def test_unbalanced_quotes_import_in_one_pass(
+        self, mock_webhook, mock_requests_get, mock_presigned, mock_size, mock_chord
+    ):
+        """Test a file whose quoting never closes isn't split into chunks."""
+        lines = ["sku,name,description"] + [f"SKU-{i},Product {i},Desc {i}" for i in range(40)]
+        lines[3] = 'SKU-2,"Product 2,Desc 2'
+        content = ("\n".join(lines) + "\n").encode("utf-8")
+        mock_requests_get.side_effect = fake_range_get(content)
+        mock_size.return_value = len(content)
+
+        from imports.tasks import process_import_job
+        process_import_job.apply(args=[self.job.id], throw=False)
+
+        mock_chord.assert_not_called()
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, ImportJob.STATUS_COMPLETED, self.job.error_message)
+        self.assertEqual(Product.objects.filter(sku_norm__in=["sku-0", "sku-1"]).count(), 2)
+
+
+@override_settings(IMPORT_INGEST_ENGINE="orm", **FIXED_BATCH_SIZE, **LOCMEM_CACHE)
+class ResumableImportTests(TestCase):
+    """Test checkpoints and resuming interrupted imports."""
+
+    def setUp(self):
+        cache.clear()
+        self.lines = ["sku,name,description"] + [f"SKU-{i},Product {i},Desc {i}" for i in range(2500)]
+        self.content = ("\n".join(self.lines) + "\n").encode("utf-8")
+
+    def _offset_after(self, rows: int) -> int:
+        return len(("\n".join(self.lines[:rows + 1]) + "\n").encode("utf-8"))
+
+    @override_settings(IMPORT_CHECKPOINT_SECONDS=0)
+    @patch('imports.tasks.generate_presigned_get_url')
+    @patch('imports.tasks.requests.get')
+    @patch('imports.tasks.dispatch_webhooks_for_event')
+    def test_checkpoint_saved_per_batch(self, mock_webhook, mock_requests_get, mock_presigned):
+        """Test a checkpoint is recorded after every committed batch."""
+        mock_presigned.return_value = "https://example.com/file.csv"
+        mock_requests_get.side_effect = fake_range_get(self.content)
+        job = ImportJob.objects.create(status=ImportJob.STATUS_QUEUED, file_key="imports/1.csv")
+
+        from imports.tasks import process_import_job
+        with patch('imports.tasks.upsert_products_batch') as mock_upsert:
+            mock_upsert.return_value = {"inserted": 1000, "updated": 0, "unchanged": 0}
+            process_import_job.apply(args=[job.id])
+
+        job.refresh_from_db()
+        self.assertEqual(job.checkpoint_batch, 2)
+        self.assertEqual(job.checkpoint_rows, 2000)
+        self.assertEqual(job.checkpoint_offset, self._offset_after(2000))
+        self.assertEqual(job.processed_rows, 2500)
+
+    @override_settings(IMPORT_CHECKPOINT_SECONDS=3600)
+    @patch('imports.tasks.generate_presigned_get_url')
+    @patch('imports.tasks.requests.get')
+    @patch('imports.tasks.dispatch_webhooks_for_event')
+    def test_batches_only_update_redis(self, mock_webhook, mock_requests_get, mock_presigned):
+        """Test per-batch progress goes to Redis and the job row is written at the end."""
+        mock_presigned.return_value = "https://example.com/file.csv"
+        mock_requests_get.side_effect = fake_range_get(self.content)
+        job = ImportJob.objects.create(status=ImportJob.STATUS_QUEUED, file_key="imports/1.csv")
+
+        seen = []
+
+        def upsert(rows):
+            seen.append((
+                ImportJob.objects.get(pk=job.id).processed_rows,
+                (progress.live_status(job.id) or {}).get("processed_rows"),
+            ))
+            return {"inserted": len(rows)}
+
+        from imports.tasks import process_import_job
+        with patch('imports.tasks.upsert_products_batch', side_effect=upsert):
+            process_import_job.apply(args=[job.id])
+
+        self.assertEqual(seen, [(0, 0), (0, 1000), (0, 2000)])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED)
+        self.assertEqual(job.processed_rows, 2500)
+        self.assertEqual(progress.live_status(job.id)["status"], ImportJob.STATUS_COMPLETED)
+
+    @patch('imports.tasks.generate_presigned_get_url')
+    @patch('imports.tasks.requests.get')
+    @patch('imports.tasks.upsert_products_batch')
+    @patch('imports.tasks.dispatch_webhooks_for_event')
+    def test_resume_from_checkpoint(self, mock_webhook, mock_upsert, mock_requests_get, mock_presigned):
+        """Test a restarted job only reads and writes rows after the checkpoint."""
+        mock_presigned.return_value = "https://example.com/file.csv"
+        mock_upsert.return_value = {"inserted": 500, "updated": 0, "unchanged": 0}
+        mock_requests_get.side_effect = fake_range_get(self.content)
+        job = ImportJob.objects.create(
+            status=ImportJob.STATUS_QUEUED,
+            file_key="imports/1.csv",
+            checkpoint_offset=self._offset_after(2000),
+            checkpoint_rows=2000,
+            checkpoint_batch=2,
+        )
+
+        from imports.tasks import process_import_job
+        process_import_job.apply(args=[job.id])
+
+        ranges = [call.kwargs.get("headers", {}).get("Range") for call in mock_requests_get.call_args_list]
+        self.assertIn(f"bytes={self._offset_after(2000)}-", ranges)
+
+        skus = [row[SKU] for call in mock_upsert.call_args_list for row in call[0][0]]
+        self.assertEqual(skus, [f"SKU-{i}" for i in range(2000, 2500)])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED)
+        self.assertEqual(job.processed_rows, 2500)
+        self.assertEqual(job.total_rows, 2500)
+        self.assertEqual(job.processed_bytes, len(self.content))
+        self.assertEqual(job.total_bytes, len(self.content))
+
+    @patch('imports.views.get_object_fingerprint', return_value=("etag", 100))
+    @patch('imports.views.process_import_job')
+    def test_start_with_restart_clears_checkpoint(self, mock_task, mock_fingerprint):
+        """Test restart=1 discards the checkpoint of a failed job."""
+        job = ImportJob.objects.create(
+            status=ImportJob.STATUS_FAILED,
+            file_key="imports/1.csv",
+            checkpoint_offset=1234,
+            checkpoint_rows=10,
+            checkpoint_batch=1,
+        )
+
+        response = Client().post(reverse("start_import_job", args=[job.id]), {"restart": "1"})
+        self.assertEqual(response.status_code, 200)
+
+        job.refresh_from_db()
+        self.assertEqual(job.checkpoint_offset, 0)
+        self.assertEqual(job.checkpoint_rows, 0)
+
+
+@override_settings(IMPORT_INGEST_ENGINE="orm", **FIXED_BATCH_SIZE, **LOCMEM_CACHE)
+class CompressedImportTests(TestCase):
+    """Test gzip/zstd uploads are decompressed while streaming."""
+
+    def setUp(self):
+        cache.clear()
+        self.lines = ["sku,name,description"] + [f"SKU-{i},Product {i},Desc {i}" for i in range(2500)]
+        self.csv = ("\n".join(self.lines) + "\n").encode("utf-8")
+
+    def _import(self, file_key, content, **job_fields):
+        skus = []
+
+        def upsert(rows):
+            skus.extend(row[SKU] for row in rows)
+            return {"inserted": len(rows)}
+
+        get = Mock(side_effect=fake_range_get(content))
+        job = run_import(content, file_key, upsert=upsert, get=get, **job_fields)
+        return job, skus, get
+
+    def test_gzip_import(self):
+        """Test a gzip file is imported and progress tracks compressed bytes."""
+        # Two concatenated gzip members, as produced by `cat a.gz b.gz`
+        half = len(self.csv) // 2
+        half = self.csv.index(b"\n", half) + 1
+        content = gzip.compress(self.csv[:half]) + gzip.compress(self.csv[half:])
+
+        job, skus, _ = self._import("imports/1.csv.gz", content)
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED)
+        self.assertCountEqual(skus, [f"SKU-{i}" for i in range(2500)])
+        self.assertEqual(job.total_rows, 2500)
+        self.assertEqual(job.processed_bytes, len(content))
+        self.assertEqual(job.total_bytes, len(content))
+
+    @skipUnless(zstandard, "zstandard not installed")
+    def test_zstd_import(self):
+        """Test a zstd file is imported."""
+        content = zstandard.ZstdCompressor().compress(self.csv)
+
+        job, skus, _ = self._import("imports/1.csv.zst", content)
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED)
+        self.assertEqual(len(skus), 2500)
+
+    def test_truncated_upload_fails(self):
+        """Test a compressed file cut short fails the job instead of importing part of it."""
+        content = gzip.compress(self.csv)
+        job, _, _ = self._import("imports/1.csv.gz", content[:len(content) // 2])
+
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertIn("Truncated gzip stream", job.error_message)
+
+        if zstandard is not None:
+            content = zstandard.ZstdCompressor().compress(self.csv)
+            job, _, _ = self._import("imports/2.csv.zst", content[:len(content) // 2])
+
+            self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+            self.assertIn("Truncated zstd stream", job.error_message)
+
+    @override_settings(IMPORT_PARALLEL=True, IMPORT_CHUNK_BYTES=100)
+    def test_compressed_resume_skips_committed_rows(self):
+        """Test a compressed resume re-streams without Range and skips committed lines."""
+        offset = len(("\n".join(self.lines[:2001]) + "\n").encode("utf-8"))
+
+        job, skus, mock_get = self._import(
+            "imports/1.csv.gz", gzip.compress(self.csv),
+            checkpoint_offset=offset, checkpoint_rows=2000, checkpoint_batch=2,
+        )
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED, job.error_message)
+        self.assertEqual(skus, [f"SKU-{i}" for i in range(2000, 2500)])
+        self.assertFalse(any(call.kwargs.get("headers") for call in mock_get.call_args_list))
+        self.assertEqual(job.processed_rows, 2500)
+
+
+@override_settings(IMPORT_INGEST_ENGINE="orm", **FIXED_BATCH_SIZE, **LOCMEM_CACHE)
+class ColumnarImportTests(TestCase):
+    """Test Parquet / Arrow IPC imports."""
+
+    def setUp(self):
+        cache.clear()
+
+    def _table(self, count=2500):
+        return pyarrow.table({
+            "sku": [f" SKU-{i} " if i % 500 else "" for i in range(count)],
+            "name": [f"Product {i}" for i in range(count)],
+            "description": [None if i % 3 == 0 else f"Desc {i}" for i in range(count)],
+        })
+
+    def _import(self, file_key, content, **job_fields):
+        written = []
+
+        def upsert(rows):
+            written.extend(rows)
+            return {"inserted": len(rows)}
+
+        return run_import(content, file_key, upsert=upsert, **job_fields), written
+
+    def test_detect_file_format(self):
+        """Test the format comes from the key, then the content type."""
+        from imports.columnar import detect_file_format
+        self.assertEqual(detect_file_format("imports/1.parquet"), "parquet")
+        self.assertEqual(detect_file_format("imports/1.arrow"), "arrow")
+        self.assertEqual(detect_file_format("imports/1.csv.gz"), "csv")
+        self.assertEqual(detect_file_format("imports/1", "application/vnd.apache.parquet"), "parquet")
+        self.assertIsNone(detect_file_format("imports/1", "application/octet-stream"))
+
+    @patch('imports.views.generate_presigned_put_url', return_value="https://example.com/upload-url")
+    def test_create_upload_job_parquet(self, mock_presigned_url):
+        """Test a Parquet upload gets a .parquet key."""
+        response = Client().post(
+            reverse("create_upload_job"),
+            data=json.dumps({"filename": "catalog.parquet"}),
+            content_type="application/json",
+        )
+        data = json.loads(response.content)
+        self.assertEqual(data["content_type"], "application/vnd.apache.parquet")
+        self.assertEqual(ImportJob.objects.get(id=data["job_id"]).file_key, f"imports/{data['job_id']}.parquet")
+
+    @skipUnless(pyarrow, "pyarrow not installed")
+    def test_parquet_import(self):
+        """Test Parquet rows are normalized column-wise and written in batches."""
+        buf = io.BytesIO()
+        pyarrow.parquet.write_table(self._table(), buf, row_group_size=700)
+
+        job, written = self._import("imports/1.parquet", buf.getvalue())
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED)
+        self.assertEqual(job.total_rows, 2495)  # rows without a SKU are skipped
+        self.assertEqual(job.inserted_rows, 2495)
+        by_sku = {row[SKU]: row for row in written}
+        self.assertEqual(by_sku["SKU-1"][SKU_NORM], "sku-1")
+        self.assertEqual(by_sku["SKU-1"][DESCRIPTION], "Desc 1")
+        self.assertEqual(by_sku["SKU-3"][DESCRIPTION], "")
+        self.assertEqual(
+            by_sku["SKU-1"][CONTENT_HASH], product_content_hash("SKU-1", "Product 1", "Desc 1", True)
+        )
+
+    @skipUnless(pyarrow, "pyarrow not installed")
+    def test_arrow_stream_import_with_active_column(self):
+        """Test an Arrow IPC stream is read and its active column honoured."""
+        table = pyarrow.table({"sku": ["A", "B", "C"], "name": ["a", "b", "c"], "active": [True, False, None]})
+        sink = pyarrow.BufferOutputStream()
+        with pyarrow.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+
+        job, written = self._import("imports/1.arrow", sink.getvalue().to_pybytes())
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED)
+        self.assertEqual([row[ACTIVE] for row in written], [True, False, True])
+
+    @skipUnless(pyarrow, "pyarrow not installed")
+    def test_parquet_resume_skips_consumed_rows(self):
+        """Test a resumed Parquet import starts after the checkpointed rows."""
+        buf = io.BytesIO()
+        pyarrow.parquet.write_table(self._table(), buf, row_group_size=700)
+
+        job, written = self._import(
+            "imports/1.parquet", buf.getvalue(),
+            checkpoint_offset=2000, checkpoint_rows=1996, checkpoint_batch=2,
+        )
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED, job.error_message)
+        self.assertEqual([row[SKU] for row in written], [f"SKU-{i}" for i in range(2001, 2500)])
+        self.assertEqual(job.processed_rows, 2495)
+
+
+@override_settings(IMPORT_INGEST_ENGINE="orm", IMPORT_PIPELINE=True, IMPORT_PIPELINE_DEPTH=2, **LOCMEM_CACHE)
+class PipelineTests(TestCase):
+    """Test the threaded reader/parser/writer pipeline."""
+
+    def setUp(self):
+        cache.clear()
+
+    def _run_job(self, resp, upsert):
+        job = ImportJob.objects.create(status=ImportJob.STATUS_QUEUED, file_key="imports/1.csv")
+        from imports.tasks import process_import_job
+        with patch('imports.tasks.generate_presigned_get_url', return_value="https://example.com/f"), \
+                patch('imports.tasks.requests.get', return_value=resp), \
+                patch('imports.tasks.upsert_products_batch', side_effect=upsert), \
+                patch('imports.tasks.dispatch_webhooks_for_event'):
+            # Re-raise the task's error whatever CELERY_TASK_EAGER_PROPAGATES says
+            result = process_import_job.apply(args=[job.id], throw=True)
+        job.refresh_from_db()
+        return job, result
+
+    def test_run_in_thread_keeps_order(self):
+        """Test items come out of the background stage in order."""
+        from imports.pipeline import run_in_thread
+        self.assertEqual(list(run_in_thread(range(100), name="test")), list(range(100)))
+
+    def test_run_in_thread_reraises(self):
+        """Test an error in the producer is raised in the consumer."""
+        from imports.pipeline import run_in_thread
+
+        def items():
+            yield 1
+            raise RuntimeError("boom")
+
+        consumed = []
+        with self.assertRaisesMessage(RuntimeError, "boom"):
+            for item in run_in_thread(items(), name="test"):
+                consumed.append(item)
+        self.assertEqual(consumed, [1])
+
+    def test_reader_error_fails_job(self):
+        """Test a network error on the reader thread is recorded on the job."""
+        def body(chunk_size):
+            yield b"sku,name,description\nA,a,\n"
+            raise ConnectionError("connection reset")
+
+        resp = Mock(headers={"Content-Length": "100"}, status_code=200)
+        resp.iter_content.side_effect = body
+
+        with self.assertRaises(ConnectionError):
+            self._run_job(resp, lambda rows: {"inserted": len(rows)})
+        job = ImportJob.objects.get()
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertEqual(job.error_message, "connection reset")
+
+    def test_writer_error_fails_job(self):
+        """Test a DB error stops the pipeline and is recorded on the job."""
+        content = ("sku,name,description\n" + "".join(f"S{i},n,d\n" for i in range(5000))).encode()
+        resp = Mock(headers={"Content-Length": str(len(content))}, status_code=200)
+        resp.iter_content.side_effect = lambda chunk_size: (content[i:i + 512] for i in range(0, len(content), 512))
+
+        def upsert(rows):
+            raise RuntimeError("deadlock detected")
+
+        with self.assertRaises(RuntimeError):
+            self._run_job(resp, upsert)
+        job = ImportJob.objects.get()
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertEqual(job.error_message, "deadlock detected")
+
+
+@override_settings(
+    IMPORT_BATCH_SIZE=1000, IMPORT_BATCH_MIN=100, IMPORT_BATCH_MAX=20000,
+    IMPORT_BATCH_TARGET_SECONDS=0.5, IMPORT_BATCH_MAX_BYTES=1024 * 1024,
+    **LOCMEM_CACHE,
+)
+class BatchSizeControllerTests(TestCase):
+    """Test adaptive batch sizing."""
+
+    def test_grows_toward_target_commit_time(self):
+        """Test fast commits grow the batch, at most doubling each time."""
+        from imports.batching import BatchSizeController
+        controller = BatchSizeController()
+
+        controller.record(1000, 0.05, 50_000)  # 20k rows/s -> 10k rows per 0.5s
+        self.assertEqual(controller.size, 2000)
+        controller.record(2000, 0.1, 100_000)
+        self.assertEqual(controller.size, 4000)
+
+    def test_shrinks_on_slow_commits_and_large_rows(self):
+        """Test slow commits and big payloads shrink the batch."""
+        from imports.batching import BatchSizeController
+        controller = BatchSizeController()
+
+        controller.record(1000, 2.0, 50_000)  # 500 rows/s -> 250 rows per 0.5s
+        self.assertEqual(controller.size, 500)
+
+        controller = BatchSizeController()
+        controller.record(1000, 0.05, 4 * 1024 * 1024)  # ~4 KB rows: cap of 250 rows, halving at most
+        self.assertEqual(controller.size, 500)
+        controller.record(500, 0.025, 2 * 1024 * 1024)
+        self.assertEqual(controller.size, 250)
+
+    def test_summary_is_recorded_on_job(self):
+        """Test the chosen sizes end up on the job."""
+        from imports.tasks import process_import_job
+        content = ("sku,name,description\n" + "".join(f"S{i},n,d\n" for i in range(3000))).encode()
+        job = ImportJob.objects.create(status=ImportJob.STATUS_QUEUED, file_key="imports/1.csv")
+
+        with override_settings(IMPORT_INGEST_ENGINE="orm"), \
+                patch('imports.tasks.generate_presigned_get_url', return_value="https://example.com/f"), \
+                patch('imports.tasks.requests.get', side_effect=fake_range_get(content)), \
+                patch('imports.tasks.dispatch_webhooks_for_event'):
+            process_import_job.apply(args=[job.id])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED)
+        self.assertEqual(job.batch_tuning["initial"], 1000)
+        self.assertGreaterEqual(job.batch_tuning["batches"], 1)
+        self.assertEqual(sum(rows for rows, _, _ in job.batch_tuning["history"]), 3000)
+
+
+@override_settings(**LOCMEM_CACHE)
+class StageStatsTests(TestCase):
+    """Test per-stage import timing."""
+
+    def test_nested_stages_are_exclusive(self):
+        """Test time in a nested stage isn't also charged to the outer one."""
+        from imports.stats import StageStats
+        stats = StageStats()
+
+        with patch('imports.stats.time.monotonic', side_effect=[0.0, 1.0, 4.0, 5.0]):
+            with stats.stage("parse"):
+                with stats.stage("download"):
+                    pass
+
+        self.assertEqual(stats.seconds["parse"], 2.0)
+        self.assertEqual(stats.seconds["download"], 3.0)
+
+    @override_settings(IMPORT_INGEST_ENGINE="orm", **FIXED_BATCH_SIZE)
+    def test_job_records_stage_stats(self):
+        """Test a finished job exposes its stage stats through the status endpoint."""
+        from imports.tasks import process_import_job
+        content = ("sku,name,description\n" + "".join(f"{'' if i % 10 == 0 else f'S{i}'},n,d\n" for i in range(2500))).encode()
+        job = ImportJob.objects.create(status=ImportJob.STATUS_QUEUED, file_key="imports/1.csv")
+
+        with patch('imports.tasks.generate_presigned_get_url', return_value="https://example.com/f"), \
+                patch('imports.tasks.requests.get', side_effect=fake_range_get(content)), \
+                patch('imports.tasks.dispatch_webhooks_for_event'):
+            process_import_job.apply(args=[job.id])
+
+        stats = json.loads(Client().get(reverse("import_job_status", args=[job.id])).content)["stage_stats"]
+        self.assertEqual(stats["download_bytes"], len(content))
+        self.assertEqual(stats["rows_parsed"], 2500)
+        self.assertEqual(stats["rows_skipped"], 250)
+        self.assertEqual(stats["rows_written"], 2250)
+        self.assertEqual(stats["batches"], 3)
+        for stage in ("download", "parse", "normalize", "db"):
+            self.assertGreaterEqual(stats[f"{stage}_seconds"], 0)
+
+        job.refresh_from_db()
+        self.assertEqual(job.stage_stats["rows_parsed"], 2500)
+
+
+class NormalizeTests(TestCase):
+    """Test column-wise batch normalization."""
+
+    def test_normalize_csv_batch(self):
+        """Test CSV rows are trimmed, hashed and rows without a SKU dropped."""
+        from imports.normalize import csv_column_indexes, normalize_csv_batch
+
+        indexes = csv_column_indexes(["name", "SKU", "description"])
+        rows = normalize_csv_batch([[" Widget ", " AB-1 ", " Blue "], ["Nothing", "  "], ["Short", "cd-2"]], indexes)
+
+        self.assertEqual(rows, [
+            ("AB-1", "ab-1", "Widget", "Blue", True, product_content_hash("AB-1", "Widget", "Blue", True)),
+            ("cd-2", "cd-2", "Short", "", True, product_content_hash("cd-2", "Short", "", True)),
+        ])
+
+
+class IngestEngineTests(TestCase):
+    """Test ingest engine selection and the COPY engine."""
+
+    def _rows(self, *skus, name="Product"):
+        return normalize_columns(skus, [name] * len(skus), [""] * len(skus))
+
+    @override_settings(IMPORT_INGEST_ENGINE="auto")
+    def test_resolve_ingest_engine_auto(self):
+        """Test auto picks COPY on PostgreSQL and the ORM elsewhere."""
+        from imports.ingest import resolve_ingest_engine
+
+        expected = ImportJob.ENGINE_COPY if connection.vendor == "postgresql" else ImportJob.ENGINE_ORM
+        self.assertEqual(resolve_ingest_engine(""), expected)
+        self.assertEqual(resolve_ingest_engine(ImportJob.ENGINE_ORM), ImportJob.ENGINE_ORM)
+
+    @skipUnless(connection.vendor != "postgresql", "SQLite fallback only")
+    def test_resolve_ingest_engine_copy_falls_back(self):
+        """Test COPY falls back to the ORM off PostgreSQL."""
+        from imports.ingest import resolve_ingest_engine
+
+        self.assertEqual(resolve_ingest_engine(ImportJob.ENGINE_COPY), ImportJob.ENGINE_ORM)
+
+    def test_orm_upsert_inserts_and_updates(self):
+        """Test the ORM engine upserts on sku_norm."""
+        from imports.ingest import upsert_products_batch
+
+        upsert_products_batch(self._rows("A-1", "B-2"))
+        upsert_products_batch(self._rows("a-1", name="Renamed"))
+
+        self.assertEqual(Product.objects.count(), 2)
+        self.assertEqual(Product.objects.get(sku_norm="a-1").name, "Renamed")
+
+    def test_orm_upsert_skips_unchanged_rows(self):
+        """Test rows with an unchanged content hash are not rewritten."""
+        from imports.ingest import upsert_products_batch
+
+        upsert_products_batch(self._rows("A-1", "B-2"))
+        before = Product.objects.get(sku_norm="b-2").updated_at
+
+        counts = upsert_products_batch(self._rows("A-1", "B-2", "C-3") + self._rows("X-9", name="Other"))
+        self.assertEqual(counts, {"inserted": 2, "updated": 0, "unchanged": 2})
+
+        counts = upsert_products_batch(self._rows("A-1", name="Renamed") + self._rows("B-2"))
+        self.assertEqual(counts, {"inserted": 0, "updated": 1, "unchanged": 1})
+        self.assertEqual(Product.objects.get(sku_norm="b-2").updated_at, before)
+
+    @skipUnless(connection.vendor == "postgresql", "COPY requires PostgreSQL")
+    def test_copy_upsert_skips_unchanged_rows(self):
+        """Test the COPY merge only touches rows whose content hash changed."""
+        from imports.ingest import copy_upsert_products_batch
+
+        copy_upsert_products_batch(self._rows("A-1", "B-2"))
+        before = Product.objects.get(sku_norm="b-2").updated_at
+
+        counts = copy_upsert_products_batch(self._rows("A-1", name="Renamed") + self._rows("B-2", "C-3"))
+        self.assertEqual(counts, {"inserted": 1, "updated": 1, "unchanged": 1})
+        self.assertEqual(Product.objects.get(sku_norm="b-2").updated_at, before)
+
+    @skipUnless(connection.vendor == "postgresql", "COPY requires PostgreSQL")
+    def test_copy_upsert_inserts_and_updates(self):
+        """Test the COPY engine upserts on sku_norm."""
+        from imports.ingest import copy_upsert_products_batch
+
+        copy_upsert_products_batch(self._rows("A-1", "B-2"))
+        copy_upsert_products_batch(self._rows("a-1", name="Renamed, with comma"))
+
+        self.assertEqual(Product.objects.count(), 2)
+        product = Product.objects.get(sku_norm="a-1")
+        self.assertEqual(product.name, "Renamed, with comma")
+        self.assertEqual(product.sku, "a-1")
+
+
+class BenchmarkTests(TestCase):
+    """Test the synthetic catalog generator and the local R2 stand-in."""
+
+    def test_catalog_rows_are_deterministic(self):
+        """Test the same seed gives the same catalog and duplicates collide on sku_norm."""
+        from imports.benchmark import catalog_rows
+
+        rows = list(catalog_rows(2000, duplicate_ratio=0.25, description_length=40, seed=7))
+        self.assertEqual(rows, list(catalog_rows(2000, duplicate_ratio=0.25, description_length=40, seed=7)))
+
+        unique = len({sku.lower() for sku, _, _ in rows})
+        self.assertAlmostEqual(1 - unique / len(rows), 0.25, delta=0.05)
+        self.assertTrue(all(len(description) <= 40 for _, _, description in rows))
+
+    def test_object_server_serves_ranges_and_head(self):
+        """Test the stand-in answers presigned HEAD and ranged GET requests."""
+        import tempfile
+        from backend.r2 import generate_presigned_get_url, get_object_size
+        from imports.benchmark import ObjectServer, generate_catalog
+        import requests
+
+        with tempfile.TemporaryDirectory() as tmp:
+            size = generate_catalog(f"{tmp}/catalog.csv", rows=10)
+
+            with ObjectServer(tmp) as server, server.as_r2():
+                self.assertEqual(get_object_size("catalog.csv"), size)
+
+                url = generate_presigned_get_url("catalog.csv")
+                resp = requests.get(url, headers={"Range": "bytes=0-3"}, timeout=5)
+                self.assertEqual(resp.status_code, 206)
+                self.assertEqual(resp.content, b"sku,")
+                self.assertEqual(requests.get(url.replace("catalog", "missing"), timeout=5).status_code, 404)
+
+
+@override_settings(**LOCMEM_CACHE)
+class ValidationTests(TestCase):
+    """Test validation-only (dry run) jobs."""
+
+    def setUp(self):
+        cache.clear()
+
+    def _validate(self, file_key, content):
+        upsert, webhooks = Mock(), Mock()
+        job = run_import(content, file_key, upsert=upsert, webhooks=webhooks, mode=ImportJob.MODE_VALIDATE)
+
+        upsert.assert_not_called()
+        webhooks.delay.assert_not_called()
+        return job
+
+    def test_csv_dry_run_reports_issues(self):
+        """Test empty, duplicate and over-length values are counted and sampled."""
+        lines = ["sku,name,description"] + [f"SKU-{i},Product {i},Desc" for i in range(12000)]
+        lines[5] = " ,No sku,Desc"
+        lines[10] = "sku-1,Duplicate,Desc"
+        lines[11000] = f"{'S' * 65},{'N' * 256},Desc"
+        lines[11500] = "SKU-11500," + "x" * 200000
+        content = gzip.compress(("\n".join(lines) + "\n").encode("utf-8"))
+
+        job = self._validate("imports/1.csv.gz", content)
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED)
+        self.assertEqual(job.total_rows, 12000)
+        self.assertEqual(job.processed_bytes, len(content))
+        self.assertFalse(Product.objects.exists())
+
+        report = job.validation_report
+        self.assertEqual(
+            report["issues"],
+            {"empty_sku": 1, "duplicate_sku": 1, "sku_too_long": 1, "name_too_long": 1, "malformed_line": 1},
+        )
+        self.assertEqual(report["invalid_rows"], 4)
+        self.assertEqual(report["valid_rows"], 11996)
+        self.assertEqual([sample.get("row") for sample in report["samples"]], [5, 10, 11000, None])
+        self.assertEqual(report["samples"][1]["first_seen_row"], 2)
+        self.assertEqual(report["samples"][2]["issues"], ["sku_too_long", "name_too_long"])
+        self.assertIn("line 11501", report["samples"][3]["error"])
+
+        status = progress.status_from_job(job)
+        self.assertEqual(status["mode"], ImportJob.MODE_VALIDATE)
+        self.assertEqual(status["validation_report"]["invalid_rows"], 4)
+
+    def test_missing_columns_and_sample_limit(self):
+        """Test missing columns are reported and samples are capped."""
+        lines = ["sku"] + [""] * 10
+        with override_settings(IMPORT_VALIDATION_SAMPLE_ROWS=3):
+            job = self._validate("imports/1.csv", ("\n".join(lines) + "\n").encode("utf-8"))
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED, job.error_message)
+        report = job.validation_report
+        self.assertEqual(report["missing_columns"], ["name", "description"])
+        self.assertEqual(report["issues"]["empty_sku"], 10)
+        self.assertEqual(len(report["samples"]), 3)
+
+    @skipUnless(pyarrow, "pyarrow not installed")
+    def test_parquet_dry_run(self):
+        """Test Parquet files are validated column-wise."""
+        import pyarrow.parquet
+
+        table = pyarrow.table({"sku": ["A-1", " a-1 ", None], "name": ["One", "Two", "Three"]})
+        buf = io.BytesIO()
+        pyarrow.parquet.write_table(table, buf)
+
+        job = self._validate("imports/1.parquet", buf.getvalue())
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED, job.error_message)
+        self.assertEqual(job.validation_report["issues"]["duplicate_sku"], 1)
+        self.assertEqual(job.validation_report["issues"]["empty_sku"], 1)
+        self.assertEqual(job.validation_report["missing_columns"], ["description"])
+
+    @patch('imports.views.get_object_fingerprint', return_value=("etag", 100))
+    @patch('imports.views.process_import_job')
+    def test_validated_job_can_be_started_as_import(self, mock_task, mock_fingerprint):
+        """Test a completed dry run can be re-run as the real import, but not as another dry run."""
+        job = ImportJob.objects.create(
+            status=ImportJob.STATUS_COMPLETED, file_key="imports/1.csv", mode=ImportJob.MODE_VALIDATE
+        )
+        url = reverse("start_import_job", args=[job.id])
+
+        self.assertEqual(self.client.post(url).status_code, 400)
+
+        response = self.client.post(url, data=json.dumps({"mode": "import"}), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        job.refresh_from_db()
+        self.assertEqual(job.mode, ImportJob.MODE_IMPORT)
+        mock_task.delay.assert_called_once_with(job.id)
+
+
+@override_settings(IMPORT_PARALLEL=True, IMPORT_CHUNK_BYTES=100, **FIXED_BATCH_SIZE, **LOCMEM_CACHE)
+class ReplaceImportTests(TestCase):
+    """Test replace imports that swap in a shadow table."""
+
+    def setUp(self):
+        cache.clear()
+
+    def _replace(self, lines):
+        return run_import(csv_content(lines), mode=ImportJob.MODE_REPLACE)
+
+    def _indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = %s ORDER BY 1", [Product._meta.db_table])
+            return [name for (name,) in cursor.fetchall()]
+
+    @skipUnless(connection.vendor == "postgresql", "Replace imports require PostgreSQL")
+    def test_replace_swaps_in_the_file(self):
+        """Test the file becomes the catalog, existing ids survive and indexes are rebuilt."""
+        kept = Product.objects.create(sku="A-1", name="Kept", description="Same")
+        Product.objects.create(sku="B-2", name="Old name", description="")
+        Product.objects.create(sku="C-3", name="Gone", description="")
+        indexes = self._indexes()
+
+        lines = ["A-1,Kept,Same", "B-2,New name,", "D-4,First,"]
+        lines += [f"E-{i},Filler {i}," for i in range(2500)] + ["d-4,Last wins,"]
+        job = self._replace(lines)
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED, job.error_message)
+        self.assertEqual(
+            job.result_counts(),
+            {"inserted": 2501, "updated": 1, "unchanged": 1, "deleted": 1, "deactivated": 0, "rejected": 0, "duplicate": 0},
+        )
+        self.assertEqual(job.total_rows, 2504)
+
+        self.assertEqual(Product.objects.count(), 2503)
+        self.assertFalse(Product.objects.filter(sku_norm="c-3").exists())
+        self.assertEqual(Product.objects.get(sku_norm="a-1").id, kept.id)
+        self.assertEqual(Product.objects.get(sku_norm="b-2").name, "New name")
+        self.assertEqual(Product.objects.get(sku_norm="d-4").name, "Last wins")
+        self.assertEqual(self._indexes(), indexes)
+
+        # Uniqueness is enforced again on the swapped-in table
+        from django.db import IntegrityError, transaction
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Product.objects.create(sku="B-2", name="Dupe")
+
+    @skipUnless(connection.vendor == "postgresql", "Replace imports require PostgreSQL")
+    @override_settings(IMPORT_REPLACE_MIN_RATIO=0.5)
+    def test_replace_refuses_a_shrunken_catalog(self):
+        """Test a file much smaller than the catalog leaves the live table alone."""
+        Product.objects.bulk_create([Product(sku=f"P-{i}", sku_norm=f"p-{i}", name="x") for i in range(10)])
+
+        job = self._replace(["P-1,Only one,"])
+
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertIn("fewer than 50%", job.error_message)
+        self.assertEqual(Product.objects.count(), 10)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s)", [f"{Product._meta.db_table}_shadow"])
+            self.assertIsNone(cursor.fetchone()[0])
+
+    @skipUnless(connection.vendor == "postgresql", "Replace imports require PostgreSQL")
+    def test_replace_keeps_grants_and_triggers(self):
+        """Test the swapped-in table has the live table's grants and triggers."""
+        table = Product._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f"GRANT SELECT ON {table} TO PUBLIC")
+            cursor.execute(
+                "CREATE FUNCTION test_upper_name() RETURNS trigger LANGUAGE plpgsql AS "
+                "$$ BEGIN NEW.name := upper(NEW.name); RETURN NEW; END $$"
+            )
+            cursor.execute(
+                f"CREATE TRIGGER test_upper_name BEFORE INSERT ON {table} FOR EACH ROW EXECUTE FUNCTION test_upper_name()"
+            )
+
+        job = self._replace(["A-1,Loaded,"])
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED, job.error_message)
+        # The trigger doesn't fire for the load, only for later writes
+        self.assertEqual(Product.objects.get(sku_norm="a-1").name, "Loaded")
+        self.assertEqual(Product.objects.create(sku="B-2", name="later").name, "later")
+        self.assertEqual(Product.objects.get(sku_norm="b-2").name, "LATER")
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT has_table_privilege('public', %s, 'SELECT')", [table])
+            self.assertTrue(cursor.fetchone()[0])
+
+    @skipUnless(connection.vendor == "postgresql", "Replace imports require PostgreSQL")
+    def test_replace_refuses_a_referenced_table(self):
+        """Test products referenced by a foreign key aren't swapped out from under it."""
+        Product.objects.create(sku="A-1", name="Kept")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE test_product_ref (product_id uuid REFERENCES {Product._meta.db_table} (id))"
+            )
+
+        job = self._replace(["B-2,New,"])
+
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertIn("referenced by foreign keys (test_product_ref.", job.error_message)
+        self.assertEqual(list(Product.objects.values_list("sku_norm", flat=True)), ["a-1"])
+
+    @skipUnless(connection.vendor != "postgresql", "Replace imports are supported on PostgreSQL")
+    def test_replace_requires_postgres(self):
+        """Test replace mode is rejected up front on other databases."""
+        response = self.client.post(reverse("create_upload_job"), {"mode": "replace"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ImportJob.objects.exists())
+
+
+@override_settings(**FIXED_BATCH_SIZE, **LOCMEM_CACHE)
+class SyncImportTests(TestCase):
+    """Test sync imports that deactivate or delete products missing from the file."""
+
+    def setUp(self):
+        cache.clear()
+        for sku in ("A-1", "B-2", "C-3", "D-4"):
+            Product.objects.create(sku=sku, name=f"Product {sku}", description="")
+
+    def _sync(self, sync, lines):
+        return run_import(csv_content(lines), sync_missing=sync)
+
+    def test_sync_deactivates_missing_products(self):
+        """Test products missing from the file are deactivated with a fresh content hash."""
+        lines = ["a-1,Product A-1,", "B-2,Renamed,"] + [f"N-{i},New {i}," for i in range(1500)]
+        job = self._sync(ImportJob.SYNC_DEACTIVATE, lines)
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED, job.error_message)
+        self.assertFalse(ImportSeenSku.objects.exists())
+        self.assertEqual(job.deactivated_rows, 2)
+        self.assertEqual(job.deleted_rows, 0)
+        self.assertEqual(set(Product.objects.filter(active=False).values_list("sku_norm", flat=True)), {"c-3", "d-4"})
+
+        product = Product.objects.get(sku_norm="c-3")
+        self.assertEqual(product.content_hash, product_content_hash("C-3", "Product C-3", "", False))
+        self.assertEqual(Product.objects.filter(active=True).count(), 1502)
+
+    @override_settings(IMPORT_PARALLEL=True, IMPORT_CHUNK_BYTES=2000)
+    @patch('imports.tasks.chord')
+    def test_sync_deletes_missing_products_across_chunks(self, mock_chord):
+        """Test values recorded by parallel chunks are all taken into account."""
+        from imports.tasks import finalize_import_job, process_import_chunk
+
+        lines = [f"N-{i},New {i}," for i in range(1500)] + ["D-4,Kept,", "A-1,Kept,"]
+        job = self._sync(ImportJob.SYNC_DELETE, lines)
+        chunks = mock_chord.call_args[0][0]
+        self.assertGreater(len(chunks), 1)
+
+        with patch('imports.tasks.generate_presigned_get_url', return_value="https://example.com/f"), \
+                patch('imports.tasks.requests.get', side_effect=fake_range_get(csv_content(lines))), \
+                patch('imports.tasks.dispatch_webhooks_for_event'):
+            results = [process_import_chunk.apply(args=chunk.args).get() for chunk in chunks]
+            finalize_import_job.apply(args=[results, job.id])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED, job.error_message)
+        self.assertFalse(ImportSeenSku.objects.exists())
+        self.assertEqual(job.deleted_rows, 2)
+        self.assertFalse(Product.objects.filter(sku_norm__in=["b-2", "c-3"]).exists())
+        self.assertEqual(Product.objects.count(), 1502)
+
+    @override_settings(IMPORT_SYNC_MIN_RATIO=0.9)
+    def test_sync_refuses_a_truncated_feed(self):
+        """Test a file listing too few of the current products leaves the rest alone."""
+        job = self._sync(ImportJob.SYNC_DELETE, ["A-1,Product A-1,"])
+
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertIn("Sync aborted", job.error_message)
+        self.assertEqual(Product.objects.count(), 4)
+        # Kept for a resumed job, which only records the rows after its checkpoint
+        self.assertEqual(list(ImportSeenSku.objects.filter(job_id=job.id).values_list("sku_norm", flat=True)), ["a-1"])
+
+    def test_sync_refuses_a_file_with_rejected_rows(self):
+        """Test a product whose row was rejected isn't removed as missing."""
+        lines = [b"A-1,Product A-1,", b"B-2,Caf\xe9,", b"C-3,Product C-3,", b"D-4,Product D-4,"]
+        job = self._sync(ImportJob.SYNC_DELETE, lines)
+
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertIn("Sync aborted: 1 rows", job.error_message)
+        self.assertTrue(Product.objects.filter(sku_norm="b-2").exists())
+
+
+@override_settings(**FIXED_BATCH_SIZE, **LOCMEM_CACHE)
+class RejectTests(TestCase):
+    """Test rows that can't be imported are rejected instead of failing the job."""
+
+    def setUp(self):
+        cache.clear()
+        self.uploads = {}
+
+    def _upload(self, object_key, fileobj, content_type):
+        self.uploads[object_key] = list(csv.reader(io.StringIO(fileobj.read().decode("utf-8"))))
+
+    def _import(self, content):
+        return run_import(content, upload=self._upload)
+
+    def test_bisection_isolates_refused_rows(self):
+        """Test a refused batch is split until only the bad rows are left out."""
+        from django.db import IntegrityError
+        from imports.rejects import RejectFile, isolating_writer
+
+        rows = normalize_columns([f"SKU-{i}" for i in range(64)], ["n"] * 64, [""] * 64)
+        bad = {"sku-5", "sku-6", "sku-40"}
+        calls = []
+
+        def write_batch(part):
+            calls.append(len(part))
+            if any(row[SKU_NORM] in bad for row in part):
+                raise IntegrityError("refused")
+            return {"inserted": len(part)}
+
+        rejects = RejectFile("imports/1.csv.rejects.0.csv", max_rows=2)
+        counts = isolating_writer(write_batch, rejects)(rows)
+
+        self.assertEqual(counts, {"inserted": 61, "rejected": 3})
+        self.assertLess(len(calls), 40)
+        self.assertEqual((rejects.count, rejects.written), (3, 2))
+
+        with patch('imports.rejects.upload_fileobj', side_effect=self._upload):
+            self.assertEqual(rejects.upload(), "imports/1.csv.rejects.0.csv")
+        self.assertEqual(
+            self.uploads["imports/1.csv.rejects.0.csv"],
+            [["error", "sku", "name", "description", "active"], ["refused", "SKU-5", "n", "", "True"],
+             ["refused", "SKU-6", "n", "", "True"]],
+        )
+
+    def test_only_the_drivers_nul_error_is_a_row_error(self):
+        """Test a NUL byte the driver won't send is rejected while other ValueErrors fail the batch."""
+        from imports.rejects import RejectFile, isolating_writer
+
+        rows = normalize_columns(["A-1", "B\x002", "C-3"], ["n"] * 3, [""] * 3)
+
+        def write_batch(part):
+            if any("\x00" in row[SKU] for row in part):
+                raise ValueError("A string literal cannot contain NUL (0x00) characters.")
+            return {"inserted": len(part)}
+
+        rejects = RejectFile("imports/1.csv.rejects.0.csv")
+        self.assertEqual(isolating_writer(write_batch, rejects)(rows), {"inserted": 2, "rejected": 1})
+        rejects.close()
+
+        def broken(part):
+            raise ValueError("too many values to unpack")
+
+        with self.assertRaisesMessage(ValueError, "too many values to unpack"):
+            isolating_writer(broken, RejectFile("imports/1.csv.rejects.0.csv"))(rows)
+
+    def test_malformed_line_is_rejected(self):
+        """Test a line the CSV parser can't read is skipped and reported."""
+        lines = ["sku,name,description", "A-1,First,", "B-2," + "x" * 200000 + ","]
+        lines += [f"C-{i},Filler," for i in range(1500)]
+        job = self._import("\n".join(lines) + "\n")
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED, job.error_message)
+        self.assertEqual(job.rejected_rows, 1)
+        self.assertEqual(job.inserted_rows, 1501)
+        self.assertEqual(job.reject_files, ["imports/1.csv.rejects.0.csv"])
+        self.assertIn("field larger than field limit", self.uploads["imports/1.csv.rejects.0.csv"][1][0])
+
+    def test_undecodable_row_is_rejected(self):
+        """Test a row with a byte that isn't valid UTF-8 is rejected and the rest imported."""
+        lines = ["sku,name,description"] + [f"C-{i},Filler {i}," for i in range(1500)]
+        lines[700] = "L-1,Caf\xe9,"
+        content = "\n".join(lines).encode("latin-1") + b"\n"
+
+        job = self._import(content)
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED, job.error_message)
+        self.assertEqual(job.rejected_rows, 1)
+        self.assertEqual(job.inserted_rows, 1499)
+        self.assertFalse(Product.objects.filter(sku_norm="l-1").exists())
+        error = self.uploads["imports/1.csv.rejects.0.csv"][1][0]
+        self.assertIn("Malformed encoding", error)
+        self.assertIn("L-1,Caf\ufffd", error)
+
+        # A dry run reports the row instead of failing
+        validation = run_import(content, mode=ImportJob.MODE_VALIDATE)
+        self.assertEqual(validation.status, ImportJob.STATUS_COMPLETED, validation.error_message)
+        self.assertEqual(validation.validation_report["issues"]["malformed_line"], 1)
+
+    def test_clean_file_uploads_nothing(self):
+        """Test no reject file is written when every row is imported."""
+        job = self._import("sku,name,description\nA-1,First,\n")
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED)
+        self.assertEqual((job.rejected_rows, job.reject_files), (0, []))
+        self.assertEqual(self.uploads, {})
+
+    @skipUnless(connection.vendor == "postgresql", "Length limits are enforced by PostgreSQL")
+    def test_rows_refused_by_the_database_are_rejected(self):
+        """Test over-long values are isolated and the rest of the batch is written."""
+        lines = ["sku,name,description"] + [f"A-{i},Product {i}," for i in range(1500)]
+        lines[700] = "L-1," + "n" * 300 + ","
+        lines[1200] = "S" * 100 + ",Long sku,"
+        job = self._import("\n".join(lines) + "\n")
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED, job.error_message)
+        self.assertEqual(job.rejected_rows, 2)
+        self.assertEqual(Product.objects.count(), 1498)
+        rejected = self.uploads["imports/1.csv.rejects.0.csv"]
+        self.assertEqual(sorted(row[1][:3] for row in rejected[1:]), ["L-1", "SSS"])
+
+
+@override_settings(**FIXED_BATCH_SIZE, **LOCMEM_CACHE)
+class DedupTests(TestCase):
+    """Test duplicate SKUs are collapsed before they reach the database."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_last_row_wins_within_a_batch(self):
+        """Test the last row of a sku_norm is kept, at its first position."""
+        from imports.dedup import dedupe_batch
+
+        rows = normalize_columns(["A-1", "B-2", "a-1", "C-3"], ["First", "B", "Last", "C"], [""] * 4)
+        self.assertEqual([(row[SKU], row[NAME]) for row in dedupe_batch(rows)], [("a-1", "Last"), ("B-2", "B"), ("C-3", "C")])
+
+    def test_repeats_across_batches_are_dropped(self):
+        """Test only rows repeating the last written content are dropped."""
+        from imports.dedup import SeenRows
+
+        def batch(*names):
+            return normalize_columns(["A-1"] * len(names), list(names), [""] * len(names))
+
+        seen = SeenRows(max_size=10)
+        self.assertEqual(len(seen.collapse(batch("v1"))[0]), 1)
+        self.assertEqual(seen.collapse(batch("v1")), ([], 1))
+        self.assertEqual(len(seen.collapse(batch("v2"))[0]), 1)
+        # v1 again after v2 has to be written
+        self.assertEqual(len(seen.collapse(batch("v1"))[0]), 1)
+
+        full = SeenRows(max_size=1)
+        full.collapse(batch("v1"))
+        other = normalize_columns(["B-2"], ["x"], [""])
+        full.collapse(other)
+        self.assertEqual(full.collapse(other), (other, 0))
+
+    def test_case_variants_in_one_batch_import(self):
+        """Test a batch holding one SKU in two casings imports (PostgreSQL used to refuse it)."""
+        lines = ["ABC-1,First,", "abc-1,Second,"] + [f"F-{i},Filler," for i in range(1500)] + ["abc-1,Second,"]
+        job = run_import(csv_content(lines))
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED, job.error_message)
+        self.assertEqual(job.duplicate_rows, 2)
+        self.assertEqual(job.processed_rows, 1503)
+        self.assertEqual(job.inserted_rows, 1501)
+        self.assertEqual(Product.objects.get(sku_norm="abc-1").name, "Second")
+        self.assertEqual(progress.status_from_job(job)["duplicates"], 2)
+
+
+class ConcurrencyTests(TestCase):
+    """Test batches are written in SKU order under the configured lock policy."""
+
+    def test_batches_are_sorted_by_sku_norm(self):
+        """Test the writer receives each batch in sku_norm order."""
+        from imports.tasks import csv_batches
+
+        reader = iter([["sku", "name"], ["c-3", "C"], ["A-1", "A"], ["b-2", "B"]])
+        batch = next(csv_batches(reader, lambda: 10))
+        self.assertEqual([row[SKU_NORM] for row in batch.rows], ["a-1", "b-2", "c-3"])
+
+    def test_partitions_are_stable_and_ascending(self):
+        """Test lock keys don't depend on the process and are taken in order."""
+        from imports.locking import POLICY_JOB, POLICY_PARTITION, batch_partitions, sku_partition
+
+        rows = normalize_columns([f"SKU-{i}" for i in range(50)], ["n"] * 50, [""] * 50)
+        with self.settings(IMPORT_LOCK_PARTITIONS=8):
+            keys = batch_partitions(rows, POLICY_PARTITION)
+        self.assertEqual(keys, sorted(set(keys)))
+        self.assertTrue(set(keys) <= set(range(8)))
+        self.assertEqual(sku_partition("sku-1", 64), sku_partition("sku-1", 64))
+        self.assertEqual(batch_partitions(rows, POLICY_JOB), [0])
+
+    @override_settings(IMPORT_CONCURRENCY="bogus")
+    def test_unknown_policy_is_refused(self):
+        """Test a misconfigured policy fails loudly."""
+        from imports.locking import locking_writer
+
+        with self.assertRaises(ValueError):
+            locking_writer(lambda rows: {})
+
+    @skipUnless(connection.vendor == "postgresql", "Advisory locks require PostgreSQL")
+    @override_settings(IMPORT_CONCURRENCY="partition", IMPORT_LOCK_PARTITIONS=4)
+    def test_partition_locks_are_held_for_the_write(self):
+        """Test each write holds the advisory locks of its partitions."""
+        from imports.locking import LOCK_NAMESPACE, batch_partitions, locking_writer
+
+        rows = normalize_columns(["A-1", "B-2", "C-3"], ["n"] * 3, [""] * 3)
+        held = []
+
+        def write_batch(batch):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT objid FROM pg_locks WHERE locktype = 'advisory' AND classid = %s "
+                    "AND pid = pg_backend_pid() ORDER BY objid",
+                    [LOCK_NAMESPACE],
+                )
+                held.extend(key for (key,) in cursor.fetchall())
+            return {}
+
+        locking_writer(write_batch)(rows)
+        self.assertEqual(held, batch_partitions(rows, "partition"))
+
+
+@override_settings(
+    IMPORT_THROTTLE_MAX_COMMIT_SECONDS=1.0,
+    IMPORT_THROTTLE_MAX_LOCK_WAITS=5,
+    IMPORT_THROTTLE_CHECK_SECONDS=0,
+    IMPORT_THROTTLE_PAUSE_SECONDS=0.5,
+    IMPORT_THROTTLE_MAX_PAUSE_SECONDS=2,
+)
+class ThrottleTests(TestCase):
+    """Test background imports pause and shrink batches under database load."""
+
+    def test_only_background_jobs_are_throttled(self):
+        """Test fast jobs get no throttle and blank priority follows the setting."""
+        from imports.throttle import LoadThrottle
+
+        self.assertIsNone(LoadThrottle.for_job(ImportJob(priority=ImportJob.PRIORITY_FAST)))
+        self.assertIsNotNone(LoadThrottle.for_job(ImportJob(priority=ImportJob.PRIORITY_BACKGROUND)))
+        with self.settings(IMPORT_PRIORITY="fast"):
+            self.assertIsNone(LoadThrottle.for_job(ImportJob()))
+        with self.settings(IMPORT_PRIORITY="background"):
+            self.assertIsNotNone(LoadThrottle.for_job(ImportJob()))
+            self.assertIsNone(LoadThrottle.for_job(ImportJob(priority=ImportJob.PRIORITY_FAST)))
+
+    @patch('imports.throttle.time.sleep')
+    def test_slow_commits_pause_and_shrink(self, mock_sleep):
+        """Test each slow commit halves the next batch and doubles the pause, up to the maximum."""
+        from imports.batching import BatchSizeController
+        from imports.stats import StageStats
+        from imports.throttle import LoadThrottle
+
+        throttle = LoadThrottle()
+        controller = BatchSizeController(initial=4000, minimum=100, maximum=10000)
+        stats = StageStats()
+
+        pauses = [throttle.after_batch(3.0, controller, stats) for _ in range(4)]
+        self.assertEqual(pauses, [0.5, 1.0, 2, 2])
+        self.assertEqual(controller.size, 250)
+        self.assertEqual(mock_sleep.call_count, 4)
+        self.assertEqual(stats.as_dict()["throttled_batches"], 4)
+
+        # The pause resets once commits are fast again
+        self.assertEqual(throttle.after_batch(0.1, controller, stats), 0.0)
+        self.assertEqual(throttle.after_batch(3.0, controller, stats), 0.5)
+
+    @patch('imports.throttle.time.sleep')
+    def test_replication_lag_query(self, mock_sleep):
+        """Test the configured lag query is a throttling signal."""
+        from imports.batching import BatchSizeController
+        from imports.stats import StageStats
+        from imports.throttle import LoadThrottle
+
+        controller = BatchSizeController(initial=1000, minimum=100, maximum=10000)
+        with self.settings(IMPORT_THROTTLE_LAG_QUERY="SELECT 30", IMPORT_THROTTLE_MAX_LAG_SECONDS=10):
+            throttle = LoadThrottle()
+            self.assertEqual(throttle.pressure(0.1), ["replication lag 30.0s"])
+        with self.settings(IMPORT_THROTTLE_LAG_QUERY="SELECT 3", IMPORT_THROTTLE_MAX_LAG_SECONDS=10):
+            self.assertEqual(LoadThrottle().after_batch(0.1, controller, StageStats()), 0.0)
+        mock_sleep.assert_not_called()
+        self.assertEqual(controller.size, 1000)
+
+
+@override_settings(**LOCMEM_CACHE)
+class IdempotencyTests(TestCase):
+    """Test repeated uploads and redelivered tasks don't import twice."""
+
+    def setUp(self):
+        cache.clear()
+        Product.objects.create(sku="SKU-1", sku_norm="sku-1", name="One")
+
+    def _completed(self, **fields):
+        from imports.idempotency import catalog_version
+
+        return ImportJob.objects.create(
+            status=ImportJob.STATUS_COMPLETED, file_key="imports/1.csv",
+            content_etag="abc", content_size=100, catalog_version=catalog_version(),
+            processed_rows=10, total_rows=10, total_bytes=100,
+            inserted_rows=4, updated_rows=3, unchanged_rows=2, rejected_rows=1, **fields
+        )
+
+    def _start(self, job, **options):
+        with patch('imports.views.get_object_fingerprint', return_value=("abc", 100)), \
+                patch('imports.views.process_import_job') as mock_task:
+            response = self.client.post(reverse("start_import_job", args=[job.id]), options)
+        self.assertEqual(response.status_code, 200)
+        job.refresh_from_db()
+        return json.loads(response.content), mock_task
+
+    @patch('imports.tasks.dispatch_webhooks_for_event')
+    def test_repeated_upload_is_skipped(self, mock_webhooks):
+        """Test identical content on an unmodified catalog completes without reading the file."""
+        previous = self._completed()
+        job = ImportJob.objects.create(status=ImportJob.STATUS_PENDING, file_key="imports/2.csv")
+
+        data, mock_task = self._start(job)
+
+        mock_task.delay.assert_not_called()
+        self.assertEqual(data["duplicate_of"], previous.id)
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED)
+        self.assertEqual(job.duplicate_of, previous)
+        self.assertEqual((job.content_etag, job.content_size), ("abc", 100))
+        self.assertEqual(job.result_counts()["unchanged"], 9)
+        self.assertEqual(job.result_counts()["inserted"], 0)
+        self.assertEqual(job.processed_rows, 10)
+        self.assertEqual(mock_webhooks.delay.call_args.args[1]["duplicate_of"], previous.id)
+
+    def test_modified_catalog_or_force_imports_again(self):
+        """Test a changed catalog, another mode or force=1 runs the import."""
+        self._completed()
+
+        job = ImportJob.objects.create(status=ImportJob.STATUS_PENDING, file_key="imports/2.csv")
+        data, mock_task = self._start(job, force="1")
+        mock_task.delay.assert_called_once_with(job.id)
+        self.assertNotIn("duplicate_of", data)
+
+        job = ImportJob.objects.create(status=ImportJob.STATUS_PENDING, file_key="imports/3.csv", sync_missing="delete")
+        _, mock_task = self._start(job)
+        mock_task.delay.assert_called_once_with(job.id)
+
+        Product.objects.create(sku="SKU-2", sku_norm="sku-2", name="Two")
+        job = ImportJob.objects.create(status=ImportJob.STATUS_PENDING, file_key="imports/4.csv")
+        _, mock_task = self._start(job)
+        mock_task.delay.assert_called_once_with(job.id)
+        self.assertEqual(job.status, ImportJob.STATUS_QUEUED)
+
+    def test_redelivered_task_waits_for_running_one(self):
+        """Test a task whose lock is held retries instead of importing the same rows."""
+        from celery.exceptions import Retry
+        from imports.idempotency import TaskLock
+        from imports.tasks import process_import_job
+
+        job = ImportJob.objects.create(status=ImportJob.STATUS_QUEUED, file_key="imports/1.csv")
+        running = TaskLock(f"job:{job.id}")
+        self.assertTrue(running.acquire())
+
+        with patch('imports.tasks.generate_presigned_get_url') as mock_url:
+            with self.assertRaises(Retry):
+                process_import_job(job.id)
+            mock_url.assert_not_called()
+
+            # A redelivery after completion is ignored
+            running.release()
+            job.status = ImportJob.STATUS_COMPLETED
+            job.save()
+            process_import_job(job.id)
+            mock_url.assert_not_called()
+
+        # Released locks can be taken again; a stale holder can't release a newer one
+        self.assertTrue(running.acquire())
+        cache.delete(running.key)
+        newer = TaskLock(f"job:{job.id}")
+        self.assertTrue(newer.acquire())
+        running.release()
+        self.assertFalse(TaskLock(f"job:{job.id}").acquire())
+
+    def test_unreachable_cache_doesnt_block_tasks(self):
+        """Test a lock the cache can't store (Redis down) lets the task run instead of retrying."""
+        from imports.idempotency import TaskLock
+
+        lock = TaskLock("job:1")
+        with patch('imports.idempotency.cache.add', return_value=False), \
+                patch('imports.idempotency.cache.get', return_value=None):
+            self.assertTrue(lock.acquire())
+        self.assertFalse(lock.held)
+
+        # A lock another task holds still blocks
+        self.assertTrue(TaskLock("job:2").acquire())
+        self.assertFalse(TaskLock("job:2").acquire())
+
+    def test_stale_lock_doesnt_touch_a_newer_one(self):
+        """Test a holder whose lock expired neither extends nor deletes the next holder's lock."""
+        from imports.idempotency import TaskLock
+
+        stale = TaskLock("job:1")
+        self.assertTrue(stale.acquire())
+        cache.delete(stale.key)
+        newer = TaskLock("job:1")
+        self.assertTrue(newer.acquire())
+
+        with patch('imports.idempotency.cache.touch') as mock_touch:
+            stale.refresh()
+        mock_touch.assert_not_called()
+        self.assertFalse(stale.held)
+        stale.release()
+        self.assertEqual(cache.get(newer.key), newer.token)
+
+    def test_redis_lock_compares_and_acts_in_one_script(self):
+        """Test refresh and release go through a script given the lock's key and encoded token."""
+        from imports.idempotency import REFRESH_SCRIPT, RELEASE_SCRIPT, TaskLock
+
+        lock = TaskLock("job:1")
+        lock.held = True
+        client = Mock()
+        redis_cache = Mock()
+        redis_cache.client.get_client.return_value = client
+        redis_cache.client.make_key.side_effect = lambda key: f":1:{key}"
+        redis_cache.client.encode.side_effect = lambda value: f"encoded {value}".encode()
+
+        with patch('imports.idempotency.cache', redis_cache), \
+                override_settings(IMPORT_TASK_LOCK_SECONDS=60):
+            lock.refresh()
+            lock.release()
+
+        self.assertEqual([c.args[0] for c in client.register_script.call_args_list], [REFRESH_SCRIPT, RELEASE_SCRIPT])
+        token = f"encoded {lock.token}".encode()
+        run = client.register_script.return_value
+        self.assertEqual(run.call_args_list[0].kwargs, {"keys": [":1:imports:lock:job:1"], "args": [token, 60]})
+        self.assertEqual(run.call_args_list[1].kwargs, {"keys": [":1:imports:lock:job:1"], "args": [token]})
+        redis_cache.delete.assert_not_called()
+        self.assertFalse(lock.held)
+
+
+@override_settings(IMPORT_INGEST_ENGINE="orm", **FIXED_BATCH_SIZE, **LOCMEM_CACHE)
+class DeltaImportTests(TestCase):
+    """Test delta imports that only write what changed since the feed's snapshot."""
+
+    def setUp(self):
+        cache.clear()
+        self.lines = [f"SKU-{i},Product {i},Desc {i}" for i in range(1500)]
+
+    def _import(self, lines, feed="catalog", **job_fields):
+        return run_import(csv_content(lines), feed=feed, **job_fields)
+
+    def test_only_changes_are_written(self):
+        """Test a second import writes the added and changed rows only."""
+        from imports.models import FeedSnapshotRow
+
+        job = self._import(self.lines)
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED, job.error_message)
+        self.assertEqual(job.inserted_rows, 1500)
+        self.assertEqual(FeedSnapshotRow.objects.filter(feed="catalog").count(), 1500)
+
+        lines = self.lines[1:]
+        lines[10] = "SKU-11,Renamed,Desc 11"
+        lines.append("SKU-NEW,New,")
+        job = self._import(lines)
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED, job.error_message)
+        self.assertEqual(job.stage_stats["rows_written"], 2)
+        self.assertEqual(
+            (job.inserted_rows, job.updated_rows, job.unchanged_rows, job.deleted_rows), (1, 1, 1498, 0)
+        )
+        self.assertEqual(job.processed_rows, 1500)
+        self.assertEqual(Product.objects.get(sku_norm="sku-11").name, "Renamed")
+        # Without sync, a dropped SKU only leaves the snapshot
+        self.assertTrue(Product.objects.filter(sku_norm="sku-0").exists())
+        self.assertEqual(
+            set(FeedSnapshotRow.objects.filter(feed="catalog").values_list("sku_norm", flat=True)),
+            set(Product.objects.exclude(sku_norm="sku-0").values_list("sku_norm", flat=True)),
+        )
+
+        # Other feeds have snapshots of their own
+        job = self._import(self.lines[:2], feed="outlet")
+        self.assertEqual(job.inserted_rows + job.updated_rows + job.unchanged_rows, 2)
+        self.assertEqual(job.deleted_rows, 0)
+
+    def test_products_changed_elsewhere_are_written_again(self):
+        """Test SKUs deleted or edited outside the feed aren't skipped as unchanged."""
+        self._import(self.lines)
+        Product.objects.all().delete()
+
+        job = self._import(self.lines)
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED, job.error_message)
+        self.assertEqual((job.inserted_rows, job.unchanged_rows), (1500, 0))
+        self.assertEqual(Product.objects.count(), 1500)
+
+        product = Product.objects.get(sku_norm="sku-7")
+        product.name = "Edited"
+        product.save()
+        job = self._import(self.lines)
+        self.assertEqual((job.updated_rows, job.unchanged_rows), (1, 1499))
+        self.assertEqual(Product.objects.get(sku_norm="sku-7").name, "Product 7")
+
+    def test_dropped_skus_are_deleted_with_sync(self):
+        """Test sync=delete deletes the SKUs the feed dropped, except those another feed lists."""
+        self._import(self.lines)
+        self._import(self.lines[:1], feed="outlet")
+        job = self._import(self.lines[2:], sync_missing=ImportJob.SYNC_DELETE)
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED, job.error_message)
+        self.assertEqual(job.deleted_rows, 1)
+        self.assertTrue(Product.objects.filter(sku_norm="sku-0").exists())
+        self.assertFalse(Product.objects.filter(sku_norm="sku-1").exists())
+
+    def test_dropped_skus_can_be_deactivated(self):
+        """Test sync=deactivate deactivates the SKUs the feed dropped instead of deleting them."""
+        self._import(self.lines)
+        job = self._import(self.lines[2:], sync_missing=ImportJob.SYNC_DEACTIVATE)
+
+        self.assertEqual(job.status, ImportJob.STATUS_COMPLETED, job.error_message)
+        self.assertEqual(job.deactivated_rows, 2)
+        self.assertEqual(set(Product.objects.filter(active=False).values_list("sku_norm", flat=True)), {"sku-0", "sku-1"})
+
+    @override_settings(IMPORT_SYNC_MIN_RATIO=0.5)
+    def test_truncated_feed_removes_nothing(self):
+        """Test a file listing too few of the feed's SKUs fails instead of removing the rest."""
+        self._import(self.lines)
+        job = self._import(self.lines[:10], sync_missing=ImportJob.SYNC_DELETE)
+
+        self.assertEqual(job.status, ImportJob.STATUS_FAILED)
+        self.assertIn("Delta aborted", job.error_message)
+        self.assertEqual(Product.objects.count(), 1500)
+
+    def test_feed_option(self):
+        """Test the feed is stored on the job and can't be combined with replace mode."""
+        response = self.client.post(reverse("create_upload_job"), {"feed": "catalog", "mode": "replace"})
+        self.assertEqual(response.status_code, 400)
+
+        with patch('imports.views.generate_presigned_put_url', return_value="https://example.com/put"):
+            response = self.client.post(reverse("create_upload_job"), {"feed": "catalog"})
+        job = ImportJob.objects.get(id=json.loads(response.content)["job_id"])
+        self.assertEqual(job.feed, "catalog")
@@ -0,0 +1,123 @@
+# imports/throttle.py
+"""
+Load-aware throttling, so background imports leave room for interactive
+traffic.
+
+Jobs run at one of two priorities (ImportJob.priority, blank = settings.
+IMPORT_PRIORITY, "fast" unless configured otherwise):
+
+- ``fast``:       batches are written back to back, as fast as the
+                  database takes them.
+- ``background``: after every batch, outside its transaction, the throttle
+                  looks at database-side signals:
+
+                  - that batch's write+commit latency, against
+                    IMPORT_THROTTLE_MAX_COMMIT_SECONDS;
+                  - sessions waiting on locks (PostgreSQL), against
+                    IMPORT_THROTTLE_MAX_LOCK_WAITS;
+                  - replication lag in seconds, from IMPORT_THROTTLE_LAG_QUERY
+                    if one is configured, against
+                    IMPORT_THROTTLE_MAX_LAG_SECONDS.
+
+                  The lock and lag queries run at most every
+                  IMPORT_THROTTLE_CHECK_SECONDS. While any threshold is
+                  crossed, each batch halves the next batch size and pauses,
+                  starting at IMPORT_THROTTLE_PAUSE_SECONDS and doubling up
+                  to IMPORT_THROTTLE_MAX_PAUSE_SECONDS. Once the signals
+                  clear, the batch size controller grows batches back.
+"""
+import logging
+import time
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import connection
+
+from imports.batching import BatchSizeController
+from imports.models import ImportJob
+from imports.stats import StageStats
+
+logger = logging.getLogger(__name__)
+
+LOCK_WAITS_SQL = """
+    SELECT count(*) FROM pg_stat_activity
+    WHERE wait_event_type = 'Lock' AND datname = current_database() AND pid <> pg_backend_pid()
+"""
+
+
+class LoadThrottle:
+    """
+    Pauses and shrinks batches of one pass or chunk while the database is
+    under pressure.
+    """
+
+    def __init__(self):
+        self.max_commit_seconds = settings.IMPORT_THROTTLE_MAX_COMMIT_SECONDS
+        self.max_lock_waits = settings.IMPORT_THROTTLE_MAX_LOCK_WAITS
+        self.max_lag_seconds = settings.IMPORT_THROTTLE_MAX_LAG_SECONDS
+        self.lag_query = settings.IMPORT_THROTTLE_LAG_QUERY
+        self.check_seconds = settings.IMPORT_THROTTLE_CHECK_SECONDS
+
+        self.pause = 0.0
+        self.lock_waits = 0
+        self.lag_seconds = 0.0
+        self._checked_at: Optional[float] = None
+
+    @classmethod
+    def for_job(cls, job: ImportJob) -> Optional["LoadThrottle"]:
+        """
+        A throttle for background-priority jobs, None for fast ones.
+        """
+        priority = job.priority or settings.IMPORT_PRIORITY
+        return cls() if priority == ImportJob.PRIORITY_BACKGROUND else None
+
+    def _check_database(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_seconds:
+            return
+        self._checked_at = now
+
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(LOCK_WAITS_SQL)
+                self.lock_waits = cursor.fetchone()[0]
+            if self.lag_query:
+                cursor.execute(self.lag_query)
+                row = cursor.fetchone()
+                self.lag_seconds = float(row[0] or 0) if row else 0.0
+
+    def pressure(self, commit_seconds: float) -> List[str]:
+        """
+        The thresholds currently crossed.
+        """
+        self._check_database()
+        crossed = []
+        if commit_seconds > self.max_commit_seconds:
+            crossed.append(f"commit {commit_seconds:.2f}s")
+        if self.lock_waits > self.max_lock_waits:
+            crossed.append(f"{self.lock_waits} lock waits")
+        if self.lag_query and self.lag_seconds > self.max_lag_seconds:
+            crossed.append(f"replication lag {self.lag_seconds:.1f}s")
+        return crossed
+
+    def after_batch(self, commit_seconds: float, controller: BatchSizeController, stats: StageStats) -> float:
+        """
+        Called after each committed batch. Returns the seconds paused.
+        """
+        crossed = self.pressure(commit_seconds)
+        if not crossed:
+            self.pause = 0.0
+            return 0.0
+
+        self.pause = min(
+            self.pause * 2 or settings.IMPORT_THROTTLE_PAUSE_SECONDS,
+            settings.IMPORT_THROTTLE_MAX_PAUSE_SECONDS,
+        )
+        controller.shrink()
+        logger.info(
+            "Throttling import (%s): pausing %.1fs, next batch %d rows", ", ".join(crossed), self.pause, controller.size
+        )
+        stats.count("throttled_batches")
+        with stats.stage("throttle"):
+            time.sleep(self.pause)
+        return self.pause
@@ -6,6 +6,10 @@ urlpatterns = [
     path("products/upload/", views.upload_products_page, name="upload_products_page"),
 
     path("api/imports/create-upload/", views.create_upload_job, name="create_upload_job"),
+    path("api/imports/<int:job_id>/upload-parts/", views.upload_parts, name="upload_parts"),
+    path("api/imports/<int:job_id>/complete-upload/", views.complete_upload, name="complete_upload"),
+    path("api/imports/<int:job_id>/abort-upload/", views.abort_upload, name="abort_upload"),
     path("api/imports/<int:job_id>/start/", views.start_import_job, name="start_import_job"),
     path("api/imports/<int:job_id>/status/", views.import_job_status, name="import_job_status"),
+    path("api/imports/<int:job_id>/events/", views.import_job_events, name="import_job_events"),
 ]
@@ -0,0 +1,136 @@
+# imports/validation.py
+"""
+Validation-only (dry run) checks for import files.
+
+A dry run reads the file exactly like an import but only looks at the sku
+and name columns: no hashing, no database writes. It reports rows that an
+import would skip or that would not fit the products table:
+
+- empty_sku:      no SKU after trimming (an import skips these rows)
+- duplicate_sku:  SKU already seen earlier in the file, case-insensitively
+                  (an import keeps the last occurrence)
+- sku_too_long:   longer than Product.sku allows
+- name_too_long:  longer than Product.name allows
+- malformed_line: a CSV line the parser can't read, or a row that isn't
+                  valid UTF-8 (an import rejects it)
+
+plus a sample of offending rows.
+"""
+from typing import Dict, List, Optional, Sequence
+
+from django.conf import settings
+
+from products.models import Product
+
+SKU_MAX_LENGTH = Product._meta.get_field("sku").max_length
+NAME_MAX_LENGTH = Product._meta.get_field("name").max_length
+
+ISSUES = ("empty_sku", "duplicate_sku", "sku_too_long", "name_too_long", "malformed_line")
+
+# Sampled values are cut to this many characters
+SAMPLE_VALUE_LENGTH = 100
+
+
+class ValidationReport:
+    """
+    Accumulates issue counts and sample rows over the batches of one file.
+
+    Rows are numbered from 1, not counting the header. Duplicate detection
+    keeps one entry per distinct SKU for the whole file.
+    """
+
+    def __init__(self, sample_size: Optional[int] = None):
+        self.sample_size = settings.IMPORT_VALIDATION_SAMPLE_ROWS if sample_size is None else sample_size
+        self.rows = 0
+        self.invalid_rows = 0
+        self.issues = dict.fromkeys(ISSUES, 0)
+        self.samples: List[Dict] = []
+        self.missing_columns: List[str] = []
+        self._first_seen: Dict[str, int] = {}
+
+    def check_header(self, fieldnames: Sequence[str]):
+        present = {name.strip().lower() for name in fieldnames}
+        self.missing_columns = [name for name in ("sku", "name", "description") if name not in present]
+
+    def add_columns(self, skus: Sequence[str], names: Sequence[str]):
+        """
+        Check one batch given as trimmed sku and name columns.
+        """
+        first_seen = self._first_seen
+        issues = self.issues
+
+        for sku, name in zip(skus, names):
+            self.rows += 1
+            found = []
+            duplicate_of = None
+
+            if not sku:
+                found.append("empty_sku")
+            else:
+                sku_norm = sku.lower()
+                duplicate_of = first_seen.get(sku_norm)
+                if duplicate_of is None:
+                    first_seen[sku_norm] = self.rows
+                else:
+                    found.append("duplicate_sku")
+                if len(sku) > SKU_MAX_LENGTH:
+                    found.append("sku_too_long")
+            if len(name) > NAME_MAX_LENGTH:
+                found.append("name_too_long")
+
+            if not found:
+                continue
+
+            self.invalid_rows += 1
+            for issue in found:
+                issues[issue] += 1
+            if len(self.samples) < self.sample_size:
+                sample = {
+                    "row": self.rows,
+                    "issues": found,
+                    "sku": sku[:SAMPLE_VALUE_LENGTH],
+                    "name": name[:SAMPLE_VALUE_LENGTH],
+                }
+                if duplicate_of is not None:
+                    sample["first_seen_row"] = duplicate_of
+                self.samples.append(sample)
+
+    def add_malformed(self, errors: Sequence[str]):
+        """
+        Count CSV lines that couldn't be parsed (errors from read_csv_rows).
+        Their samples carry the parser's line number in the error instead of
+        a row number.
+        """
+        for error in errors:
+            self.rows += 1
+            self.invalid_rows += 1
+            self.issues["malformed_line"] += 1
+            if len(self.samples) < self.sample_size:
+                self.samples.append({"issues": ["malformed_line"], "error": error})
+
+    def summary(self) -> Dict:
+        return {
+            "rows": self.rows,
+            "valid_rows": self.rows - self.invalid_rows,
+            "invalid_rows": self.invalid_rows,
+            "distinct_skus": len(self._first_seen),
+            "issues": dict(self.issues),
+            "missing_columns": self.missing_columns,
+            "limits": {"sku": SKU_MAX_LENGTH, "name": NAME_MAX_LENGTH},
+            "samples": self.samples,
+        }
+
+
+def csv_sku_name_columns(rows: List[List[str]], indexes) -> tuple:
+    """
+    Trimmed sku and name columns of a batch of csv.reader rows; ``indexes``
+    from csv_column_indexes.
+    """
+    sku_index, name_index, _ = indexes
+
+    def column(index):
+        if index is None:
+            return [""] * len(rows)
+        return [row[index].strip() if len(row) > index else "" for row in rows]
+
+    return column(sku_index), column(name_index)
@@ -1,14 +1,42 @@
 
 
 # imports/views.py
-from django.http import JsonResponse, Http404
+import asyncio
+import json
+import logging
+import math
+import time
+
+from asgiref.sync import sync_to_async
+from botocore.exceptions import BotoCoreError, ClientError
+from django.conf import settings
+from django.db import connection
+from django.http import JsonResponse, Http404, StreamingHttpResponse
 from django.shortcuts import render
 from django.views.decorators.http import require_POST, require_GET
 from django.views.decorators.csrf import csrf_exempt
 
+from imports import progress
+from imports.columnar import FORMAT_CSV, UPLOAD_FORMATS, detect_file_format
+from imports.idempotency import copy_outcome, find_unchanged_import
 from imports.models import ImportJob
-from imports.tasks import process_import_job
-from backend.r2 import generate_presigned_put_url  # adjust path if needed
+from imports.streams import COMPRESSION_CONTENT_TYPES, COMPRESSION_GZIP, detect_compression
+from imports.tasks import complete_import_job, process_import_job
+from backend.r2 import (  # adjust path if needed
+    abort_multipart_upload,
+    complete_multipart_upload,
+    create_multipart_upload,
+    generate_presigned_part_urls,
+    generate_presigned_put_url,
+    get_object_fingerprint,
+    list_uploaded_parts,
+)
+
+logger = logging.getLogger(__name__)
+
+# S3 multipart limits (R2 follows them)
+MULTIPART_MIN_PART_SIZE = 5 * 1024 * 1024
+MULTIPART_MAX_PARTS = 10000
 
 
 def upload_products_page(request):
@@ -20,32 +48,234 @@ def upload_products_page(request):
     })
 
 
+def _request_options(request) -> dict:
+    """
+    Job options from either a JSON body or regular form fields.
+    """
+    if request.content_type == "application/json":
+        try:
+            data = json.loads(request.body or b"{}")
+        except ValueError:
+            return {}
+        return data if isinstance(data, dict) else {}
+    return request.POST.dict()
+
+
+def _multipart_part_size(size: int) -> int:
+    """
+    Part size for a multipart upload of ``size`` bytes: the configured size,
+    grown in whole MiB when the file would otherwise need more than 10,000 parts.
+    """
+    part_size = max(settings.IMPORT_MULTIPART_PART_SIZE, MULTIPART_MIN_PART_SIZE)
+    if size > part_size * MULTIPART_MAX_PARTS:
+        mib = 1024 * 1024
+        part_size = math.ceil(size / MULTIPART_MAX_PARTS / mib) * mib
+    return part_size
+
+
+def _get_job(job_id: int) -> ImportJob:
+    try:
+        return ImportJob.objects.get(pk=job_id)
+    except ImportJob.DoesNotExist:
+        raise Http404("Job not found")
+
+
 @require_POST
 @csrf_exempt  # for dev; later use proper CSRF handling
 def create_upload_job(request):
+    options = _request_options(request)
+
+    engine = options.get("engine") or ""
+    if engine and engine not in dict(ImportJob.ENGINE_CHOICES):
+        return JsonResponse({"error": f"Unknown ingest engine '{engine}'"}, status=400)
+
+    filename = options.get("filename") or ""
+
+    # Parquet / Arrow IPC files are read batch-wise by the worker
+    file_format = options.get("format") or detect_file_format(filename) or FORMAT_CSV
+    if file_format != FORMAT_CSV and file_format not in UPLOAD_FORMATS:
+        return JsonResponse({"error": f"Unsupported file format '{file_format}'"}, status=400)
+
+    # Compressed CSVs (.csv.gz / .csv.zst) are stored as-is and decompressed
+    # by the worker while streaming.
+    compression = ""
+    if file_format == FORMAT_CSV:
+        compression = options.get("compression") or detect_compression(filename) or ""
+    if compression and compression not in COMPRESSION_CONTENT_TYPES:
+        return JsonResponse({"error": f"Unsupported compression '{compression}'"}, status=400)
+
+    mode = options.get("mode") or ImportJob.MODE_IMPORT
+    if mode not in dict(ImportJob.MODE_CHOICES):
+        return JsonResponse({"error": f"Unknown import mode '{mode}'"}, status=400)
+    if mode == ImportJob.MODE_REPLACE and connection.vendor != "postgresql":
+        return JsonResponse({"error": "Replace imports require PostgreSQL"}, status=400)
+
+    # Sync: deactivate or delete products the file doesn't list
+    sync = options.get("sync") or ""
+    if sync and sync not in dict(ImportJob.SYNC_CHOICES):
+        return JsonResponse({"error": f"Unknown sync option '{sync}'"}, status=400)
+    if sync and mode == ImportJob.MODE_REPLACE:
+        return JsonResponse({"error": "Replace imports already remove missing products"}, status=400)
+
+    # Background imports yield to database load; fast ones don't
+    priority = options.get("priority") or ""
+    if priority and priority not in dict(ImportJob.PRIORITY_CHOICES):
+        return JsonResponse({"error": f"Unknown priority '{priority}'"}, status=400)
+
+    # Recurring feed: only what changed since its last import is written
+    feed = (options.get("feed") or "").strip()
+    if len(feed) > ImportJob._meta.get_field("feed").max_length:
+        return JsonResponse({"error": "Feed name is too long"}, status=400)
+    if feed and mode == ImportJob.MODE_REPLACE:
+        return JsonResponse({"error": "Replace imports always write the whole catalog"}, status=400)
+
     job = ImportJob.objects.create(
         status=ImportJob.STATUS_PENDING,
         processed_rows=0,
+        ingest_engine=engine,
+        mode=mode,
+        sync_missing=sync,
+        priority=priority,
+        feed=feed,
     )
 
     object_key = f"imports/{job.id}.csv"
+    content_type = "text/csv"
+    if file_format in UPLOAD_FORMATS:
+        suffix, content_type = UPLOAD_FORMATS[file_format]
+        object_key = f"imports/{job.id}{suffix}"
+    elif compression:
+        object_key += ".gz" if compression == COMPRESSION_GZIP else ".zst"
+        content_type = COMPRESSION_CONTENT_TYPES[compression]
+
+    job.file_key = object_key
+
+    # Large files are uploaded in parts, in parallel; each part can be retried
+    # on its own (see upload_parts / complete_upload).
+    try:
+        size = int(options.get("size") or 0)
+    except (TypeError, ValueError):
+        size = 0
+
+    if size >= settings.IMPORT_MULTIPART_THRESHOLD:
+        job.upload_id = create_multipart_upload(object_key=object_key, content_type=content_type)
+        job.upload_part_size = _multipart_part_size(size)
+        job.save(update_fields=["file_key", "upload_id", "upload_part_size"])
+
+        return JsonResponse(
+            {
+                "job_id": job.id,
+                "multipart": True,
+                "part_size": job.upload_part_size,
+                "part_count": math.ceil(size / job.upload_part_size),
+                "concurrency": settings.IMPORT_UPLOAD_CONCURRENCY,
+                "content_type": content_type,
+            }
+        )
+
     upload_url = generate_presigned_put_url(
         object_key=object_key,
-        content_type="text/csv",
-        expires_in=600,
+        content_type=content_type,
+        expires_in=settings.IMPORT_UPLOAD_URL_EXPIRES,
     )
-
-    job.file_key = object_key
     job.save(update_fields=["file_key"])
 
     return JsonResponse(
         {
             "job_id": job.id,
             "upload_url": upload_url,
+            "content_type": content_type,
         }
     )
 
 
+@require_POST
+@csrf_exempt
+def upload_parts(request, job_id: int):
+    """
+    Presign PUT URLs for parts of a job's multipart upload. Called for each
+    window of parts and again for any part that has to be retried.
+    """
+    job = _get_job(job_id)
+    if not job.upload_id:
+        return JsonResponse({"error": "No multipart upload in progress"}, status=400)
+
+    part_numbers = _request_options(request).get("part_numbers")
+    if (
+        not isinstance(part_numbers, list)
+        or not part_numbers
+        or not all(isinstance(n, int) and 1 <= n <= MULTIPART_MAX_PARTS for n in part_numbers)
+    ):
+        return JsonResponse({"error": f"part_numbers must be a list of integers 1-{MULTIPART_MAX_PARTS}"}, status=400)
+
+    urls = generate_presigned_part_urls(
+        object_key=job.file_key,
+        upload_id=job.upload_id,
+        part_numbers=sorted(set(part_numbers)),
+        expires_in=settings.IMPORT_UPLOAD_URL_EXPIRES,
+    )
+    return JsonResponse({"job_id": job.id, "urls": {str(n): url for n, url in urls.items()}})
+
+
+@require_POST
+@csrf_exempt
+def complete_upload(request, job_id: int):
+    """
+    Assemble a multipart upload from the parts R2 has received. If any of
+    parts 1..part_count is missing, nothing is assembled and the missing part
+    numbers are returned (409) so the client re-sends just those.
+    """
+    job = _get_job(job_id)
+    if not job.upload_id:
+        return JsonResponse({"error": "No multipart upload in progress"}, status=400)
+
+    parts = list_uploaded_parts(object_key=job.file_key, upload_id=job.upload_id)
+    uploaded = {p["PartNumber"] for p in parts}
+
+    try:
+        part_count = int(_request_options(request).get("part_count") or max(uploaded, default=0))
+    except (TypeError, ValueError):
+        return JsonResponse({"error": "part_count must be an integer"}, status=400)
+
+    missing = [n for n in range(1, part_count + 1) if n not in uploaded]
+    if missing or not part_count:
+        return JsonResponse({"error": "Upload incomplete", "missing_parts": missing}, status=409)
+
+    try:
+        complete_multipart_upload(
+            object_key=job.file_key,
+            upload_id=job.upload_id,
+            parts=[p for p in parts if p["PartNumber"] <= part_count],
+        )
+    except ClientError as e:
+        return JsonResponse({"error": f"Could not complete upload: {e}"}, status=400)
+
+    job.upload_id = ""
+    job.save(update_fields=["upload_id", "updated_at"])
+
+    return JsonResponse({"job_id": job.id, "parts": part_count})
+
+
+@require_POST
+@csrf_exempt
+def abort_upload(request, job_id: int):
+    """
+    Give up on a multipart upload and release the parts stored in R2.
+    """
+    job = _get_job(job_id)
+    if not job.upload_id:
+        return JsonResponse({"error": "No multipart upload in progress"}, status=400)
+
+    abort_multipart_upload(object_key=job.file_key, upload_id=job.upload_id)
+
+    job.upload_id = ""
+    job.status = ImportJob.STATUS_FAILED
+    job.error_message = "Upload aborted"
+    job.save(update_fields=["upload_id", "status", "error_message", "updated_at"])
+
+    return JsonResponse({"job_id": job.id, "status": job.status})
+
+
 @require_POST
 @csrf_exempt
 def start_import_job(request, job_id: int):
@@ -54,15 +284,67 @@ def start_import_job(request, job_id: int):
     except ImportJob.DoesNotExist:
         raise Http404("Job not found")
 
-    if job.status not in [ImportJob.STATUS_PENDING, ImportJob.STATUS_FAILED]:
+    # A validated (dry run) upload can be started again as the real import
+    options = _request_options(request)
+    mode = options.get("mode") or job.mode
+    if mode not in dict(ImportJob.MODE_CHOICES):
+        return JsonResponse({"error": f"Unknown import mode '{mode}'"}, status=400)
+    priority = options.get("priority") or job.priority
+    if priority and priority not in dict(ImportJob.PRIORITY_CHOICES):
+        return JsonResponse({"error": f"Unknown priority '{priority}'"}, status=400)
+
+    validated = job.mode == ImportJob.MODE_VALIDATE and job.status == ImportJob.STATUS_COMPLETED
+    if job.status not in [ImportJob.STATUS_PENDING, ImportJob.STATUS_FAILED] and not (
+        validated and mode == ImportJob.MODE_IMPORT
+    ):
         return JsonResponse(
             {"error": f"Job in status {job.status}, cannot start"},
             status=400,
         )
 
-    job.status = ImportJob.STATUS_QUEUED
+    if job.upload_id:
+        return JsonResponse({"error": "Upload not completed"}, status=400)
+
+    # A failed job keeps its checkpoint and resumes where it stopped, unless
+    # the caller asks for a clean restart.
+    if str(options.get("restart", "")).lower() in ("1", "true", "yes"):
+        job.clear_checkpoint()
+
+    # Drop the previous run's live entry so pollers fall back to the job row
+    # until the worker picks the job up.
+    progress.clear(job.id)
+
+    job.mode = mode
+    job.priority = priority
     job.error_message = ""
-    job.save(update_fields=["status", "error_message", "updated_at"])
+
+    # The same content imported before into a catalog nobody has touched
+    # since: complete the job as a repeat without reading the file, unless
+    # the caller forces the import.
+    previous = None
+    if mode != ImportJob.MODE_VALIDATE and job.file_key:
+        try:
+            job.content_etag, job.content_size = get_object_fingerprint(job.file_key)
+        except (BotoCoreError, ClientError):
+            logger.warning("Job %s: could not read the ETag of %s", job.id, job.file_key, exc_info=True)
+        if str(options.get("force", "")).lower() not in ("1", "true", "yes"):
+            previous = find_unchanged_import(job)
+    job.duplicate_of = None
+    if previous is not None:
+        logger.info("Job %s repeats job %s on an unmodified catalog, skipping", job.id, previous.id)
+        copy_outcome(job, previous)
+
+    job.status = ImportJob.STATUS_QUEUED
+    job.save(update_fields=[
+        "mode", "priority", "status", "error_message", "content_etag", "content_size", "duplicate_of",
+        "checkpoint_offset", "checkpoint_rows", "checkpoint_batch",
+        "inserted_rows", "updated_rows", "unchanged_rows", "deleted_rows", "deactivated_rows",
+        "rejected_rows", "duplicate_rows", "reject_files", "updated_at",
+    ])
+
+    if previous is not None:
+        complete_import_job(job)
+        return JsonResponse({"job_id": job.id, "status": job.status, "duplicate_of": previous.id})
 
     process_import_job.delay(job.id)
 
@@ -71,21 +353,73 @@ def start_import_job(request, job_id: int):
 
 @require_GET
 def import_job_status(request, job_id: int):
-    try:
-        job = ImportJob.objects.get(pk=job_id)
-    except ImportJob.DoesNotExist:
-        raise Http404("Job not found")
+    # Running jobs are served from Redis; the database is only hit when there
+    # is no live entry for the job.
+    data = progress.live_status(job_id)
+    if data is None:
+        try:
+            job = ImportJob.objects.get(pk=job_id)
+        except ImportJob.DoesNotExist:
+            raise Http404("Job not found")
+        data = progress.status_from_job(job)
 
-    data = {
-        "job_id": job.id,
-        "status": job.status,
-        "processed_rows": job.processed_rows,
-        "total_rows": job.total_rows,
-        "percentage": job.progress_percent(),
-        "error_message": job.error_message,
-    }
     return JsonResponse(data)
 
 
+def _stored_status(job_id: int):
+    job = ImportJob.objects.filter(pk=job_id).first()
+    return progress.status_from_job(job) if job else None
+
+
+async def _current_status(job_id: int):
+    # Redis reads don't need the thread that owns the DB connection
+    data = await sync_to_async(progress.live_status, thread_sensitive=False)(job_id)
+    if data is None:
+        data = await sync_to_async(_stored_status)(job_id)
+    return data
+
+
+@require_GET
+async def import_job_events(request, job_id: int):
+    """
+    Server-Sent Events stream of import_job_status payloads.
+
+    Async view: under backend.asgi it holds no sync worker while idle. It
+    checks Redis every IMPORT_EVENTS_INTERVAL seconds, sends an event only when
+    the status changed, and ends once the job completes or fails. Streams
+    are capped at IMPORT_EVENTS_MAX_SECONDS; EventSource reconnects on its own.
+    """
+    data = await _current_status(job_id)
+    if data is None:
+        raise Http404("Job not found")
+
+    async def stream(data):
+        last = None
+        last_sent = started = time.monotonic()
+
+        while True:
+            payload = json.dumps(data)
+            if payload != last:
+                yield f"data: {payload}\n\n"
+                last = payload
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= 15:
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+
+            if data["status"] in (ImportJob.STATUS_COMPLETED, ImportJob.STATUS_FAILED):
+                return
+            if time.monotonic() - started >= settings.IMPORT_EVENTS_MAX_SECONDS:
+                return
+
+            await asyncio.sleep(settings.IMPORT_EVENTS_INTERVAL)
+            data = await _current_status(job_id) or data
+
+    response = StreamingHttpResponse(stream(data), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # don't let proxies buffer the stream
+    return response
+
+
 
 
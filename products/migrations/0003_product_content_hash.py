@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-18 12:05
+
+from django.db import migrations, models
+
+
+def backfill_content_hash(apps, schema_editor):
+    Product = apps.get_model("products", "Product")
+
+    if schema_editor.connection.vendor == "postgresql":
+        # Same payload as products.models.product_content_hash()
+        schema_editor.execute(
+            """
+            UPDATE products_product
+            SET content_hash = md5(
+                sku || chr(31) || name || chr(31) || description || chr(31)
+                || CASE WHEN active THEN '1' ELSE '0' END
+            )
+            """
+        )
+        return
+
+    from products.models import product_content_hash
+
+    batch = []
+    for product in Product.objects.only("id", "sku", "name", "description", "active").iterator(chunk_size=2000):
+        product.content_hash = product_content_hash(product.sku, product.name, product.description, product.active)
+        batch.append(product)
+        if len(batch) >= 2000:
+            Product.objects.bulk_update(batch, ["content_hash"])
+            batch.clear()
+    if batch:
+        Product.objects.bulk_update(batch, ["content_hash"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_product_sku_norm_alter_product_id_alter_product_sku'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=32),
+        ),
+        migrations.RunPython(backfill_content_hash, migrations.RunPython.noop),
+    ]
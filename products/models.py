@@ -1,9 +1,21 @@
 from django.db import models
 
+import hashlib
 import uuid
 from django.db import models
 
 
+def product_content_hash(sku: str, name: str, description: str, active: bool) -> str:
+    """
+    Fingerprint of the user-visible product fields. Imports compare it with the
+    stored value to skip rows that wouldn't change anything.
+
+    Must stay in sync with the md5() backfill in migration 0003.
+    """
+    payload = "\x1f".join((sku, name, description, "1" if active else "0"))
+    return hashlib.md5(payload.encode("utf-8")).hexdigest()
+
+
 class Product(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
@@ -15,12 +27,15 @@ class Product(models.Model):
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     active = models.BooleanField(default=True)
+    # md5 of sku/name/description/active, see product_content_hash()
+    content_hash = models.CharField(max_length=32, blank=True, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def save(self, *args, **kwargs):
         self.sku_norm = self.sku.strip().lower()
+        self.content_hash = product_content_hash(self.sku, self.name, self.description, self.active)
         super().save(*args, **kwargs)
 
     def __str__(self):
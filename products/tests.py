@@ -30,6 +30,18 @@ class ProductModelTests(TestCase):
         )
         self.assertEqual(product.sku_norm, "prod-001")
 
+    def test_content_hash_tracks_fields(self):
+        """Test the content hash is kept in sync with the product fields."""
+        from products.models import product_content_hash
+
+        product = Product.objects.create(sku="PROD-001", name="Test Product")
+        self.assertEqual(product.content_hash, product_content_hash("PROD-001", "Test Product", "", True))
+
+        old_hash = product.content_hash
+        product.active = False
+        product.save()
+        self.assertNotEqual(product.content_hash, old_hash)
+
     def test_sku_case_insensitive_uniqueness(self):
         """Test that SKUs are unique case-insensitively."""
         Product.objects.create(sku="PROD-001", name="Product 1")